@@ -0,0 +1,53 @@
+from __future__ import print_function, unicode_literals
+
+import os
+
+from datafiller.options import default_options
+from datafiller.session import Session
+
+__author__ = "danishabdullah"
+__all__ = ('generate',)
+
+
+def generate(schema_text, size=None, seed=None, target='postgresql',
+             encoded=False, **options):
+    """Generate data for a schema from a program, without the script.
+
+    The schema is parsed and generators are created on call, so that errors
+    are reported early, but tuples are only generated on iteration.
+
+    - str schema_text: SQL schema with datafiller directives
+    - int size: default table size, overriding the schema 'size' directive
+    - str seed: random seed, overriding the schema 'seed' directive
+    - str target: database engine, see --target
+    - bool encoded: whether to yield encoded script text instead of rows
+    - options: other script options by their argparse names, eg batch=100
+
+    Return an iterator over pairs (table, item): item is a list of row tuples
+    for one batch of the table, or, if encoded, a piece of the output script
+    for the table as bytes. Tables are generated in schema order, unfilled
+    tables only appear in encoded mode.
+    """
+    opts = default_options(size=size, seed=seed, target=target, **options)
+    if not opts.encoding:
+        opts.encoding = 'utf-8'
+    session = Session(opts)
+    session.parse(schema_text.splitlines(True))
+    session.prepare()
+    return _encodedChunks(session) if encoded else _rowChunks(session)
+
+
+def _rowChunks(session):
+    for t in session.tables:
+        if t in session.nogen:
+            continue
+        for cols, last in t.iterChunks(session.opts.batch):
+            if cols and cols[0]:
+                yield t, list(zip(*cols))
+
+
+def _encodedChunks(session):
+    encoding = session.opts.encoding
+    for t in session.tables:
+        for s in session.tableChunks(t):
+            yield t, (s + os.linesep).encode(encoding)
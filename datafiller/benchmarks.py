@@ -0,0 +1,284 @@
+from __future__ import print_function, unicode_literals
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+__author__ = "danishabdullah"
+__all__ = ('BENCHMARKS', 'bench_run', 'synthetic_schema', 'schema_run',
+           'import_time', 'startup_modules', 'startup_check', 'output_run',
+           'unique_run', 'run_benchmarks')
+
+# benchmark name, validation, options compared to the default run
+BENCHMARKS = [
+    ('compile', 'internal', ['--compile']),
+    ('compile', 'library', ['--compile']),
+    ('compile', 'comics', ['--compile'])]
+
+# number of tables of the synthetic schema
+SYNTHETIC_TABLES = 5000
+
+# budget in seconds for importing the script, which is paid by every run,
+# and modules which only optional features need, and must not be imported
+STARTUP_MODULE = 'datafiller.scripts.cli'
+STARTUP_BUDGET = 0.075
+STARTUP_EXCLUDED = (
+    'asyncio', 'hashlib', 'json', 'mmap', 'multiprocessing', 'pickle',
+    'shutil', 'subprocess', 'tempfile', 'weakref',
+    'datafiller.benchmarks', 'datafiller.cache', 'datafiller.checkpoint',
+    'datafiller.memory', 'datafiller.parallel', 'datafiller.pipeline',
+    'datafiller.pod', 'datafiller.server', 'datafiller.shard',
+    'datafiller.tune')
+
+# directory holding the datafiller package, from which modules are imported
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# default number of unique values, --size sets another: at about 10^5
+# values per second, 10^9 keys take hours, 10^6 keep the benchmark short.
+# in-memory bytes of the spilled unique set, and largest in-memory set run
+UNIQUE_KEYS = 1000000
+UNIQUE_MEMORY = 1 << 20
+UNIQUE_MAX_MEMORY = 1 << 30
+
+
+def bench_run(run, validate, op=[], seed='Calvin'):
+    """Return seconds taken by a validation run, its output is discarded.
+
+    - run: function starting a validation, see self_run in the script
+    """
+    start = time.time()
+    p = run(validate, seed=seed, pipe=True, op=['--self-test-hack'] + op)
+    for line in p.stdout:
+        pass
+    assert p.wait() == 0, \
+        "benchmark {0} {1} failed".format(validate, ' '.join(op))
+    return time.time() - start
+
+
+def synthetic_schema(ntables=SYNTHETIC_TABLES):
+    """Return a schema with many tables holding nested generators."""
+    lines = ["-- df: size=10",
+             "-- df ab: pattern='(a|b){2,4}[0-9]{3}'"]
+    for i in range(ntables):
+        lines += ["CREATE TABLE t{0:d}(".format(i),
+                  "  id SERIAL PRIMARY KEY,",
+                  "  code TEXT NOT NULL, "
+                  "-- df: pattern='[A-Z]{3}-[0-9]{4}(-[a-z]{2})?'",
+                  "  name TEXT NOT NULL, -- df: cat=ab,ab",
+                  "  score FLOAT NOT NULL, -- df: float=gauss alpha=5.0 beta=1.0",
+                  "  born DATE NOT NULL" +
+                  (",\n  ref INTEGER NOT NULL REFERENCES t{0:d}".format(i - 1)
+                   if i else ""),
+                  ");"]
+    return '\n'.join(lines) + '\n'
+
+
+def schema_run(run, schema, op=[]):
+    """Return seconds and peak memory in MB of a run on a schema."""
+    fd, name = tempfile.mkstemp(suffix='.sql')
+    with os.fdopen(fd, 'w') as f:
+        f.write(schema)
+    try:
+        start = time.time()
+        p = run(pipe=True, op=['--self-test-hack', name] + op)
+        for line in p.stdout:
+            pass
+        # resource usage of this child only, ru_maxrss is in KB on Linux
+        pid, status, usage = os.wait4(p.pid, 0)
+        end = time.time()
+    finally:
+        os.unlink(name)
+    assert status == 0, "benchmark on {0} failed".format(name)
+    return end - start, usage.ru_maxrss / 1024.0
+
+
+def import_time(module=STARTUP_MODULE, python=sys.executable, tries=5):
+    """Return the best cumulative import time in seconds of a module.
+
+    Timings are reported by python -X importtime in a fresh interpreter.
+    """
+    best = None
+    for i in range(tries):
+        p = subprocess.Popen([python, '-X', 'importtime', '-c',
+                              'import ' + module], stderr=subprocess.PIPE,
+                             cwd=PACKAGE_DIR)
+        err = p.communicate()[1].decode('utf-8')
+        assert p.returncode == 0, "cannot import {0}".format(module)
+        # lines are: import time: self [us] | cumulative | imported package
+        for line in err.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                us = int(fields[1])
+                best = us if best == None else min(best, us)
+    assert best != None, "no import time for {0}".format(module)
+    return best / 1e6
+
+
+def startup_modules(module=STARTUP_MODULE, python=sys.executable):
+    """Return the names of the modules loaded by importing a module in a
+    fresh interpreter."""
+    p = subprocess.Popen([python, '-c', 'import sys, {0}; '
+                          'print("\\n".join(sys.modules))'.format(module)],
+                         stdout=subprocess.PIPE, cwd=PACKAGE_DIR)
+    out = p.communicate()[0].decode('utf-8')
+    assert p.returncode == 0, "cannot import {0}".format(module)
+    return set(out.split())
+
+
+def startup_check(python=sys.executable):
+    """Return the script import time in seconds, whether it fits in the
+    budget, and the excluded modules it loads."""
+    seconds = import_time(python=python)
+    loaded = sorted(set(STARTUP_EXCLUDED) & startup_modules(python=python))
+    return seconds, seconds <= STARTUP_BUDGET and not loaded, loaded
+
+
+def output_columns(nrows):
+    """Return column-major COPY values: integers, text needing escapes,
+    floats and NULLs."""
+    return [list(range(nrows)),
+            ['name {0}\twith\\tab'.format(i) if i % 7 == 0 else
+             'name {0}'.format(i) for i in range(nrows)],
+            [i * 0.25 for i in range(nrows)],
+            [None if i % 5 == 0 else 'x' * (i % 40) for i in range(nrows)]]
+
+
+def output_run(assemble, nrows=200000, chunk=1000, size=4 << 20):
+    """Return MB/s and peak traced bytes per row of formatting and writing
+    COPY rows to /dev/null, by tuple lines or by chunks.
+
+    - bool assemble: whether to write chunks through an OutputSink, or
+      each line on its own as the encoded print function used to
+    """
+    import tracemalloc
+    from datafiller.models import PostgreSQL
+    from datafiller.output import OutputSink
+    db, cols = PostgreSQL(), output_columns(nrows)
+    written, peak = 0, 0
+    with open(os.devnull, 'wb') as f:
+        out = OutputSink(f, 'utf-8', size)
+        start = time.time()
+        for first in range(0, nrows, chunk):
+            part = [c[first:first + chunk] for c in cols]
+            traced = first == 0
+            if traced:
+                tracemalloc.start()
+            if assemble:
+                s = db.insertChunk(None, part, False)
+                out(s)
+                written += len(s) + 1
+            else:
+                for r in zip(*part):
+                    b = (db.insertValue(None, r, False) + '\n'). \
+                        encode('utf-8')
+                    f.write(b)
+                    f.flush()
+                    written += len(b)
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        out.flush()
+        seconds = time.time() - start
+    return written / seconds / 1e6, peak / float(chunk)
+
+
+def unique_run(nkeys=UNIQUE_KEYS, limit=None, directory=None):
+    """Return values per second, Bloom filter bytes and disk bytes of
+    checking then recording nkeys distinct values, and checking a tenth of
+    them again as retries would.
+
+    - int limit: in-memory bytes before spilling, None to stay in memory
+    - str directory: where to spill
+    """
+    from datafiller.unique import UniqueSet, fingerprint
+    s = UniqueSet()
+    s.configure(nkeys, limit, directory)
+    s.presize()
+    start = time.time()
+    for i in range(nkeys):
+        fp = fingerprint(0, (i, i))
+        s.put(fp, s.probe(fp))
+    for i in range(0, nkeys, 10):
+        assert fingerprint(0, (i, i)) in s, "value {0} not found".format(i)
+    seconds = time.time() - start
+    bloom = disk = 0
+    if s.spill:
+        bloom = len(s.spill.bloom)
+        for name in os.listdir(s.spill.path):
+            # files are sparse, count allocated blocks
+            disk += os.stat(os.path.join(s.spill.path, name)).st_blocks * 512
+    s.close()
+    return (nkeys + nkeys // 10) / seconds, bloom, disk
+
+
+def run_benchmarks(run, validate=None, size=None):
+    """Compare validation runs with and without options, return failures.
+
+    - int size: number of unique values, default UNIQUE_KEYS
+    """
+    fail = 0
+    for name, test, op in BENCHMARKS:
+        if validate and validate != test:
+            continue
+        try:
+            base, opt = bench_run(run, test), bench_run(run, test, op)
+        except AssertionError as e:
+            print("benchmark {0} {1}: FAIL ({2})".format(name, test, e))
+            fail += 1
+            continue
+        print("benchmark {0} {1} {2}: seconds={3:.2f}/{4:.2f} speedup={5:.2f}".
+              format(name, test, ' '.join(op), base, opt, base / opt))
+    # startup cost, paid by many runs with tiny --test directives
+    if not validate or validate == 'startup':
+        try:
+            seconds, okay, loaded = startup_check()
+            start = time.time()
+            p = run(['int size=10'], pipe=True, op=['--size=3'])
+            for line in p.stdout:
+                pass
+            assert p.wait() == 0, "tiny --test run failed"
+            test = time.time() - start
+        except AssertionError as e:
+            print("benchmark startup: FAIL ({0})".format(e))
+            return fail + 1
+        fail += not okay
+        print("benchmark startup import={0:.3f}/{1:.3f} test={2:.2f}{3}: {4}".
+              format(seconds, STARTUP_BUDGET, test,
+                     ' loaded=' + ','.join(loaded) if loaded else '',
+                     'PASS' if okay else 'FAIL'))
+    # memory and attribute access cost on many generator objects
+    if not validate or validate == 'synthetic':
+        try:
+            seconds, mb = schema_run(run, synthetic_schema())
+        except AssertionError as e:
+            print("benchmark memory synthetic: FAIL ({0})".format(e))
+            return fail + 1
+        print("benchmark memory synthetic tables={0:d}: seconds={1:.2f} "
+              "maxrss={2:.1f}MB".format(SYNTHETIC_TABLES, seconds, mb))
+    # output assembly, by lines and by chunks written with os.writev
+    if not validate or validate == 'output':
+        lines, chunks = output_run(False), output_run(True)
+        print("benchmark output lines/chunks: MB/s={0:.1f}/{1:.1f} "
+              "peak bytes/row={2:.0f}/{3:.0f}".
+              format(lines[0], chunks[0], lines[1], chunks[1]))
+    # unique values, in memory and spilled to disk with a Bloom filter
+    if not validate or validate == 'unique':
+        from datafiller.unique import UniqueSet
+        from datafiller.utils import humanSize
+        nkeys = size if size else UNIQUE_KEYS
+        # beyond UNIQUE_MAX_MEMORY, only the spilled set is run
+        memory = unique_run(nkeys) \
+            if UniqueSet.bytesFor(nkeys) <= UNIQUE_MAX_MEMORY else None
+        directory = tempfile.mkdtemp(prefix='datafiller_bench_')
+        try:
+            spilled = unique_run(nkeys, UNIQUE_MEMORY, directory)
+        finally:
+            os.rmdir(directory)
+        print("benchmark unique keys={0:d} memory/spilled: values/s={1}/"
+              "{2:.0f} bloom={3} disk={4}".
+              format(nkeys, '{0:.0f}'.format(memory[0]) if memory else '-',
+                     spilled[0], humanSize(spilled[1]),
+                     humanSize(spilled[2])))
+    return fail
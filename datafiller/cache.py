@@ -0,0 +1,198 @@
+from __future__ import print_function, unicode_literals
+
+import os
+import pickle
+import tempfile
+import time
+
+__author__ = "danishabdullah"
+__all__ = ('DataCache', 'ParseCache', 'fileStamps')
+
+
+def fileStamps(params):
+    """Return the path, size and modification time of files read by 'word'
+    and 'file' directives, so that --cache keys change with their contents.
+
+    - [{}] params: directive dicts
+    """
+    import glob
+    stamps = []
+    for p in params:
+        paths = []
+        word = p.get('word')
+        if isinstance(word, str) and word and word[0] != ':':
+            paths.append(word)
+        if isinstance(p.get('file'), str):
+            for f in p['file'].split(os.pathsep):
+                paths += sorted(glob.glob(f))
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stamps.append((path, st.st_size, st.st_mtime_ns))
+            except OSError:  # reported when the generator is created
+                stamps.append((path, None, None))
+    return stamps
+
+
+class DataCache(object):
+    """Content-addressed store of generated table contents in a directory.
+
+    Each entry is a pair of files named after its key: <key>.data holds
+    the encoded table output and <key>.state the generation state to carry
+    on with the next tables. Entries are evicted in least recently used
+    order, based on file modification times, to keep the whole cache
+    under max_bytes. Several processes may share a directory.
+
+    - str directory: where entries are stored
+    - int max_bytes: cache size limit, None for no limit
+    """
+    # block size when copying cached data
+    BLOCK = 1 << 20
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key, ext):
+        return os.path.join(self.directory, key + ext)
+
+    def get(self, key):
+        """Return the state of an entry and an open file on its data,
+        or None if the entry is not available."""
+        try:
+            with open(self.path(key, '.state'), 'rb') as f:
+                state = pickle.load(f)
+            data = open(self.path(key, '.data'), 'rb')
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # mark as recently used
+        now = time.time()
+        for ext in ('.data', '.state'):
+            try:
+                os.utime(self.path(key, ext), (now, now))
+            except OSError:
+                pass
+        return state, data
+
+    def copy(self, data, write):
+        """Copy data from an open file to function write, and close it."""
+        with data:
+            block = data.read(DataCache.BLOCK)
+            while block:
+                write(block)
+                block = data.read(DataCache.BLOCK)
+
+    def create(self):
+        """Return a temporary file to write the data of a new entry."""
+        fd, name = tempfile.mkstemp(prefix='.tmp_', dir=self.directory)
+        os.close(fd)
+        return open(name, 'wb')
+
+    def put(self, key, data, state):
+        """Store an entry from its temporary data file and its state.
+
+        The data file must be closed. The state is written last, so that an
+        entry is never seen with incomplete data.
+        """
+        os.rename(data.name, self.path(key, '.data'))
+        f = self.create()
+        with f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(f.name, self.path(key, '.state'))
+        self.evict(keep=key)
+
+    def discard(self, data):
+        """Drop a temporary data file, eg on a generation error."""
+        data.close()
+        try:
+            os.unlink(data.name)
+        except OSError:
+            pass
+
+    def evict(self, keep=None):
+        """Remove least recently used entries beyond max_bytes."""
+        if self.max_bytes == None:
+            return
+        entries, total = {}, 0
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext not in ('.data', '.state') or key.startswith('.'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:  # removed meanwhile
+                continue
+            size, mtime = entries.get(key, (0, 0.0))
+            entries[key] = (size + st.st_size, max(mtime, st.st_mtime))
+            total += st.st_size
+        for key in sorted(entries, key=lambda k: entries[k][1]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for ext in ('.state', '.data'):
+                try:
+                    os.unlink(self.path(key, ext))
+                except OSError:
+                    pass
+            total -= entries[key][0]
+
+
+class ParseCache(object):
+    """Store the parsed schema of a session in a file.
+
+    The file holds a header with the format, the script version and the key
+    of the parsed input, followed by the tables, enums, macros and schema
+    parameters. References to the session are not stored, they are bound to
+    the loading session.
+
+    - str path: cache file
+    """
+    # bump when parsed objects change
+    FORMAT = 1
+
+    def __init__(self, path):
+        self.path = path
+
+    def header(self, key):
+        from datafiller.options import VERSION
+        return (ParseCache.FORMAT, VERSION, key)
+
+    def load(self, session, key):
+        """Set parsed objects of session from the file, and return whether
+        it matched the key."""
+
+        class Unpickler(pickle.Unpickler):
+            def persistent_load(self, pid):
+                assert pid == 'session', "unexpected reference {0}".format(pid)
+                return session
+
+        try:
+            with open(self.path, 'rb') as f:
+                if pickle.load(f) != self.header(key):
+                    return False
+                tables, enums, macros, schema = Unpickler(f).load()
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return False
+        session.tables, session.enums, session.macros = tables, enums, macros
+        session.all_tables = dict((t.name.lower(), t) for t in tables)
+        session.schema = schema
+        return True
+
+    def save(self, session, key):
+        """Store parsed objects of session in the file."""
+
+        class Pickler(pickle.Pickler):
+            def persistent_id(self, obj):
+                return 'session' if obj is session else None
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, name = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(self.header(key), f, pickle.HIGHEST_PROTOCOL)
+            Pickler(f, pickle.HIGHEST_PROTOCOL).dump(
+                (session.tables, session.enums, session.macros,
+                 session.schema))
+        os.rename(name, self.path)
@@ -0,0 +1,94 @@
+from __future__ import print_function, unicode_literals
+
+import os
+import pickle
+import tempfile
+import time
+
+__author__ = "danishabdullah"
+__all__ = ('Checkpoint',)
+
+
+class Checkpoint(object):
+    """Record the progress of a generation in a file, so as to resume it.
+
+    A checkpoint holds the position of the generation, as a table index and
+    the number of its tuples already output, the output size at this point
+    and the generation state of the session. The output is synced before
+    the checkpoint file is replaced, so that it always holds at least the
+    recorded contents.
+
+    The state is recorded whole, including the values seen for unique
+    constraints, so a checkpoint costs time in proportion to these sets.
+    The interval is stretched so that checkpoints take at most 1/RATIO of
+    the generation time.
+
+    - str path: checkpoint file
+    - output: binary output file, must be seekable to resume
+    - str key: identifies the generation, a checkpoint only resumes its own
+    - float interval: minimum seconds between checkpoints
+    - float last: time of the last checkpoint
+    - float cost: seconds taken by the last checkpoint
+    """
+    # bump when the checkpoint contents change
+    FORMAT = 1
+    # generation time per checkpoint time
+    RATIO = 10
+
+    def __init__(self, path, output, key, interval):
+        self.path = path
+        self.output = output
+        self.key = key
+        self.interval = interval
+        self.last = time.time()
+        self.cost = 0.0
+
+    def due(self):
+        """Tell whether a checkpoint should be recorded now."""
+        return time.time() - self.last >= \
+            max(self.interval, Checkpoint.RATIO * self.cost)
+
+    def save(self, table, row, state):
+        """Record that tuples [0, row) of table number table are output.
+
+        - state: function returning the generation state to record
+        """
+        start = time.time()
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        data = {'format': Checkpoint.FORMAT, 'key': self.key, 'table': table,
+                'row': row, 'offset': self.output.tell(), 'state': state()}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, name = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(name, self.path)
+        self.last = time.time()
+        self.cost = self.last - start
+
+    def load(self):
+        """Truncate the output to the recorded contents and position it there,
+        then return the table index, row and session state to resume from."""
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError) as e:
+            raise AssertionError("cannot resume from checkpoint {0}: {1}".
+                                 format(self.path, e))
+        assert data.get('format') == Checkpoint.FORMAT and \
+            data.get('key') == self.key, \
+            "checkpoint {0} does not match this generation".format(self.path)
+        assert os.fstat(self.output.fileno()).st_size >= data['offset'], \
+            "output is shorter than checkpoint {0}".format(self.path)
+        self.output.seek(data['offset'])
+        self.output.truncate()
+        return data['table'], data['row'], data['state']
+
+    def remove(self):
+        """Drop the checkpoint once the generation is complete."""
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,200 @@
+from __future__ import print_function, unicode_literals
+
+import bisect
+import types
+
+from datafiller.generators.base import RandomGenerator, CatGenerator, AltGenerator, TupleGenerator
+from datafiller.generators.numeric import IntGenerator
+from datafiller.generators.pattern import PatternGenerator
+from datafiller.generators.reapeated import RepeatGenerator
+from datafiller.generators.textual import ConstGenerator, CharsGenerator
+
+__author__ = "danishabdullah"
+__all__ = ('TableCompiler', 'compileTable')
+
+
+class TableCompiler(object):
+    """Compile the generator trees of a table into flat python functions.
+
+    The compiled code draws exactly as walking the generator trees, so the
+    output is unchanged: constants are folded, bound methods are hoisted as
+    globals of the compiled code, and cat, alt, repeat, tuple and pattern
+    generators are inlined. Folded repetitions do not update the call
+    counter of their generator, which is never used for a fixed extent.
+
+    - Table table: table to compile
+    - dict env: globals of the compiled code
+    - str[] defs: source of helper definitions
+    - set strs: expressions known to evaluate to a string
+    - int count: number of names created so far
+    """
+    # generators inlined, by exact type as subclasses may override genData
+    INLINE = {ConstGenerator: 'constData', CatGenerator: 'catData',
+              AltGenerator: 'altData', TupleGenerator: 'tupleData',
+              RepeatGenerator: 'repeatData', PatternGenerator: 'patternData',
+              CharsGenerator: 'charsData'}
+
+    def __init__(self, table):
+        self.table = table
+        self.env = {'bisect_right': bisect.bisect_right}
+        self.defs = []
+        self.strs = set()
+        self.count = 0
+
+    def newName(self, prefix):
+        self.count += 1
+        return '{0}{1:d}'.format(prefix, self.count)
+
+    def hoist(self, obj, prefix='_h'):
+        """Return the name of a new global bound to obj."""
+        name = self.newName(prefix)
+        self.env[name] = obj
+        return name
+
+    def define(self, expr):
+        """Return the name of a new function returning expr."""
+        name = self.newName('_f')
+        self.defs.append('def {0}():\n    return {1}\n'.format(name, expr))
+        return name
+
+    @staticmethod
+    def literal(expr):
+        """Return whether expr is a literal, and its value."""
+        import ast
+        try:
+            return True, ast.literal_eval(expr)
+        except (ValueError, SyntaxError):
+            return False, None
+
+    def getData(self, g):
+        """Return an expression drawing as g.getData()."""
+        if type(g).getData is not RandomGenerator.getData:
+            return self.hoist(g.getData) + '()'
+        elif g.nullp == 1.0:
+            return 'None'
+        elif g.nullp == 0.0:
+            return self.genData(g)
+        else:
+            return '(None if {0}() < {1!r} else {2})'. \
+                format(self.hoist(g._rand.random), g.nullp, self.genData(g))
+
+    def genData(self, g):
+        """Return an expression drawing as g.genData()."""
+        method = TableCompiler.INLINE.get(type(g))
+        return getattr(self, method)(g) if method else \
+            self.hoist(g.genData) + '()'
+
+    def constData(self, g):
+        return repr(g.cst)
+
+    def catData(self, g):
+        parts = []  # [ literal string or None, expression ]
+        for c in g.gens:
+            expr = self.getData(c)
+            isLiteral, value = self.literal(expr)
+            if isLiteral and parts and parts[-1][1] == None:
+                parts[-1][0] += str(value)
+            elif isLiteral:
+                parts.append([str(value), None])
+            else:
+                parts.append([None, expr if expr in self.strs else
+                              'str({0})'.format(expr)])
+        exprs = [repr(s) if e == None else e for s, e in parts]
+        expr = "''" if not exprs else exprs[0] if len(exprs) == 1 else \
+            '(' + ' + '.join(exprs) + ')'
+        self.strs.add(expr)
+        return expr
+
+    def altData(self, g):
+        exprs = [self.genData(a) for a in g.alts]
+        literals = [self.literal(e) for e in exprs]
+        if all(isLiteral for isLiteral, value in literals):
+            choice = self.hoist(tuple(value for isLiteral, value in literals),
+                                '_t') + '[{0}]'
+        else:
+            funcs = [self.define(e) for e in exprs]
+            name = self.newName('_t')
+            self.defs.append('{0} = ({1},)\n'.format(name, ', '.join(funcs)))
+            choice = name + '[{0}]()'
+        # same weighted choice as AltGenerator.genData
+        draw = '{0}({1:d})'.format(self.hoist(g._rand.randrange),
+                                   g.total_weight)
+        if any(w != 1 for w in g.weight):
+            cumul, total = [], 0
+            for w in g.weight:
+                total += w
+                cumul.append(total)
+            draw = 'bisect_right({0}, {1})'. \
+                format(self.hoist(cumul, '_w'), draw)
+        return choice.format(draw)
+
+    def tupleData(self, g):
+        if not g.gens:
+            return '()'
+        return '(' + ', '.join(self.getData(c) for c in g.gens) + ',)'
+
+    def repeatData(self, g):
+        sub = self.genData(g.subgen)
+        isLiteral, value = self.literal(sub)
+        isLiteral = isLiteral and isinstance(value, type(''))
+        if g.size == 1 and isLiteral:
+            expr = repr(''.join([value] * g.offset))
+        else:
+            count = repr(g.offset) if g.size == 1 else \
+                self.hoist(types.MethodType(IntGenerator.genData, g)) + '()'
+            expr = '({0} * {1})'.format(sub, count) if isLiteral else \
+                "''.join([{0} for i in range({1})])".format(sub, count)
+        self.strs.add(expr)
+        return expr
+
+    def patternData(self, g):
+        return self.genData(g.root)
+
+    def charsData(self, g):
+        # single characters from patterns, see CharsGenerator.lenData
+        if g.lenmin != 1 or g.lenmax != 1:
+            return self.hoist(g.genData) + '()'
+        name = self.newName('_f')
+        reseed = self.hoist(g.subgen._rand.seed)
+        number = self.hoist(types.MethodType(IntGenerator.genData, g))
+        chars = self.hoist(g.chars)
+        self.defs.append('def {0}():\n'
+                         '    {1}({2!r} + str({3}()))\n'
+                         '    return {4}[{5}]\n'.
+                         format(name, reseed, g.seed, number, chars,
+                                self.genData(g.subgen)))
+        expr = name + '()'
+        self.strs.add(expr)
+        return expr
+
+    def compile(self):
+        """Return the row function and the column functions of the table.
+
+        The row function returns the list of values of a tuple.
+        A column function returns a list of n values of an attribute, and is
+        None if its generator is not inlined, as its batch is faster then.
+        """
+        table = self.table
+        exprs = [self.getData(a.gen) for a in table.gen_atts]
+        source = ''.join(self.defs)
+        source += 'def row():\n    return [{0}]\n'.format(', '.join(exprs))
+        columns = []
+        for i, a in enumerate(table.gen_atts):
+            if type(a.gen) in TableCompiler.INLINE:
+                columns.append('col{0:d}'.format(i))
+                source += 'def col{0:d}(n):\n' \
+                          '    return [{1} for i in range(n)]\n'. \
+                    format(i, exprs[i])
+            else:
+                columns.append(None)
+        if table.session.opts.debug:
+            table.session.debug(2, "compiled table {0}:\n{1}".
+                                format(table.name, source))
+        exec(compile(source, '<table {0}>'.format(table.name), 'exec'),
+             self.env)
+        return self.env['row'], [self.env[c] if c else None for c in columns]
+
+
+def compileTable(table):
+    """Return compiled row and column functions for table."""
+    return TableCompiler(table).compile()
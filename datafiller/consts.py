@@ -4,6 +4,26 @@ __author__ = "danishabdullah"
 
 import re
 
+
+class LazyRegex(object):
+    """Regular expression compiled on first use, to keep startup fast.
+
+    Most runs, eg with --test, never parse a schema. Attributes of the
+    compiled expression, eg its match method, are then set on the instance,
+    so that later calls do not go through __getattr__.
+    """
+
+    def __init__(self, pattern, flags=0):
+        self.pattern, self.flags, self.regex = pattern, flags, None
+
+    def __getattr__(self, name):
+        if self.regex is None:
+            self.regex = re.compile(self.pattern, self.flags)
+        value = getattr(self.regex, name)
+        setattr(self, name, value)
+        return value
+
+
 # escaped list of caracters for . in regular expressions
 RE_DOT = r' -~'  # from ASCII 0x20 to 0x7E
 RE_POSIX_CC = { \
@@ -52,74 +72,75 @@ RE_ARRAY = r'((\s+ARRAY)?(\s*\[[][0-9 ]*\])?)?'
 RE_ALLT = r'({0}){1}'.format(RE_TYPE, RE_ARRAY)
 
 # SQL syntax
-new_object = re.compile(r"^\s*({0})\s".format(RE_CMD), re.I)
+new_object = LazyRegex(r"^\s*({0})\s".format(RE_CMD), re.I)
 # 1=table name, [2, 3]
 create_table = \
-    re.compile(r'^\s*CREATE\s+TABLE\s*({0})\s*\('.format(RE_IDENT2), re.I)
+    LazyRegex(r'^\s*CREATE\s+TABLE\s*({0})\s*\('.format(RE_IDENT2), re.I)
 # 1=type name, [2, 3]
 create_enum = \
-    re.compile(r'^\s*CREATE\s+TYPE\s+({0})\s+AS\s+ENUM'.format(RE_IDENT2), re.I)
+    LazyRegex(r'^\s*CREATE\s+TYPE\s+({0})\s+AS\s+ENUM'.format(RE_IDENT2), re.I)
 # 1=type
 create_type = \
-    re.compile(r'\s*CREATE\s+TYPE\s+({0})\s+AS'.format(RE_IDENT2), re.I)
+    LazyRegex(r'\s*CREATE\s+TYPE\s+({0})\s+AS'.format(RE_IDENT2), re.I)
 
 # 1=?, 2=column, 3=type
 r_column = r'^\s*,?\s*(ADD\s+COLUMN\s+)?({0})\s+({1})'.format(RE_IDENT, RE_ALLT)
-column = re.compile(r_column, re.I)
-is_int = re.compile(r'^({0})$'.format(RE_INT), re.I)
-is_ser = re.compile(r'^({0})$'.format(RE_SER), re.I)
-# enums are added when definitions are encountered
-column_enum = None
+column = LazyRegex(r_column, re.I)
+is_int = LazyRegex(r'^({0})$'.format(RE_INT), re.I)
+is_ser = LazyRegex(r'^({0})$'.format(RE_SER), re.I)
 
 s_reference = \
     r'.*\sREFERENCES\s+({0})\s*(\(({1})\))?'.format(RE_IDENT2, RE_IDENT)
 # 1=table, [2, 3], 4=?, 5=dest columns (?)
-reference = re.compile(s_reference, re.I)
-primary_key = re.compile('.*\sPRIMARY\s+KEY', re.I)
-unique = re.compile(r'.*\sUNIQUE', re.I)
-not_null = re.compile(r'.*\sNOT\s+NULL', re.I)
+reference = LazyRegex(s_reference, re.I)
+primary_key = LazyRegex('.*\sPRIMARY\s+KEY', re.I)
+unique = LazyRegex(r'.*\sUNIQUE', re.I)
+not_null = LazyRegex(r'.*\sNOT\s+NULL', re.I)
 s_unicity = r'.*(UNIQUE|PRIMARY\s+KEY)\s*\(([^\)]+)\)'
 # 1=unicity type, 2=columns
-unicity = re.compile(s_unicity, re.I)
+unicity = LazyRegex(s_unicity, re.I)
 # 1=?, 2=table name, [3, 4]
 alter_table = \
-    re.compile(r'\s*ALTER\s+TABLE\s+(ONLY\s+)?({0})'.format(RE_IDENT2), re.I)
+    LazyRegex(r'\s*ALTER\s+TABLE\s+(ONLY\s+)?({0})'.format(RE_IDENT2), re.I)
 add_constraint = r',?\s*ADD\s+CONSTRAINT\s+({0})\s+'.format(RE_IDENT)
 # 1=constraint name, 2=unicity type, 3=columns
-add_unique = re.compile(add_constraint + s_unicity, re.I)
+add_unique = LazyRegex(add_constraint + s_unicity, re.I)
 # 1=constraint_name, 2=source columns, 3=table, [4, 5], 6=, 7=dest columns
 add_fk = \
-    re.compile(add_constraint + r'FOREIGN\s+KEY\s*\(([^\)]+)\)' + s_reference,
+    LazyRegex(add_constraint + r'FOREIGN\s+KEY\s*\(([^\)]+)\)' + s_reference,
                re.I)
 # 1=column
-alter_column = re.compile(r',?\s*ALTER\s+COLUMN\s+({0})'.format(RE_IDENT), re.I)
+alter_column = LazyRegex(r',?\s*ALTER\s+COLUMN\s+({0})'.format(RE_IDENT), re.I)
 
 # DETECT DATAFILLER DIRECTIVES
 # commented-out directives, say '--- df...' or '---- df...' or '-- -- df...'
-df_junk = re.compile('.*?--.*-\s*df.*')
+df_junk = LazyRegex('.*?--.*-\s*df.*')
 # simple directive: 1=contents
-df_dir = re.compile(r'.*--\s*df[^:]*:\s*(.*)')
+df_dir = LazyRegex(r'.*--\s*df[^:]*:\s*(.*)')
 # macro definition: 1=name, 2=contents
-df_mac = re.compile(r'.*--\s*df\s+([\w\.]+)\s*:\s*(.*)')
+df_mac = LazyRegex(r'.*--\s*df\s+([\w\.]+)\s*:\s*(.*)')
 # explicit table: 2=name
 df_tab = \
-    re.compile(r'.*--\s*df[^:]*\s+(t|table)=({0})(\s|:)'. \
+    LazyRegex(r'.*--\s*df[^:]*\s+(t|table)=({0})(\s|:)'. \
                format(RE_IDENT2), re.I)
 # explicit attribute: 2=name
 df_att = \
-    re.compile(r'.*--\s*df[^:]*\s+(a|att|attribute)=({0})(\s|:)'. \
+    LazyRegex(r'.*--\s*df[^:]*\s+(a|att|attribute)=({0})(\s|:)'. \
                format(RE_IDENT), re.I)
 # string/float/int directives: 1=name 2=value 3=reminder
-df_txt = re.compile(r'(\w+)=\'([^\']*)\'\s+(.*)')
-df_flt = re.compile(r'(\w+)=(-?\d+\.\d*)\s+(.*)')
-df_int = re.compile(r'(\w+)=(-?\d+)\s+(.*)')
-df_str = re.compile(r'(\w+)=(\S*)\s+(.*)')
+df_txt = LazyRegex(r'(\w+)=\'([^\']*)\'\s+(.*)')
+df_flt = LazyRegex(r'(\w+)=(-?\d+\.\d*)\s+(.*)')
+df_int = LazyRegex(r'(\w+)=(-?\d+)\s+(.*)')
+df_str = LazyRegex(r'(\w+)=(\S*)\s+(.*)')
 # simple directive: 1=name 2=reminder
-df_bol = re.compile(r'(\w+)\s+(.*)')
+df_bol = LazyRegex(r'(\w+)\s+(.*)')
+
+# quoted sql strings: 1=contents, 3=reminder
+re_quoted = LazyRegex(r"[^']*'(([^']|'')*)'(.*)")
 
 # remove SQL comments & \xxx commands
-comments = re.compile(r'(.*?)\s*--.*')
-backslash = re.compile(r'\s*\\')
+comments = LazyRegex(r'(.*?)\s*--.*')
+backslash = LazyRegex(r'\s*\\')
 
 # some ASCII control characters
 UCHARS = {'0': '\0', 'a': '\a', 'b': '\b', 'f': '\f', \
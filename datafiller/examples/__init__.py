@@ -1,3 +1,45 @@
 from __future__ import print_function, unicode_literals
 
+import re
+
 __author__ = "danishabdullah"
+__all__ = ('EXAMPLES', 'example')
+
+# example name: resource file, only read when used by --validate or --man
+EXAMPLES = {
+    'pgbench': 'pgbench.sql',
+    # embedded PostgreSQL validation
+    'internal': 'internal.schema.sql',
+    # some checks about the internal schema
+    # other checks are implicitely performed for contraints.
+    # some of these test occasionnaly fail with a low probability, eg s5
+    'internal_check': 'internal.schema.check.sql',
+    'comics': 'comics.sql',
+    'library': 'library.sql'}
+
+_cache = {}
+
+
+def _read(fname):
+    try:
+        from importlib.resources import files
+        return files(__name__).joinpath(fname).read_text(encoding='utf-8')
+    except ImportError:  # python < 3.9
+        import io, os
+        path = os.path.join(os.path.dirname(__file__), fname)
+        with io.open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+def example(name):
+    """Return the text of an example schema, read on first use.
+
+    'library_nodir' is the library example without its directives.
+    """
+    if name not in _cache:
+        if name == 'library_nodir':
+            _cache[name] = re.sub(r'-- df.*', '', example('library'))
+        else:
+            assert name in EXAMPLES, "unexpected example {0}".format(name)
+            _cache[name] = _read(EXAMPLES[name])
+    return _cache[name]
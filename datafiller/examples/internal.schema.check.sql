@@ -34,7 +34,7 @@ IMMUTABLE STRICT AS $$
   SELECT d BETWEEN val-epsilon AND val+epsilon;
 $$ LANGUAGE SQL;
 
-\\echo '# generator checks'
+\echo '# generator checks'
 SELECT
   -- check ints
   df.assert('skewed power',
@@ -101,13 +101,13 @@ SELECT
             COUNT(DISTINCT (h0, h1, h2, h3, h4, h5, h6)), 11) AS "h0-6"
 FROM df.stuff;
 
-\\echo '# foreign key checks'
+\echo '# foreign key checks'
 SELECT
   df.assert('fk2', df.value(AVG(df.oitez(fk2 IS NULL)), 0.5, 0.1)) AS "fk2"
 , df.assert('fka', df.value(AVG(df.oitez(fka = 1000000)), 0.2, 0.05)) AS "fka"
 FROM df.ForeignKeys;
 
-\\echo '# miscellaneous checks'
+\echo '# miscellaneous checks'
 SELECT
   df.assert_eq('ten', COUNT(*), 10) AS "ten"
 , df.assert_eq('123', SUM(df.oitez(nogen=123)), 10) AS "123"
@@ -116,9 +116,14 @@ SELECT
 , df.assert_eq('c1', COUNT(DISTINCT c1), 10) AS "c1"
 FROM df.Ten;
 
-\\echo '# skip check'
+\echo '# skip check'
 SELECT
   df.assert('skip', COUNT(*) BETWEEN 50 AND 150) AS "skip"
 FROM df.Skip;
 
+\echo '# compound unique check'
+SELECT
+  df.assert_eq('pairs', COUNT(DISTINCT (a, b)), 6) AS "pairs"
+FROM df.Pairs;
+
 DROP SCHEMA df CASCADE;
\ No newline at end of file
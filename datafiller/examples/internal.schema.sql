@@ -126,8 +126,8 @@ CREATE TABLE df.Stuff( -- df: mult=1.0
   -- df: inet='10.0.0.0/8'
 , sc TEXT NOT NULL CHECK(sc ~ '^([0-9A-F][0-9A-F]:){5}[0-9A-F][0-9A-F]$')
   -- df: mac
-, sd TEXT NOT NULL CHECK(sd ~ '^[ \\007\\n\\f\\v\\t\\r\\\\]{10}')
-  -- df: chars=' \\a\\n\\t\\f\\r\\v\\\\' length=10 lenvar=0
+, sd TEXT NOT NULL CHECK(sd ~ '^[ \007\n\f\v\t\r\\]{10}')
+  -- df: chars=' \a\n\t\f\r\v\\' length=10 lenvar=0
   -- user defined *** ENUM ***
 , e0 df.color NOT NULL
   -- *** EAN *** and other numbers
@@ -289,6 +289,13 @@ CREATE TABLE df.Skip( -- df: skip=0.9 size=1000
 , data CHAR(3) NOT NULL CHECK(data = 'C&H') -- df: const='C&H'
 );
 
+-- more pairs than positive integers, negative ones must be told apart
+CREATE TABLE df.Pairs( -- df: size=6
+  a INTEGER NOT NULL CHECK(a BETWEEN -2 AND -1) -- df: offset=-2 size=2
+, b INTEGER NOT NULL CHECK(b BETWEEN 1 AND 5) -- df: offset=1 size=5
+, UNIQUE(a, b)
+);
+
 -- one may set a directive after the table definition
 -- df T=df.Stuff A=a1: size=3 offset=3
 
@@ -325,7 +332,7 @@ CREATE TABLE df.Pattern(
 , pf TEXT NOT NULL CHECK(pf = '') -- df: pattern='(){5,10}'
 , pg TEXT NOT NULL CHECK(pg ~ '^(0[a-z]0|1[A-Z]1)$')
    -- df: pattern='0[a-z]0|1[A-Z]1'
-, ph TEXT NOT NULL CHECK(ph = '[(|?{') -- df: pattern='\\[\\(\\|\\?\\{'
+, ph TEXT NOT NULL CHECK(ph = '[(|?{') -- df: pattern='\[\(\|\?\{'
 , pi TEXT NOT NULL CHECK(pi ~ '^0{0,8}1{1,8}2{0,1}$') -- df: pattern='0*1+2?'
 , pj TEXT NOT NULL CHECK(pj ~ '^.{2,9}$') -- df: pattern='..+'
 , pk TEXT NOT NULL CHECK(pk ~ '^A[0-9]{1,8}[0-9a-f][0-9A-F]!$')
@@ -335,7 +342,7 @@ CREATE TABLE df.Pattern(
 , pn TEXT NOT NULL CHECK(pn ~ '^[0-9A-Fa-f][0-9][a-z][A-Z]$')
   -- df: pattern='[:xdigit:][:digit:][:lower:][:upper:]'
 , po TEXT NOT NULL CHECK(po ~ '^[€œ௲ℝ가𝄞]{1,8}$')
-  -- df: pattern='[\\u20ac\\u0153\\U00000bf2\\u211d\\uAC00\\U0001D11E]+'
+  -- df: pattern='[\u20ac\u0153\U00000bf2\u211d\uAC00\U0001D11E]+'
 , pq df.stuffit NOT NULL CHECK(pq ~ '^(Calvin|Hobbes|Susie|Moe|Rosalyn)$')
 , pr df.bluff NOT NULL CHECK(pr ~ '^bluff_[_\d]+$') -- df: string prefix=bluff
 );
@@ -2,16 +2,18 @@ from __future__ import print_function, unicode_literals
 
 import sys
 
-from datafiller.scripts.cli import opts
-
 __author__ = "danishabdullah"
 __all__ = ('StdoutExitError',)
 
 
 class StdoutExitError(BaseException):
-    """Exception class used for unit tests."""
+    """Exception class used for unit tests.
+
+    The message is shown on stdout, and the process exits unless debugging.
+    """
 
-    def __init__(self, msg=''):
+    def __init__(self, msg='', debug=False):
+        BaseException.__init__(self, msg)
         print('## ' + msg)
-        if not opts.debug:
+        if not debug:
             sys.exit(1)
@@ -10,11 +10,12 @@ __all__ = ('ArrayGenerator',)
 
 class ArrayGenerator(WithSubgen, WithLength, IntGenerator):
     """Generate list from another generator."""
+    __slots__ = ('subgen', 'lenmin', 'lenmax')
     DIRS = {'array': str}
 
     def __init__(self, att=None, params=None, dir='array',
-                 lenmin=5, lenmax=25, gen=None):
-        IntGenerator.__init__(self, att, params)
+                 lenmin=5, lenmax=25, gen=None, session=None):
+        IntGenerator.__init__(self, att, params, session)
         if gen:
             assert not dir in self.params  # constructor consistency
             self.subgen = gen
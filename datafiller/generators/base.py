@@ -1,14 +1,10 @@
 from __future__ import print_function, unicode_literals
 
-import random
 import re
 
-from datafiller.generators import IntGenerator
 from datafiller.generators.funcs import macroGenerator, strDict, createGenerator
-from datafiller.generators.shared import SharedGenerator
-from datafiller.globals import tuple_count, df_macro
-from datafiller.scripts.cli import opts
-from datafiller.utils import debug, reduce
+from datafiller.rng import newRandom
+from datafiller.utils import reduce
 
 __author__ = "danishabdullah"
 
@@ -25,7 +21,8 @@ class Generator(object):
     They may depend on a random generator.
     The framework also allows to generate NULL values.
 
-    - {} params: parameters
+    - {} params: parameters, dropped once validated
+    - Session session: generation session, from att if not given
     - Attribute att: attribute (may be None in some cases)
     - str type: type to consider, possibly from att
     - float nullp: NULL value rate
@@ -33,11 +30,14 @@ class Generator(object):
     - int size: number of underlying values (may be None)
     """
     # expected/allowed directives
+    __slots__ = ('session', 'att', 'params', 'type', 'nullp', 'gens', 'size',
+                 'shared')
     DIRS = {'null': float, 'type': str}
 
-    def __init__(self, att, params=None):
-        global generator_count
-        generator_count += 1
+    def __init__(self, att, params=None, session=None):
+        self.session = session if session else att.session
+        self.session.generator_count += 1
+        opts = self.session.opts
         self.att = att
         self.params = {}
         self.params.update(params if params != None else \
@@ -45,7 +45,8 @@ class Generator(object):
                                    {})
         # show generators
         if opts.debug:
-            debug(1, "{0}: {1} {2}".format(att, generator_count,
+            debug = self.session.debug
+            debug(1, "{0}: {1} {2}".format(att, self.session.generator_count,
                                            self.__class__))
             debug(2, "params: {0}".format(strDict(self.params)))
         self.type = self.params['type'].lower() if 'type' in self.params else \
@@ -73,6 +74,10 @@ class Generator(object):
             if d in self.params:
                 del self.params[d]
 
+    def dropParams(self):
+        """Release parameters once all have been validated."""
+        self.params = None
+
     def mapGen(self, func):
         """Apply func on all generators."""
         func(self)
@@ -97,9 +102,54 @@ class Generator(object):
         """Generate actual data."""
         return None
 
+    def genBatch(self, n):
+        """Generate a list of n actual data.
+
+        The default falls back on genData(), subclasses may do better.
+        """
+        genData = self.genData
+        return [genData() for i in range(n)]
+
+    def getBatch(self, n):
+        """Generate a list of n data, NULL handling included."""
+        return self.genBatch(n)
+
+    def perTuple(self):
+        """Whether generated data depends on the current tuple."""
+        return bool(getattr(self, 'shared', None))
+
+    def isCounter(self):
+        """Whether generated data depends on the number of previous calls."""
+        return False
+
+    def isDistinct(self, n):
+        """Whether the first n generated data are all distinct."""
+        return False
+
+    def seek(self, row):
+        """Position the call counter as if row values were generated."""
+        self.gens = row
+
+    def rekey(self, row):
+        """Reset random state to its value for tuple number row."""
+        pass
+
+    def getState(self):
+        """Return the state changed by generation, see setState."""
+        # gens is not set on wrappers such as PersistentGenerator
+        return {'gens': getattr(self, 'gens', None)}
+
+    def setState(self, state):
+        """Restore a state returned by getState."""
+        self.gens = state['gens']
+
 
 class WithSubgen(Generator):
-    """Set a sub-generator from a macro or parameters."""
+    """Set a sub-generator from a macro or parameters.
+
+    Attribute subgen is a slot of subclasses.
+    """
+    __slots__ = ()
     DIRS = {}
 
     def __init__(self, name=None, att=None, p={}, g=None, backup=False):
@@ -109,10 +159,11 @@ class WithSubgen(Generator):
             assert (p and name in p) or backup, \
                 "{0}: mandatory '{1}' directive".format(self, name)
             if p and name in p:
-                self.subgen = macroGenerator(p[name], att)
+                self.subgen = macroGenerator(p[name], att, self.session)
                 del p[name]
             else:
-                self.subgen = IntGenerator(att)
+                from datafiller.generators.numeric import IntGenerator
+                self.subgen = IntGenerator(att, session=self.session)
         if self.shared and self.subgen:
             self.subgen.shared = self.shared
         self.cleanParams(WithSubgen.DIRS)
@@ -126,17 +177,21 @@ class WithSubgen(Generator):
 class RandomGenerator(Generator):
     """Generate something based on random, possibly seeded.
 
-    - Random _random: internal random number generator, possibly seeded
+    - Random _rand: internal random number generator, possibly seeded,
+      from the backend selected with option --rng
     """
+    __slots__ = ('_rand', 'seed')
     DIRS = {'share': str, 'seed': str}
 
-    def __init__(self, att, params=None):
-        Generator.__init__(self, att, params)
-        self._rand = random.Random()
+    def __init__(self, att, params=None, session=None):
+        Generator.__init__(self, att, params, session)
+        opts = self.session.opts
+        self._rand = newRandom(opts.rng)
         # set generator seed, depending on the determinism requirements
         # self.seed = <gc>_(<share>_)?<seed/opts.seed/random>_
-        self.seed = str(generator_count) + '_'
+        self.seed = str(self.session.generator_count) + '_'
         if 'share' in self.params:
+            from datafiller.generators.shared import SharedGenerator
             self.shared = \
                 SharedGenerator.getGenerator(self, self.params['share'])
             # what about self.shared.seed?
@@ -152,7 +207,7 @@ class RandomGenerator(Generator):
         #    self.seed = self.att.table.name + '_' + self.att.name + '_'
         else:
             # is it necessary/useful? depending on python version?
-            self.seed += str(random.random()) + '_'
+            self.seed += str(self.session.random.random()) + '_'
         if not self.shared:
             self._rand.seed(self.seed)
         # else: it will be reseeded for each tuple in shareSeed, when called
@@ -167,6 +222,19 @@ class RandomGenerator(Generator):
         self.shared = shared
         super(RandomGenerator, self).setShare(shared)  # pass
 
+    def rekey(self, row):
+        self._rand.seed(self.seed + str(row))
+
+    def getState(self):
+        state = super(RandomGenerator, self).getState()
+        state['rand'] = self._rand.getstate()
+        return state
+
+    def setState(self, state):
+        super(RandomGenerator, self).setState(state)
+        # in place, compiled tables hold bound methods of _rand
+        self._rand.setstate(state['rand'])
+
     def getData(self):
         """Generate a NULL or some data with genData()."""
         # only call the random generated if really needed
@@ -175,10 +243,21 @@ class RandomGenerator(Generator):
                 None if self._rand.random() < self.nullp else \
                     self.genData()
 
+    def getBatch(self, n):
+        """Generate a list of n NULL or data, with the same draws as getData()."""
+        if self.nullp == 1.0:
+            return [None] * n
+        elif self.nullp == 0.0:
+            return self.genBatch(n)
+        else:
+            rand, nullp, genData = self._rand.random, self.nullp, self.genData
+            return [None if rand() < nullp else genData() for i in range(n)]
+
 
 class WithLength(Generator):
-    """Set {min,max}len attributes."""
+    """Set {min,max}len attributes, slots of subclasses."""
     # this is needed by String, Text & Blob...
+    __slots__ = ()
     DIRS = {'lenmin': int, 'lenmax': int, 'length': int, 'lenvar': int}
 
     def __init__(self, lenmin=None, lenmax=None):
@@ -227,16 +306,17 @@ class WithLength(Generator):
 
 class NULLGenerator(Generator):
     """Generate a NULL value."""
+    __slots__ = ()
     DIRS = {}
 
-    def __init__(self, att=None, params=None):
+    def __init__(self, att=None, params=None, session=None):
         # check 'null'
         self.att = att
         p = params if params else att.params if att else {}
         if 'null' in p:
             assert p['null'] == 1.0, \
                 "{0}: 'null' is {1} instead of 1.0".format(self, p['null'])
-        Generator.__init__(self, att, params)
+        Generator.__init__(self, att, params, session)
         self.cleanParams(NULLGenerator.DIRS)
 
     def genData(self):
@@ -245,16 +325,24 @@ class NULLGenerator(Generator):
     def getData(self):
         return None
 
+    def genBatch(self, n):
+        return [None] * n
+
+    def getBatch(self, n):
+        return [None] * n
+
 
 class ListGenerator(RandomGenerator):
     """Generate from a list of generators.
 
     - Generator[] gens
     """
+    __slots__ = ()
     DIRS = {}
 
-    def __init__(self, att=None, params=None, name=None, gens=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att=None, params=None, name=None, gens=None,
+                 session=None):
+        RandomGenerator.__init__(self, att, params, session)
         if gens:
             assert not params
             assert not name in self.params
@@ -264,8 +352,10 @@ class ListGenerator(RandomGenerator):
                 "{0}: mandatory '{1}' directive".format(self, name)
             l = self.params[name]
             if l:
-                self.gens = [macroGenerator(n) if n in df_macro else \
-                                 createGenerator(None, n, {}) \
+                session = self.session
+                self.gens = [macroGenerator(n, session=session)
+                             if n in session.macros else
+                             createGenerator(None, n, {}, session=session)
                              for n in l.split(',')]
             else:
                 self.gens = []
@@ -276,16 +366,30 @@ class ListGenerator(RandomGenerator):
         super(ListGenerator, self).mapGen(func)
         list(map(lambda g: g.mapGen(func), self.gens))
 
+    def seek(self, row):
+        # self.gens holds sub-generators, not a call counter
+        pass
+
+    def getState(self):
+        # sub-generators in self.gens have their own state, see mapGen
+        state = super(ListGenerator, self).getState()
+        del state['gens']
+        return state
+
+    def setState(self, state):
+        self._rand.setstate(state['rand'])
+
     def genData(self):
         return [c.getData() for c in self.gens]
 
 
 class CatGenerator(ListGenerator):
     """Generate by concatenating texts from other generators. """
+    __slots__ = ()
     DIRS = {'cat': str}
 
-    def __init__(self, att=None, params=None, gens=None):
-        ListGenerator.__init__(self, att, params, 'cat', gens)
+    def __init__(self, att=None, params=None, gens=None, session=None):
+        ListGenerator.__init__(self, att, params, 'cat', gens, session)
         self.cleanParams(CatGenerator.DIRS)
 
     def genData(self):
@@ -294,10 +398,11 @@ class CatGenerator(ListGenerator):
 
 class TupleGenerator(ListGenerator):
     """Generate a tuple"""
+    __slots__ = ()
     DIRS = {'tuple': str}
 
-    def __init__(self, att=None, params=None):
-        ListGenerator.__init__(self, att, params, 'tuple')
+    def __init__(self, att=None, params=None, session=None):
+        ListGenerator.__init__(self, att, params, 'tuple', session=session)
         self.cleanParams(TupleGenerator.DIRS)
 
     def genData(self):
@@ -306,6 +411,7 @@ class TupleGenerator(ListGenerator):
 
 class ReduceGenerator(ListGenerator):
     """Reduce a list of float generators"""
+    __slots__ = ('op',)
     DIRS = {'reduce': str, 'op': str}
     OPS = {'+': (lambda a, b: float(a) + float(b)),
            '*': (lambda a, b: float(a) * float(b)),
@@ -314,8 +420,8 @@ class ReduceGenerator(ListGenerator):
            # this is really akin to CatGenerator
            'cat': (lambda a, b: str(a) + str(b))}
 
-    def __init__(self, att=None, params=None):
-        ListGenerator.__init__(self, att, params, 'reduce')
+    def __init__(self, att=None, params=None, session=None):
+        ListGenerator.__init__(self, att, params, 'reduce', session=session)
         op = self.params.get('op', '+')
         assert op in ReduceGenerator.OPS, \
             "{0}: unexpected operation '{1}', expecting {2}". \
@@ -334,10 +440,11 @@ class AltGenerator(RandomGenerator):
     - int[] weight: their respective weights
     - int total_weight: sum of weights
     """
+    __slots__ = ('alts', 'weight', 'total_weight')
     DIRS = {'alt': str}
 
-    def __init__(self, att=None, params=None, gens=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att=None, params=None, gens=None, session=None):
+        RandomGenerator.__init__(self, att, params, session)
         if gens != None:
             assert not params
             self.alts = gens
@@ -346,6 +453,7 @@ class AltGenerator(RandomGenerator):
         else:
             assert 'alt' in self.params, \
                 "{0}: mandatory 'alt' directive".format(self)
+            from datafiller.generators.numeric import IntGenerator
             self.alts = []
             self.weight = []
             self.total_weight = 0
@@ -358,12 +466,12 @@ class AltGenerator(RandomGenerator):
                 else:
                     m, w = mw, 1
                 assert w > 0, "{0}: weight {1} must be > 0".format(self, w)
-                gen = macroGenerator(m)
+                gen = macroGenerator(m, session=self.session)
                 self.alts.append(gen)
                 self.weight.append(w)
                 self.total_weight += w
                 if isinstance(gen, IntGenerator) and gen.size == None:  # ???
-                    gen.setSize(opts.size)
+                    gen.setSize(self.session.opts.size)
         self.cleanParams(AltGenerator.DIRS)
 
     def mapGen(self, func):
@@ -380,7 +488,11 @@ class AltGenerator(RandomGenerator):
 
 
 class WithPersistent(Generator):
-    """Persistent value per tuple."""
+    """Persistent value per tuple.
+
+    Attributes last_tuple_count and last_value are slots of subclasses.
+    """
+    __slots__ = ()
 
     def __init__(self):
         self.last_tuple_count = 0
@@ -389,7 +501,20 @@ class WithPersistent(Generator):
     def super(self):
         return super(WithPersistent, self)
 
+    def perTuple(self):
+        return True
+
+    def getState(self):
+        state = super(WithPersistent, self).getState()
+        state['last'] = (self.last_tuple_count, self.last_value)
+        return state
+
+    def setState(self, state):
+        super(WithPersistent, self).setState(state)
+        self.last_tuple_count, self.last_value = state['last']
+
     def genData(self):
+        tuple_count = self.session.tuple_count
         if self.last_tuple_count != tuple_count:
             self.last_tuple_count = tuple_count
             self.last_value = self.super().genData()
@@ -398,9 +523,11 @@ class WithPersistent(Generator):
 
 class PersistentGenerator(WithPersistent):
     """Encapsulate a generator to make it persistent."""
+    __slots__ = ('last_tuple_count', 'last_value', 'gen')
 
     def __init__(self, gen):
         WithPersistent.__init__(self)
+        self.session = gen.session
         self.gen = gen
 
     def super(self):  # hmmm...
@@ -412,19 +539,22 @@ class PersistentGenerator(WithPersistent):
 
 
 class ValueGenerator(Generator):
-    """Generate a constant value per tuple"""
-    values = {}
+    """Generate a constant value per tuple.
+
+    Persistent generators are registered in the session by macro name.
+    """
+    __slots__ = ('value',)
     DIRS = {'value': str}
 
-    def __init__(self, att, params):
-        Generator.__init__(self, att, params)
+    def __init__(self, att, params, session=None):
+        Generator.__init__(self, att, params, session)
         assert 'value' in self.params, \
             "{0}: mandatory 'value' directive".format(self)
-        value = self.params['value']
-        if not value in ValueGenerator.values:
-            ValueGenerator.values[value] = \
-                PersistentGenerator(macroGenerator(value))
-        self.value = ValueGenerator.values[value]
+        value, values = self.params['value'], self.session.values
+        if not value in values:
+            values[value] = PersistentGenerator(
+                macroGenerator(value, session=self.session))
+        self.value = values[value]
         self.cleanParams(ValueGenerator.DIRS)
 
     def mapGen(self, func):
@@ -12,10 +12,11 @@ class BoolGenerator(RandomGenerator):
 
     - float rate: truth's rate, defaults to 0.5
     """
+    __slots__ = ('rate',)
     DIRS = {'rate': float}
 
-    def __init__(self, att, params=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        RandomGenerator.__init__(self, att, params, session)
         self.rate = self.params.get('rate', 0.5)
         assert 0.0 <= self.rate and self.rate <= 1.0, \
             "{0}: rate {1} not in [0,1]".format(self, self.rate)
@@ -26,12 +27,22 @@ class BoolGenerator(RandomGenerator):
             True if self.rate == 1.0 else \
                 self._rand.random() < self.rate
 
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != BoolGenerator.genData:
+            return super(BoolGenerator, self).genBatch(n)
+        if self.rate == 0.0 or self.rate == 1.0:
+            return [self.rate == 1.0] * n
+        rand, rate = self._rand.random, self.rate
+        return [rand() < rate for i in range(n)]
+
 
 class BitGenerator(WithLength, RandomGenerator):
+    __slots__ = ('lenmin', 'lenmax')
     DIRS = {}
 
-    def __init__(self, att=None, params=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att=None, params=None, session=None):
+        RandomGenerator.__init__(self, att, params, session)
         WithLength.__init__(self, 8, 32)
         self.cleanParams(BitGenerator.DIRS)
 
@@ -3,7 +3,6 @@ from __future__ import print_function, unicode_literals
 import re
 
 from datafiller.generators.luhn import LuhnGenerator
-from datafiller.scripts.cli import db
 
 __author__ = "danishabdullah"
 
@@ -17,14 +16,15 @@ class EANGenerator(LuhnGenerator):
 
     EAN = International Article Number (!)
     """
+    __slots__ = ()
     DIRS = {}
 
-    def __init__(self, att=None, params=None):
-        LuhnGenerator.__init__(self, att, params)
+    def __init__(self, att=None, params=None, session=None):
+        LuhnGenerator.__init__(self, att, params, session)
         if not self.type:
             self.type = 'ean13'
         # override length, prefix, cksum
-        self.length = db.eanType(self.type)
+        self.length = self.session.db.eanType(self.type)
         # set prefix for IS*N embedded in EAN13. ISBN13 could also use 979.
         if not self.prefix:
             self.prefix = '977' if self.type == 'issn13' else \
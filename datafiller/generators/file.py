@@ -1,8 +1,6 @@
 from __future__ import print_function, unicode_literals
 
 from datafiller.generators.numeric import IntGenerator
-from datafiller.scripts.cli import opts
-from datafiller.tests import some_tmp_files_to_unlink
 
 __author__ = "danishabdullah"
 __all__ = ('FileGenerator',)
@@ -13,17 +11,18 @@ class FileGenerator(IntGenerator):
 
     - str[] files: list of files
     """
+    __slots__ = ('files', 'conv')
     DIRS = {'file': str, 'mode': str}
 
-    def __init__(self, att, params=None):
-        IntGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        IntGenerator.__init__(self, att, params, session)
         # get list of files
         import os, glob
         self.files = []
         assert 'file' in self.params, "{0}: no directive 'file'".format(self)
-        if some_tmp_files_to_unlink:
+        if self.session.tmp_files:
             # ignore files
-            self.files = some_tmp_files_to_unlink
+            self.files = self.session.tmp_files
         else:
             # normal operation, process directive files
             for f in self.params['file'].split(os.pathsep):
@@ -33,7 +32,7 @@ class FileGenerator(IntGenerator):
         assert mode == 'blob' or mode == 'text', \
             "{0}: mode must be 'blob' or 'text'".format(self)
         self.conv = bytes if mode == 'blob' else \
-            lambda s: s.decode(opts.encoding)
+            lambda s: s.decode(self.session.opts.encoding)
         # set size & offset
         assert len(self.files) > 0, "{0}: non empty set of files".format(self)
         if self.size == None:
@@ -44,7 +43,7 @@ class FileGenerator(IntGenerator):
         self.cleanParams(FileGenerator.DIRS)
 
     def genData(self):
-        f = open(self.files[super(FileGenerator, self).genData()], "rb", encoding='utf-8')
+        f = open(self.files[super(FileGenerator, self).genData()], 'rb')
         s = self.conv(f.read())
         f.close()
         return s
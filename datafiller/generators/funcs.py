@@ -1,9 +1,5 @@
 from __future__ import print_function, unicode_literals
 
-from datafiller.generators import GENERATORS, IntGenerator
-from datafiller.globals import df_macro
-from datafiller.scripts.cli import db, opts
-
 __author__ = "danishabdullah"
 __all__ = ('strDict', 'findGenerator', 'findGeneratorType', 'createGenerator', 'macroGenerator')
 
@@ -15,6 +11,7 @@ def strDict(d):
 
 def findGenerator(obj, params):
     """Get generator from parameters."""
+    from datafiller.generators import GENERATORS
     found = None
     for k in sorted(params):
         if k in sorted(GENERATORS):
@@ -24,8 +21,8 @@ def findGenerator(obj, params):
     return found
 
 
-def findGeneratorType(type):
-    """Get generator based on SQL type"""
+def findGeneratorType(type, db):
+    """Get generator based on SQL type for Database db"""
     return \
         'array' if db.arrayType(type) else \
             'int' if db.intType(type) else \
@@ -44,34 +41,42 @@ def findGeneratorType(type):
                                                                 None
 
 
-def createGenerator(a, t, params=None, msg=None):
+def createGenerator(a, t, params=None, msg=None, session=None):
     """Create a generator from specified type.
 
     - Attribute a: target attribute, may be None
     - str t: name of generator, may be None
     - {} p: additional parameters, may be None
+    - Session session: generation session, from a if None
     """
+    from datafiller.generators import GENERATORS
     if params == None: params = a.params
+    if session == None: session = a.session
     if not t:
         t = findGenerator(msg, params)
     if not t and 'type' in params:
-        t = findGeneratorType(params['type'])
+        t = findGeneratorType(params['type'], session.db)
     assert t, "no generator in {0}".format(msg if msg else a)
     assert t in GENERATORS, \
         "unexpected generator '{0}' in {1}".format(t, msg if msg else a)
-    gen = GENERATORS[t](a, params)
+    gen = GENERATORS[t](a, params, session=session)
     # check that all directives have been used
     gen.params.pop(t, None)
     gen.params.pop('type', None)
     assert not gen.params, \
         "unexpected '{0}' directives: {1}".format(t, strDict(gen.params))
+    gen.dropParams()
     return gen
 
 
-def macroGenerator(name, att=None):
-    assert name in df_macro, \
+def macroGenerator(name, att=None, session=None):
+    from datafiller.generators import IntGenerator
+    if session == None: session = att.session
+    assert name in session.macros, \
         "{0}: '{1}' must be a macro".format(att if att else 'Macro', name)
-    gen = createGenerator(att, None, params=df_macro[name], msg=name)
+    gen = createGenerator(att, None, params=session.macros[name], msg=name,
+                          session=session)
     if isinstance(gen, IntGenerator) and gen.size == None:  # ???
-        gen.setSize(opts.size if opts.size else 1000)  # ???
+        size = session.opts.size
+        gen.setSize(size if size else 1000)  # ???
     return gen
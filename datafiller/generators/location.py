@@ -16,10 +16,11 @@ class InetGenerator(IntGenerator):
     - int net, mask: ip and mask from 'network'
     - tonet: int to address conversion function
     """
+    __slots__ = ('network', 'tonet', 'net')
     DIRS = {'inet': str}
 
-    def __init__(self, att, params=None):
-        IntGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        IntGenerator.__init__(self, att, params, session)
         # get network target and mask
         self.network = self.params.get('inet', ';0.0.0.0/0')
         if len(self.network):
@@ -86,10 +87,11 @@ class InetGenerator(IntGenerator):
 # maybe it should rely on IntGenerator?
 class MACGenerator(SeedGenerator):
     """Generate MAC Addresses."""
+    __slots__ = ()
     DIRS = {}
 
-    def __init__(self, att, params=None):
-        SeedGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        SeedGenerator.__init__(self, att, params, session)
         self.cleanParams(MACGenerator.DIRS)
 
     def genData(self):
@@ -3,7 +3,6 @@ from __future__ import print_function, unicode_literals
 import re
 
 from datafiller.generators.seed import SeedGenerator
-from datafiller.scripts.cli import opts
 
 __author__ = "danishabdullah"
 __all__ = ('LuhnGenerator',)
@@ -16,15 +15,17 @@ class LuhnGenerator(SeedGenerator):
     - str prefix: optional prefix, defaults to empty
     - ckSum: function to compute check digit
     """
+    __slots__ = ('length', 'prefix', 'ckSum')
     DIRS = {'length': int, 'prefix': str}
 
-    def __init__(self, att, params=None):
-        SeedGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        SeedGenerator.__init__(self, att, params, session)
         self.length = self.params.get('length', 16)
         assert self.length >= 2, \
             "{0}: 'length' {1} must be > 1".format(self, self.length)
         if self.size == None:
-            self.setSize(opts.size if opts.size else 100)
+            size = self.session.opts.size
+            self.setSize(size if size else 100)
         self.prefix = str(self.params.get('prefix', ''))
         assert len(self.prefix) < self.length, \
             "{0}: 'prefix' \"{1}\" length not smaller than 'length' {2}". \
@@ -1,11 +1,9 @@
 from __future__ import print_function, unicode_literals
 
 import math
-import random
 import sys
 
 from datafiller.generators.base import RandomGenerator
-from datafiller.scripts.cli import opts
 from datafiller.utils import u8, long
 
 __author__ = "danishabdullah"
@@ -14,10 +12,11 @@ __all__ = ('CountGenerator', 'FloatGenerator', 'IntGenerator')
 
 class CountGenerator(RandomGenerator):
     """Generate a count."""
+    __slots__ = ('start', 'step', 'format')
     DIRS = {'start': str, 'step': int, 'format': str}
 
-    def __init__(self, att, params=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        RandomGenerator.__init__(self, att, params, session)
         self.start = int(self.params.get('start', 1))
         self.step = int(self.params.get('step', 1))
         self.format = u8("{{0:{0}}}").format(self.params.get('format', 'd'))
@@ -28,6 +27,20 @@ class CountGenerator(RandomGenerator):
         self.gens += 1
         return self.format.format((self.gens - 1) * self.step + self.start)
 
+    def isCounter(self):
+        return True
+
+    def isDistinct(self, n):
+        return self.nullp == 0.0
+
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != CountGenerator.genData:
+            return super(CountGenerator, self).genBatch(n)
+        gens, self.gens = self.gens, self.gens + n
+        fmt, step, start = self.format.format, self.step, self.start
+        return [fmt(i * step + start) for i in range(gens, gens + n)]
+
 
 class FloatGenerator(RandomGenerator):
     """Generate floats with various distributions.
@@ -36,10 +49,11 @@ class FloatGenerator(RandomGenerator):
     - str sub: subtype of random generator
     - float alpha, beta: parameters
     """
+    __slots__ = ('sub', 'alpha', 'beta', 'genData')
     DIRS = {'float': str, 'alpha': float, 'beta': float}
 
-    def __init__(self, att, params=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        RandomGenerator.__init__(self, att, params, session)
         self.sub = self.params.get('float', 'uniform')
         if self.sub == True or self.sub == '':
             self.sub = 'uniform'
@@ -68,6 +82,13 @@ class FloatGenerator(RandomGenerator):
             "{0}: unexpected float generator '{1}'".format(self, s)
         self.cleanParams(FloatGenerator.DIRS)
 
+    def genBatch(self, n):
+        if self.sub == 'uniform':
+            # inline Random.uniform(a, b), which is a + (b - a) * random()
+            rand, a, d = self._rand.random, self.alpha, self.beta - self.alpha
+            return [a + d * rand() for i in range(n)]
+        return super(FloatGenerator, self).genBatch(n)
+
 
 class IntGenerator(RandomGenerator):
     """Generate integers, possibly mangled and offset.
@@ -95,12 +116,14 @@ class IntGenerator(RandomGenerator):
               1684568321, 1694568241, 1704567959, 1714568899, 1724568239,
               1734567899, 1744567901, 1754567891, 1764567913, 1774567901,
               1784567899, 1794567911, 1804567907, 1814567891, 1824567893]
+    __slots__ = ('sub', 'offset', 'alpha', 'rate', 'shift', 'xor', 'step',
+                 'mangle', 'mask')
     DIRS = {'sub': str, 'mangle': bool,
             'size': int, 'offset': int, 'step': int, 'shift': int, 'xor': int,
             'alpha': float, 'rate': float}
 
-    def __init__(self, att, params=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        RandomGenerator.__init__(self, att, params, session)
         # set generator subtype depending on attribute
         self.sub = self.params.get('sub')
         if not self.sub:
@@ -113,12 +136,12 @@ class IntGenerator(RandomGenerator):
         if 'offset' in self.params:
             self.offset = self.params['offset']
         # then PK or FK information
-        elif att != None and att.isPK and opts.offset:
-            self.offset = opts.offset
+        elif att != None and att.isPK and self.session.opts.offset:
+            self.offset = self.session.opts.offset
         elif att != None and att.FK:
             fk = att.FK.getPK()
-            self.offset = \
-                fk.params.get('offset', opts.offset if opts.offset else 1)
+            offset = self.session.opts.offset
+            self.offset = fk.params.get('offset', offset if offset else 1)
         else:
             self.offset = 1
         # scale & power
@@ -138,8 +161,8 @@ class IntGenerator(RandomGenerator):
         self.shift, self.xor, self.step = 0, 0, 1
         self.mangle = self.params.get('mangle', False)
         self.step = self.params['step'] if 'step' in self.params else \
-            IntGenerator.PRIMES[random.randrange(0, \
-                                                 len(IntGenerator.PRIMES))] if self.mangle else \
+            IntGenerator.PRIMES[self.session.random.randrange(
+                0, len(IntGenerator.PRIMES))] if self.mangle else \
                 1
         assert self.step != 0, "{0}: 'step' must not be zero".format(self)
         self.shift = self.params['shift'] if 'shift' in self.params else None
@@ -154,6 +177,16 @@ class IntGenerator(RandomGenerator):
             self.size = None
         self.cleanParams(IntGenerator.DIRS)
 
+    def isCounter(self):
+        return self.sub == 'serial' or self.sub == 'serand'
+
+    def isDistinct(self, n):
+        # serial bases are a permutation of 0..size-1 up to size calls,
+        # which mangling keeps, as well as the initial serand ones
+        return self.nullp == 0.0 and n <= self.size and \
+            (self.sub == 'serial' or self.sub == 'serand') and \
+            self.__class__.genData == IntGenerator.genData
+
     def setSize(self, size):
         assert (isinstance(size, int) or isinstance(size, long)) and size > 0, \
             "{0}: 'size' {1} must be > 0".format(self, size)
@@ -169,9 +202,11 @@ class IntGenerator(RandomGenerator):
                              format(self.att, self.step, size))
             self.step = 1
         if self.xor == None:
-            self.xor = random.randrange(1, 1000 * size) if self.mangle else 0
+            self.xor = self.session.random.randrange(1, 1000 * size) \
+                if self.mangle else 0
         if self.shift == None:
-            self.shift = random.randrange(0, size) if self.mangle else 0
+            self.shift = self.session.random.randrange(0, size) \
+                if self.mangle else 0
         if self.xor != 0:
             # note: int.bit_length available from 2.7 & 3.1
             m = 1
@@ -216,7 +251,10 @@ class IntGenerator(RandomGenerator):
             base = int(self.size * (v / ((1 - self.alpha) * v + self.alpha)))
         assert 0 <= base and base < self.size, \
             "{0}: base {1:d} not in [0,{2:d})".format(self, base, self.size)
-        # return possibly mangled result
+        return self.mangleBase(base)
+
+    def mangleBase(self, base):
+        """Return the possibly mangled and offset integer for base."""
         if self.xor != 0:
             # non linear step: apply xor to the largest possible power of 2
             m = self.mask
@@ -227,3 +265,44 @@ class IntGenerator(RandomGenerator):
                 m = int(m / 2)
         # then linear step:
         return self.offset + (self.shift + self.step * base) % self.size
+
+    def intBatch(self, n):
+        """Generate n integers, drawing exactly as n calls to genData()."""
+        assert self.size != None and self.size > 0, \
+            "{0}: cannot draw from empty set".format(self)
+        gens, size = self.gens, self.size
+        self.gens += n
+        if size == 1:
+            return [self.offset] * n
+        assert self.shift != None, "{0}: shift is set".format(self)
+        # bases in 0..size-1, the sub-generator is only tested once
+        if self.sub == 'serial':
+            bases = [i % size for i in range(gens, gens + n)]
+        elif self.sub == 'uniform':
+            randrange = self._rand.randrange
+            bases = [randrange(0, size) for i in range(n)]
+        elif self.sub == 'serand':
+            randrange = self._rand.randrange
+            bases = [i if i < size else randrange(0, size)
+                     for i in range(gens, gens + n)]
+        elif self.sub == 'power':
+            rand, alpha = self._rand.random, self.alpha
+            bases = [int(size * rand() ** alpha) for i in range(n)]
+        else:  # self.sub == 'scale':
+            rand, alpha, bases = self._rand.random, self.alpha, []
+            for i in range(n):
+                v = rand()
+                bases.append(int(size * (v / ((1 - alpha) * v + alpha))))
+        if self.xor != 0:
+            mangleBase = self.mangleBase
+            return [mangleBase(b) for b in bases]
+        offset, shift, step = self.offset, self.shift, self.step
+        if shift == 0 and step == 1:
+            return [offset + b for b in bases]
+        return [offset + (shift + step * b) % size for b in bases]
+
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != IntGenerator.genData:
+            return super(IntGenerator, self).genBatch(n)
+        return self.intBatch(n)
@@ -147,13 +147,15 @@ class Pattern(object):
             min, max = extent.split(',')
         else:
             min, max = extent, extent
-        return RepeatGenerator(att, params={'extent': min + '-' + max}, gen=g)
+        return RepeatGenerator(att, params={'extent': min + '-' + max}, gen=g,
+                               session=g.session)
 
     @staticmethod
-    def genAlt(att, pattern, extent=''):
+    def genAlt(att, pattern, extent='', session=None):
         """Parses a single pattern like (...) or [...] or ."""
+        if session == None: session = att.session
         if len(pattern) == 0:
-            return ConstGenerator(att)
+            return ConstGenerator(att, session=session)
         # handle '.' shortcut and other special (character) classes
         if pattern == '.':
             pattern = '[' + RE_DOT + ']'
@@ -163,16 +165,18 @@ class Pattern(object):
                 pattern = '[' + RE_POSIX_CC[desc] + ']'
             else:
                 # allow something like [:count start=10 format=08X step=2:]
-                g = createGenerator(att, None, getParams(desc), msg=pattern)
+                g = createGenerator(att, None, getParams(desc, session.macros),
+                                    msg=pattern, session=session)
                 return Pattern.repeat(att, g, extent)
         if pattern[0] == '(':
             # alternative, AltGenerator
             l = Pattern.altSplit(pattern)
             assert len(l) > 0
             if len(l) == 1:
-                g = Pattern.genCat(att, l[0])
+                g = Pattern.genCat(att, l[0], session=session)
             else:
-                g = AltGenerator(att, gens=[Pattern.genCat(att, p) for p in l])
+                g = AltGenerator(att, gens=[Pattern.genCat(att, p, session=session)
+                                            for p in l], session=session)
             return Pattern.repeat(att, g, extent)
         elif pattern[0] == '[':
             # character class, CharGenerator...
@@ -181,32 +185,35 @@ class Pattern(object):
                 notch = CharsGenerator.parseCharSequence(att, pattern[2:-1])
                 allch = CharsGenerator.parseCharSequence(att, RE_DOT)
                 difch = ''.join(sorted(list(set(allch) - set(notch))))
-                g = CharsGenerator(att, chars=difch)
+                g = CharsGenerator(att, chars=difch, session=session)
             else:
                 assert len(pattern) > 2 and pattern[-1] == ']'
-                g = CharsGenerator(att, params={'chars': pattern[1:-1]})
+                g = CharsGenerator(att, params={'chars': pattern[1:-1]},
+                                   session=session)
             g.size, g.lenmin, g.lenmax = 0xffffffff, 1, 1
             return Pattern.repeat(att, g, extent)
         else:
             # possibly repeated constant text
-            return Pattern.repeat(att, ConstGenerator(att, cst=pattern), extent)
+            return Pattern.repeat(att, ConstGenerator(att, cst=pattern,
+                                                      session=session), extent)
 
     @staticmethod
-    def genCat(att, pattern, extent=''):
+    def genCat(att, pattern, extent='', session=None):
         """Parses a pattern sequence like (foo|bla){1,3}stuff[abc]{5}'"""
+        if session == None: session = att.session
         if len(pattern) == 0:
             # assert extent == '' # what is the point of: (){3}
-            return ConstGenerator(att)
+            return ConstGenerator(att, session=session)
         pats = Pattern.catSplit(pattern)
         if len(pats) == 0:
             assert extent == '', \
                 "{0}: extent {1} on nothing".format(pattern, extent)
-            return ConstGenerator(att)
+            return ConstGenerator(att, session=session)
         elif len(pats) == 1:
-            g = Pattern.genAlt(att, pats[0][0], pats[0][1])
+            g = Pattern.genAlt(att, pats[0][0], pats[0][1], session)
         else:
-            g = CatGenerator(att, gens=[Pattern.genAlt(att, p[0], p[1]) \
-                                        for p in pats])
+            g = CatGenerator(att, gens=[Pattern.genAlt(att, p[0], p[1], session)
+                                        for p in pats], session=session)
         return Pattern.repeat(att, g, extent)
 
 
@@ -215,15 +222,17 @@ class PatternGenerator(RandomGenerator):
 
     - Generator root
     """
+    __slots__ = ('pattern', 'root')
     DIRS = {'pattern': str}
 
-    def __init__(self, att, params=None):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        RandomGenerator.__init__(self, att, params, session)
         assert 'pattern' in self.params, \
             "{0}: mandatory 'pattern' directive".format(self)
         self.pattern = '' if isinstance(self.params['pattern'], bool) else \
             self.params['pattern']
-        self.root = Pattern.genAlt(att, '(' + self.pattern + ')')
+        self.root = Pattern.genAlt(att, '(' + self.pattern + ')',
+                                   session=self.session)
         # synchronize full generator tree
         self.root.mapGen(lambda s: s.notNull())
         if self.shared:
@@ -238,8 +247,8 @@ class PatternGenerator(RandomGenerator):
         return self.root.genData()
 
 
-def UUIDGenerator(att, params=None):
+def UUIDGenerator(att, params=None, session=None):
     if not params:
         params = att.params
     params['pattern'] = r'\h{4}(\h{4}-){4}\h{12}'
-    return PatternGenerator(att, params)
+    return PatternGenerator(att, params, session)
@@ -11,9 +11,10 @@ __all__ = ('RepeatGenerator',)
 
 class RepeatGenerator(ArrayGenerator):
     """Generate repeated stuff."""
+    __slots__ = ()
     DIRS = {'repeat': str, 'extent': str}
 
-    def __init__(self, att, params=None, gen=None):
+    def __init__(self, att, params=None, gen=None, session=None):
         p = params if params else att.params
         self.att = None
         if 'extent' in p:
@@ -32,7 +33,8 @@ class RepeatGenerator(ArrayGenerator):
                 "{0}: extent must be 0 <= {1} <= {2}".format(self, min, max)
         else:
             min, max = 1, 1
-        ArrayGenerator.__init__(self, att, params, 'repeat', min, max, gen)
+        ArrayGenerator.__init__(self, att, params, 'repeat', min, max, gen,
+                                session)
         # ??? hmmmm... overwrite extent from type (CHAR(36))
         # WithLength logic shoud distinguish defauts and sets...
         self.setSize(max - min + 1)
@@ -1,21 +1,30 @@
 from __future__ import print_function, unicode_literals
 
-import random
-
 from datafiller.generators.numeric import IntGenerator
+from datafiller.rng import newRandom
 
 __author__ = "danishabdullah"
 __all__ = ("SeedGenerator",)
 
 
 class SeedGenerator(IntGenerator):
+    __slots__ = ('_rand2',)
     DIRS = {}
 
-    def __init__(self, att, params):
-        IntGenerator.__init__(self, att, params)
-        self._rand2 = random.Random()
+    def __init__(self, att, params, session=None):
+        IntGenerator.__init__(self, att, params, session)
+        self._rand2 = newRandom(self.session.opts.rng)
         self.cleanParams(SeedGenerator.DIRS)
 
+    def getState(self):
+        state = super(SeedGenerator, self).getState()
+        state['rand2'] = self._rand2.getstate()
+        return state
+
+    def setState(self, state):
+        super(SeedGenerator, self).setState(state)
+        self._rand2.setstate(state['rand2'])
+
     def reseed(self):
         self._rand2.seed(self.seed + str(super(SeedGenerator, self).genData()))
 
@@ -2,7 +2,6 @@ from __future__ import print_function, unicode_literals
 
 from datafiller.generators.base import WithPersistent
 from datafiller.generators.numeric import IntGenerator
-from datafiller.globals import df_macro
 
 __author__ = "danishabdullah"
 
@@ -10,24 +9,29 @@ __all__ = ('SharedGenerator',)
 
 
 class SharedGenerator(WithPersistent, IntGenerator):
-    """Generate persistent integers."""
-    _generators = {}
+    """Generate persistent integers.
+
+    Shared generators are registered in the session by macro name.
+    """
+    __slots__ = ('last_tuple_count', 'last_value')
     DIRS = {}
 
     @staticmethod
     def getGenerator(obj, name):
-        if not name in SharedGenerator._generators:
-            assert name in df_macro, \
+        session = obj.session
+        if not name in session.shared:
+            assert name in session.macros, \
                 "{0}: 'share' {1} directive must be a macro".format(obj, name)
-            SharedGenerator._generators[name] = \
-                SharedGenerator(name, df_macro[name])
-        return SharedGenerator._generators[name]
+            session.shared[name] = \
+                SharedGenerator(name, session.macros[name], session)
+        return session.shared[name]
 
-    def __init__(self, name, params):
+    def __init__(self, name, params, session):
         assert name != None and params != None, "mandatory parameters"
         size = params['size'] if 'size' in params else None
         mult = params['mult'] if 'mult' in params else None
-        IntGenerator.__init__(self, None, params)
+        IntGenerator.__init__(self, None, params, session)
+        opts = self.session.opts
         self.nullp = 0.0
         # set size, possibly overriding super constructor
         if size:
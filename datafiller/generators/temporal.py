@@ -3,7 +3,6 @@ from __future__ import print_function, unicode_literals
 from datetime import timedelta, datetime, date
 
 from datafiller.generators.numeric import IntGenerator
-from datafiller.scripts.cli import db
 
 __author__ = "danishabdullah"
 __all__ = ('IntervalGenerator', 'DateGenerator', 'TimestampGenerator')
@@ -15,17 +14,25 @@ class IntervalGenerator(IntGenerator):
 
     - str unit: time unit for the interval, default is 's' (seconds)
     """
+    __slots__ = ('unit',)
     DIRS = {'unit': str}
 
-    def __init__(self, att, params=None):
-        IntGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        IntGenerator.__init__(self, att, params, session)
         self.unit = self.params.get('unit', 's')
         self.cleanParams(IntervalGenerator.DIRS)
 
     def genData(self):
         # ??? maybe it should not depend on db?
-        return db.intervalValue(super(IntervalGenerator, self).genData(),
-                                self.unit)
+        return self.session.db.intervalValue(
+            super(IntervalGenerator, self).genData(), self.unit)
+
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != IntervalGenerator.genData:
+            return super(IntervalGenerator, self).genBatch(n)
+        intervalValue, unit = self.session.db.intervalValue, self.unit
+        return [intervalValue(i, unit) for i in self.intBatch(n)]
 
 
 class DateGenerator(IntGenerator):
@@ -35,14 +42,15 @@ class DateGenerator(IntGenerator):
     - int dir: direction from reference date
     - int prec: precision in days
     """
+    __slots__ = ('ref', 'dir', 'prec')
     DIRS = {'start': str, 'end': str, 'prec': int}
 
     @staticmethod
     def parse(s):
         return datetime.date(datetime.strptime(s, "%Y-%m-%d"))
 
-    def __init__(self, att, params=None):
-        IntGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        IntGenerator.__init__(self, att, params, session)
         self.offset = 0
         start, end = 'start' in self.params, 'end' in self.params
         ref = self.params['start'] if start else \
@@ -70,7 +78,16 @@ class DateGenerator(IntGenerator):
     def genData(self):
         d = self.ref + self.dir * \
             timedelta(days=self.prec * IntGenerator.genData(self))
-        return db.dateValue(d)
+        return self.session.db.dateValue(d)
+
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != DateGenerator.genData:
+            return super(DateGenerator, self).genBatch(n)
+        dateValue = self.session.db.dateValue
+        ref, dir, prec = self.ref, self.dir, self.prec
+        return [dateValue(ref + dir * timedelta(days=prec * i))
+                for i in self.intBatch(n)]
 
 
 class TimestampGenerator(IntGenerator):
@@ -81,6 +98,7 @@ class TimestampGenerator(IntGenerator):
     - int prec: precision in seconds, default 60 seconds
     - str tz: set in this time zone, may be None
     """
+    __slots__ = ('ref', 'dir', 'prec', 'tz')
     DIRS = {'tz': str}
     DIRS.update(DateGenerator.DIRS)
 
@@ -88,8 +106,8 @@ class TimestampGenerator(IntGenerator):
     def parse(s):
         return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
 
-    def __init__(self, att, params=None):
-        IntGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        IntGenerator.__init__(self, att, params, session)
         self.offset = 0
         self.tz = self.params.get('tz')
         start, end = 'start' in self.params, 'end' in self.params
@@ -120,4 +138,13 @@ class TimestampGenerator(IntGenerator):
             timedelta(seconds=self.prec * \
                               super(TimestampGenerator, self).genData())
         # ??? should not depend on db
-        return db.timestampValue(t, self.tz)
+        return self.session.db.timestampValue(t, self.tz)
+
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != TimestampGenerator.genData:
+            return super(TimestampGenerator, self).genBatch(n)
+        timestampValue, tz = self.session.db.timestampValue, self.tz
+        ref, dir, prec = self.ref, self.dir, self.prec
+        return [timestampValue(ref + dir * timedelta(seconds=prec * i), tz)
+                for i in self.intBatch(n)]
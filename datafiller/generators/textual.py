@@ -4,7 +4,6 @@ from datafiller.generators.array import ArrayGenerator
 from datafiller.generators.base import RandomGenerator, WithLength, WithSubgen
 from datafiller.generators.numeric import IntGenerator
 from datafiller.generators.seed import SeedGenerator
-from datafiller.scripts.cli import opts
 from datafiller.utils import unescape, u8, u
 
 __author__ = "danishabdullah"
@@ -16,10 +15,12 @@ class ConstGenerator(RandomGenerator):
 
     - str cst: constant string to return.
     """
+    __slots__ = ('cst',)
     DIRS = {'const': str}
 
-    def __init__(self, att=None, params=None, cst=None, escape=True):
-        RandomGenerator.__init__(self, att, params)
+    def __init__(self, att=None, params=None, cst=None, escape=True,
+                 session=None):
+        RandomGenerator.__init__(self, att, params, session)
         if cst == None:
             cst = self.params['const'] if 'const' in self.params else ''
         if isinstance(cst, bool):  # fix if empty directive
@@ -30,14 +31,21 @@ class ConstGenerator(RandomGenerator):
     def genData(self):
         return self.cst
 
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != ConstGenerator.genData:
+            return super(ConstGenerator, self).genBatch(n)
+        return [self.cst] * n
+
 
 # similar to RepeatGenerator, but with a different syntax
 class TextGenerator(ArrayGenerator):
     """Generate text from another generator."""
+    __slots__ = ('sep', 'prefix', 'suffix')
     DIRS = {'text': str, 'separator': str, 'prefix': str, 'suffix': str}
 
-    def __init__(self, att, params=None):
-        ArrayGenerator.__init__(self, att, params, 'text')
+    def __init__(self, att, params=None, session=None):
+        ArrayGenerator.__init__(self, att, params, 'text', session=session)
         self.sep = self.params.get('separator', ' ')
         self.prefix = self.params.get('prefix', '')
         self.suffix = self.params.get('suffix', '')
@@ -50,10 +58,11 @@ class TextGenerator(ArrayGenerator):
 
 class BlobGenerator(WithLength, SeedGenerator):
     """Generate binary large object."""
+    __slots__ = ('lenmin', 'lenmax')
     DIRS = {}
 
-    def __init__(self, att, params=None):
-        SeedGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        SeedGenerator.__init__(self, att, params, session)
         WithLength.__init__(self, 8, 16)
         self.cleanParams(BlobGenerator.DIRS)
 
@@ -76,16 +85,17 @@ class WordGenerator(IntGenerator):
                  'Doderic Dodinas Donnamira Dora Drogo Dudo Eglantine Elanor ' +
                  'Elfstan Esmeralda Estella Everard Falco Faramir Farmer ' +
                  'Fastolph Fastred Ferdibrand Ferdinand Ferumbras').split(' ')
+    __slots__ = ('__size', 'words')
     DIRS = {'word': str}
 
-    def __init__(self, att, params=None, words=None):
+    def __init__(self, att, params=None, words=None, session=None):
         # keep explicit size for later
         self.__size = params['size'] if params and 'size' in params else \
             att.params['size'] if att and 'size' in att.params else \
                 None
         # NOT att.size: this is computed and does not supersede len(words)
         self.words = None  # temporary
-        IntGenerator.__init__(self, att, params)
+        IntGenerator.__init__(self, att, params, session)
         assert not (words and 'word' in self.params), \
             "internal constructor issue, two word list specification!"
         if words:
@@ -95,10 +105,15 @@ class WordGenerator(IntGenerator):
             assert len(spec) > 0, "{0}: empty word specification".format(self)
             if spec[0] == ':':
                 self.words = spec[1:].split(',')
-            elif opts.self_test_hack:
+            elif self.session.opts.self_test_hack:
                 # self tests cannot depend from an external file
                 # print("-- use Hobbit list for testing...")
                 self.words = WordGenerator.HOBBITS
+            elif self.session.memory:
+                # word list within the memory budget, or left on disk
+                from datafiller.memory import loadWords
+
+                self.words = loadWords(spec, self.session.memory, str(self))
             else:
                 # load word list from file
                 f = open(spec, encoding='utf-8')
@@ -128,6 +143,13 @@ class WordGenerator(IntGenerator):
     def genData(self):
         return self.words[super(WordGenerator, self).genData()]
 
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != WordGenerator.genData:
+            return super(WordGenerator, self).genBatch(n)
+        words = self.words
+        return [words[i] for i in self.intBatch(n)]
+
 
 class StringGenerator(IntGenerator, WithLength):
     """Generate a basic string, like "stuff_12_12_12"
@@ -135,15 +157,17 @@ class StringGenerator(IntGenerator, WithLength):
     - str prefix: use attribute name by default
     - int lenmin, lenmax: expected length
     """
+    __slots__ = ('prefix', 'lenmin', 'lenmax')
     DIRS = {'prefix': str}  # | WithLength.DIRS
 
-    def __init__(self, att, params=None):
-        IntGenerator.__init__(self, att, params)
+    def __init__(self, att, params=None, session=None):
+        IntGenerator.__init__(self, att, params, session)
         WithLength.__init__(self, 8, 16)
         # set defaults from attributes
         self.prefix = self.params.get('prefix', att.name if att else 'str')
         if self.size == None:
-            self.setSize(opts.size if opts.size else 1000)  # ???
+            size = self.session.opts.size
+            self.setSize(size if size else 1000)  # ???
         self.cleanParams(StringGenerator.DIRS)
 
     def lenData(self, length, n):
@@ -163,6 +187,13 @@ class StringGenerator(IntGenerator, WithLength):
     def genData(self):
         return self.baseData(super(StringGenerator, self).genData())
 
+    def genBatch(self, n):
+        # subclasses which override genData() must provide their own batch
+        if self.__class__.genData != StringGenerator.genData:
+            return super(StringGenerator, self).genBatch(n)
+        baseData = self.baseData
+        return [baseData(i) for i in self.intBatch(n)]
+
 
 # two generators are needed, one for the chars & one for the words
 # the parameterized inherited generator is used for the words
@@ -174,6 +205,7 @@ class CharsGenerator(WithSubgen, StringGenerator):
 
     - str chars: list of characters to draw from
     - IntGenerator cgen: generator for choosing characters"""
+    __slots__ = ('subgen', 'chars')
     DIRS = {'chars': str, 'cgen': str}
 
     @staticmethod
@@ -202,8 +234,8 @@ class CharsGenerator(WithSubgen, StringGenerator):
         chars += c
         return chars
 
-    def __init__(self, att=None, params=None, chars=None):
-        StringGenerator.__init__(self, att, params)
+    def __init__(self, att=None, params=None, chars=None, session=None):
+        StringGenerator.__init__(self, att, params, session)
         if att != None and att.isUnique():
             raise Exception("chars generator does not support UNIQUE")
         self.chars = \
@@ -0,0 +1,97 @@
+from __future__ import print_function, unicode_literals
+
+import sys
+from array import array
+
+from datafiller.utils import humanSize, u
+
+__author__ = "danishabdullah"
+__all__ = ('MemoryBudget', 'SpilledWords', 'loadWords')
+
+# estimated bytes per word of a list: pointer and string object
+WORD_OVERHEAD = 8 + sys.getsizeof('')
+
+
+class MemoryBudget(object):
+    """Account for the memory held by components which grow with the data,
+    against the --max-memory budget.
+
+    Components reserve the bytes they expect to hold, and the run fails with
+    a per-component breakdown as soon as the total exceeds the budget.
+    Components which can do with less memory, eg by reading data from disk,
+    first ask whether their preferred size fits.
+
+    - int limit: budget in bytes, None if unlimited
+    - {} components: reserved bytes by component name
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.components = {}
+
+    def used(self):
+        return sum(self.components.values())
+
+    def fits(self, nbytes, name=None):
+        """Whether nbytes more fit, replacing the reservation of name."""
+        return self.limit == None or \
+            self.used() - self.components.get(name, 0) + nbytes <= self.limit
+
+    def reserve(self, name, nbytes):
+        """Set the bytes held by component name, and fail if the budget
+        is exceeded."""
+        self.components[name] = nbytes
+        assert self.fits(0), self.report()
+
+    def report(self):
+        lines = ["memory budget of {0} exceeded, {1} needed:".
+                 format(humanSize(self.limit), humanSize(self.used()))]
+        for name, n in sorted(self.components.items(),
+                              key=lambda c: (-c[1], c[0])):
+            lines.append("  {0}: {1}".format(name, humanSize(n)))
+        return '\n'.join(lines)
+
+
+class SpilledWords(object):
+    """Word list which stays in its file, for lists which do not fit in the
+    memory budget. Words are read on access through a memory map, which
+    worker processes share, with an index of line offsets.
+
+    - str path: file holding one word per line
+    - array offsets: start of each line in the file, then the file size
+    """
+
+    def __init__(self, path, offsets):
+        self.path, self.offsets = path, offsets
+        self.map = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self.map == None:
+            import mmap
+
+            with open(self.path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if i < 0:
+            i += len(self)
+        line = self.map[self.offsets[i]:self.offsets[i + 1]]
+        return u(line.decode('utf-8').rstrip())
+
+
+def loadWords(path, budget, name):
+    """Return the words of file path, one per line, as a list if it fits in
+    the budget, or else as SpilledWords. The memory held is reserved under
+    name."""
+    offsets = array('Q', [0])
+    with open(path, 'rb') as f:
+        for line in f:
+            offsets.append(offsets[-1] + len(line))
+    nbytes = offsets[-1] + (len(offsets) - 1) * WORD_OVERHEAD
+    if budget.fits(nbytes):
+        budget.reserve(name, nbytes)
+        with open(path, encoding='utf-8') as f:
+            return [u(l.rstrip()) for l in f]
+    budget.reserve(name + ' (on disk)', offsets.itemsize * len(offsets))
+    return SpilledWords(path, offsets)
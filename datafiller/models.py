@@ -1,24 +1,32 @@
 from __future__ import print_function, unicode_literals
 
+import os
 import re
 
+from datafiller.compiler import compileTable
 from datafiller.consts import RE_TSTZ, RE_FLT, RE_BLO, RE_IPN, RE_MAC, RE_BIT, is_ser, is_int, RE_EAN
 from datafiller.generators import GENERATORS
 from datafiller.generators.base import Generator, RandomGenerator, WithLength
 from datafiller.generators.funcs import findGenerator, strDict
 from datafiller.generators.shared import SharedGenerator
-from datafiller.scripts.cli import addType, db, opts
-from datafiller.utils import getParams, debug, numeric_types
+from datafiller.rng import newRandom
+from datafiller.unique import Spill, UniqueSet, fingerprint
+from datafiller.utils import getParams, numeric_types
 
 __author__ = "danishabdullah"
-__all__ = ('Model', 'Attribute', 'Table', 'Database', 'CSV', 'PostgreSQL', 'MySQL')
+__all__ = ('Model', 'Attribute', 'Table', 'Database', 'CSV', 'PostgreSQL', 'MySQL',
+           'TARGETS')
 
 
 #
 # Relation model
 #
 class Model(object):
-    """Modelize something"""
+    """Modelize something
+
+    - Session session: session the object belongs to
+    """
+    __slots__ = ('session', 'quoted', 'name', 'size', 'params')
     # global parameters and their types
     PARAMS = {'size': int, 'offset': int, 'null': float, 'seed': str, 'type': str}
 
@@ -50,7 +58,8 @@ class Model(object):
             "{0}: must not have both 'mult' and 'size'".format(obj)
         # else everything is fine
 
-    def __init__(self, name):
+    def __init__(self, name, session):
+        self.session = session
         # unquote attributes names (PostgreSQL or MySQL)
         self.quoted = name[0] == '"' or name[0] == '`'
         self.name = name[1:-1] if self.quoted else name.lower()
@@ -64,19 +73,22 @@ class Model(object):
         Model.checkPARAMS(self, self.params, self.__class__.PARAMS)
         # handle type additions on the fly
         if 'type' in self.params:
-            addType(self.params['type'])
+            self.session.parser.addType(self.params['type'])
             del self.params['type']
 
     def setParams(self, dfline):
-        self.params.update(getParams(dfline))
+        self.params.update(getParams(dfline, self.session.macros))
         self.checkParams()
 
     def getName(self):
-        return db.quoteIdent(self.name) if self.quoted else self.name
+        return self.session.db.quoteIdent(self.name) if self.quoted else \
+            self.name
 
 
 class Attribute(Model):
     """Represent an attribute in a table."""
+    __slots__ = ('number', 'type', 'FK', 'FKatt', 'isPK', 'unique', 'not_null',
+                 'is_enum', 'gen', 'table')
     # all attribute PARAMETERS and their types
     PARAMS = {'nogen': bool, 'mult': float}
     # directives from hidden generators & options
@@ -85,9 +97,8 @@ class Attribute(Model):
     PARAMS.update(SharedGenerator.DIRS)
     PARAMS.update(WithLength.DIRS)
     # directives from public generators
-    import inspect
     for k in GENERATORS:
-        if inspect.isclass(GENERATORS[k]):
+        if isinstance(GENERATORS[k], type):
             PARAMS.update(GENERATORS[k].DIRS)
     # bool directives from generator names
     for k in GENERATORS:
@@ -95,15 +106,16 @@ class Attribute(Model):
             PARAMS[k] = bool
 
     # methods
-    def __init__(self, name, number, type):
-        Model.__init__(self, name)
+    def __init__(self, name, number, type, session):
+        Model.__init__(self, name, session)
         self.number = number
         self.type = type.lower()
-        self.FK = None
+        self.FK, self.FKatt = None, None
         self.isPK = False
         self.unique = False
         self.not_null = False
-        self.gen = None
+        self.is_enum = False
+        self.gen, self.table = None, None
 
     def __repr__(self):
         return "{0}: {1} type={2} PK={3} U={4} NN={5} FK=[{6}]". \
@@ -134,23 +146,33 @@ class Attribute(Model):
         return not self.not_null and not self.isPK
 
     def isSerial(self):
-        return db.serialType(self.type)
+        return self.session.db.serialType(self.type)
 
 
 class Table(Model):
     """Represent a relational table."""
+    __slots__ = ('atts', 'att_list', 'unique', 'ustuff', 'constraints', 'skip',
+                 'gen_atts', 'gen_keep', 'seeders', 'keyed', 'skip_rand',
+                 'skip_seed', 'gen_row', 'gen_cols', 'checked')
     # table-level parameters
     PARAMS = {'mult': float, 'size': int, 'nogen': bool,
               'skip': float, 'null': float}
 
-    def __init__(self, name):
-        Model.__init__(self, name)
+    def __init__(self, name, session):
+        Model.__init__(self, name, session)
         # attributes
         self.atts = {}
         self.att_list = []  # list of attributes in occurrence order
         self.unique = []
-        self.ustuff = {}  # uniques are registered in this dictionnary
+        self.ustuff = UniqueSet()  # fingerprints of unique values
         self.constraints = []
+        self.skip = 0.0
+        # generation helpers, see prepare()
+        self.gen_atts, self.gen_keep, self.seeders = None, None, None
+        self.keyed, self.skip_rand, self.skip_seed = None, None, None
+        self.checked = None
+        # compiled generation functions, see compile()
+        self.gen_row, self.gen_cols = None, None
 
     def __str__(self):
         return "Table {0} [{1:d}] ({2})". \
@@ -168,6 +190,18 @@ class Table(Model):
     def checkParams(self):
         Model.checkParams(self)
 
+    def getSignature(self):
+        """Return a string describing the table as parsed and sized.
+
+        It must be computed before directives are consumed by generators.
+        """
+        atts = [(a.name, a.type, a.FK.name if a.FK else None, a.FKatt,
+                 a.isPK, a.unique, a.not_null, a.is_enum, a.size,
+                 sorted(a.params.items())) for a in self.att_list]
+        return repr((self.name, self.size, self.skip,
+                     sorted(self.params.items()), self.unique,
+                     self.constraints, atts))
+
     def addAttribute(self, att):
         self.att_list.append(att)
         self.atts[att.name] = att
@@ -183,7 +217,8 @@ class Table(Model):
             self.constraints.append(self.name + '_' + att.name + '_fkey')
 
     def addUnique(self, atts, type=None):
-        if opts.debug: debug(3, "addUnique " + str(atts) + " type=" + type)
+        if self.session.opts.debug:
+            self.session.debug(3, "addUnique {0} type={1}".format(atts, type))
         assert len(atts) >= 1
         if len(atts) == 1:
             att = self.getAttribute(atts[0])
@@ -213,21 +248,60 @@ class Table(Model):
         list(map(lambda g: g.mapGen(func), \
                  map(lambda a: a.gen, filter(lambda x: x.gen, self.att_list))))
 
+    def prepare(self):
+        """Precompute per-table generation helpers once generators are set."""
+        # attributes actually generated, in occurrence order
+        self.gen_atts = [a for a in self.att_list if a.gen]
+        # whether to keep the first value when retrying on unique collisions
+        self.gen_keep = [a.isUnique() or a.isSerial() for a in self.gen_atts]
+        # generators which must be reseeded for each tuple
+        allgens, self.seeders = [], []
+        self.mapGen(lambda g: allgens.append(g))
+        for g in allgens:
+            if getattr(g, 'shared', None) and g not in self.seeders:
+                self.seeders.append(g)
+        # generators which are rekeyed on tuple numbers, including shared
+        self.keyed = allgens + [g.shared for g in self.seeders]
+        # random stream for 'skip', keyed on tuple numbers if need be
+        opts = self.session.opts
+        self.skip_rand = newRandom(opts.rng)
+        self.skip_seed = 'skip_' + self.name + '_' + str(opts.seed) + '_'
+        # numbered unique constraints which may collide, the others hold
+        # an attribute whose generator never repeats itself on this table.
+        # attributes not kept on retries are drawn again, maybe beyond size.
+        keep = dict(zip(self.gen_atts, self.gen_keep))
+        distinct = lambda i: self.att_list[i - 1].gen and \
+            self.att_list[i - 1].gen.isDistinct(
+                self.size if keep[self.att_list[i - 1]] else float('inf'))
+        self.checked = [(nu, u) for nu, u in enumerate(self.unique, 1)
+                        if not any(distinct(i) for i in u)]
+
+    def compile(self):
+        """Compile generators into row and column functions."""
+        self.prepare()
+        self.gen_row, self.gen_cols = compileTable(self)
+
+    def shareSeed(self):
+        for g in self.seeders:
+            g.shareSeed()
+
     def getData(self):
-        # generate initial stuff
-        lg = list(filter(lambda x: x.gen, self.att_list))
+        if self.gen_atts == None:
+            self.prepare()
         # possibly reseed shared
-        global tuple_count
-        tuple_count += 1
-        self.mapGen(lambda s: s.shareSeed())
-        l0 = [g.getData() for g in lg]
+        session = self.session
+        session.tuple_count += 1
+        self.shareSeed()
+        # generate initial stuff
+        l0 = self.gen_row() if self.gen_row else \
+            [a.gen.getData() for a in self.gen_atts]
         l = l0
-        tries = opts.tries
+        tries = session.opts.tries
         while tries:
             tries -= 1
-            nu, collision = 0, False
+            collision = False
             sul = []
-            for u in self.unique:
+            for nu, u in self.checked:
                 # one case is not implemented:
                 # unique contains indexes in att_list, but we do not know
                 # to which value it corresponds in the generated list because
@@ -235,44 +309,167 @@ class Table(Model):
                 # should generate a mapping to get the index among generated
                 assert len(l) == len(self.att_list), \
                     "{0}: no unique subset".format(self)
-                nu += 1
-                su = str(nu) + ':' + str([l[i - 1] for i in u])
-                if su in self.ustuff:
+                fp = fingerprint(nu, [l[i - 1] for i in u])
+                slot = self.ustuff.probe(fp)
+                if slot < 0:
                     collision = True
                     break  # non unique tuple
                 else:
-                    sul.append(su)
+                    sul.append((fp, slot))
             if collision:
                 # update l, but reuse l0 if serial/pk, otherwise it cycles!
-                i = 0
-                l = []
                 # reseed again! otherwise the new value would be generated.
                 # another option would be to keep the previous value when
                 # the generator is synchronized.
-                tuple_count += 1
-                self.mapGen(lambda s: s.shareSeed())
-                for g in lg:
-                    l.append(l0[i] if g.isUnique() or g.isSerial() \
-                                 else g.getData())
-                    i += 1
+                session.tuple_count += 1
+                self.shareSeed()
+                l = [v if keep else a.gen.getData() for a, v, keep in
+                     zip(self.gen_atts, l0, self.gen_keep)]
                 continue  # restart while with updated values
             else:  # record unique value
-                for su in sul:
-                    self.ustuff[su] = 1
+                for fp, slot in sul:
+                    self.ustuff.put(fp, slot)
                 return l
         assert False, \
-            "{0}: cannot build tuple after {1} tries".format(self, opts.tries)
+            "{0}: cannot build tuple after {1} tries". \
+                format(self, session.opts.tries)
+
+    def isBatchable(self):
+        """Whether tuples can be generated column by column."""
+        # unique checks and shared or persistent values are per tuple
+        deps = []
+        self.mapGen(lambda g: deps.append(g.perTuple()))
+        return not self.checked and not any(deps)
+
+    def isSeekable(self):
+        """Whether any tuple can be generated without the previous ones.
+
+        This holds under keyed generation unless unique constraints are
+        checked or some counter is not called exactly once per tuple.
+        """
+        self.prepare()
+        if self.checked:
+            return False
+        top = [a.gen for a in self.gen_atts]
+        counters = [g for g in self.keyed if g.isCounter()]
+        return all(g in top for g in counters)
+
+    def reserveUnique(self):
+        """Reserve the memory of unique values once the table is generated.
+
+        With a --spill-dir, values which do not fit are spilled to disk, and
+        only a Bloom filter and what memory is left are reserved.
+        """
+        self.prepare()
+        if not self.checked:
+            return
+        memory, directory = self.session.memory, self.session.opts.spill_dir
+        name = "table {0} unique values".format(self.name)
+        n = self.size * len(self.checked)
+        if directory == None or memory.fits(UniqueSet.bytesFor(n), name):
+            memory.reserve(name, UniqueSet.bytesFor(n))
+            self.ustuff.configure(n)
+            return
+        bloom = Spill.bloomBytes(n)
+        free = memory.limit - memory.used() + memory.components.get(name, 0)
+        limit = max(free - bloom, 0)
+        memory.reserve(name + " (on disk)", bloom + limit)
+        self.ustuff.configure(n, limit, directory)
+
+    def getState(self):
+        """Return the state changed by generation, see setState.
+
+        The unique values are copied whole, in time proportional to their
+        number, see Checkpoint.
+        """
+        return {'ustuff': self.ustuff.copy()}
+
+    def setState(self, state):
+        """Restore a state returned by getState."""
+        self.ustuff = state['ustuff'].copy()
+
+    def seek(self, row):
+        """Position generators so that the next tuple is number row."""
+        for a in self.gen_atts:
+            a.gen.seek(row)
+        for g in self.keyed:
+            g.rekey(row)
+
+    def iterChunks(self, chunk_size, start=0, stop=None, resumed=False):
+        """Yield column-major chunks of tuples to insert.
+
+        Each chunk is a pair (columns, last): a list with one list of values
+        per generated attribute, tuples dropped by 'skip' already removed,
+        and whether the chunk holds the last tuple of the table.
+        Only tuples numbered in [start, stop) are generated, which requires
+        keyed generation if start is not zero, unless resumed tells that
+        generators are already in their state after tuple start - 1.
+        """
+        self.prepare()
+        keyed = self.session.opts.keyed
+        stop = self.size if stop == None else stop
+        assert start == 0 or resumed or keyed and self.isSeekable(), \
+            "{0}: cannot start generation at tuple {1}".format(self, start)
+        gens = [a.gen for a in self.gen_atts]
+        funcs = self.gen_cols if self.gen_cols else [None] * len(gens)
+        batchable = not keyed and self.isBatchable()
+        getData, last = self.getData, self.size - 1
+        if self.checked:
+            # unless set by reserveUnique under --max-memory
+            if not self.ustuff.expected:
+                self.ustuff.configure(self.size * len(self.checked))
+            self.ustuff.presize()
+        for first in range(start, stop, chunk_size):
+            n = min(chunk_size, stop - first)
+            if keyed:
+                rows = []
+                for i in range(first, first + n):
+                    self.seek(i)
+                    rows.append(getData())
+                cols = [list(c) for c in zip(*rows)]
+            elif batchable:
+                cols = [f(n) if f else g.getBatch(n)
+                        for g, f in zip(gens, funcs)]
+            else:
+                cols = [list(c) for c in zip(*[getData() for i in range(n)])]
+            # although a tuple is generated, it may yet not be inserted
+            if self.skip:
+                keep = [not self.skipDraw(i) < self.skip or i == last
+                        for i in range(first, first + n)]
+                cols = [[v for v, k in zip(c, keep) if k] for c in cols]
+            yield cols, first + n > last
+        # spilled values are not needed once the table is generated
+        if stop == self.size and self.ustuff.spill:
+            self.ustuff.close()
+
+    def skipDraw(self, row):
+        """Draw for 'skip' on tuple number row."""
+        if self.session.opts.keyed:
+            self.skip_rand.seed(self.skip_seed + str(row))
+            return self.skip_rand.random()
+        return self.session.random.random()
 
 
 #
 # Databases
 #
 
+def escapes(chars):
+    """Return a str.translate table from a dictionary of escaped chars."""
+    return dict((ord(c), e) for c, e in chars.items())
+
+
 class Database(object):
-    """Abstract a database target."""
+    """Abstract a database target.
+
+    - opts: options, for the encoding and COPY settings
+    """
 
-    def comment(self, s):
-        print('-- ' + s)
+    def __init__(self, opts=None):
+        self.opts = opts
+
+    def comment(self, s, out=print):
+        out('-- ' + s)
 
     def echo(self, s):
         raise Exception('not implemented in abstract class')
@@ -291,6 +488,13 @@ class Database(object):
     def insertValue(self, table, value, isLast):
         raise Exception('not implemented in abstract class')
 
+    def insertChunk(self, table, columns, isLast):
+        """Return lines for a column-major chunk of tuples."""
+        rows = list(zip(*columns))
+        n = len(rows)
+        return os.linesep.join(self.insertValue(table, r, isLast and i == n - 1)
+                               for i, r in enumerate(rows))
+
     def insertEnd(self):
         raise Exception('not implemented in abstract class')
 
@@ -298,10 +502,10 @@ class Database(object):
         raise Exception('not implemented in abstract class')
 
     def dropTable(self, table):
-        return "DROP TABLE {0};".format(self.quote_ident(table.name))
+        return "DROP TABLE {0};".format(self.quoteIdent(table.name))
 
     def truncateTable(self, table):
-        return "DELETE FROM {0};".format(self.quote_ident(table.name))
+        return "DELETE FROM {0};".format(self.quoteIdent(table.name))
 
     # types
     def arrayType(self, type):
@@ -391,7 +595,7 @@ class Database(object):
 class CSV(Database):
     """CSV output."""
 
-    def comment(self, s):
+    def comment(self, s, out=print):
         pass
 
     def _comment(self, s):
@@ -414,7 +618,7 @@ class CSV(Database):
                                                         for a in filter(lambda x: x.gen, table.att_list))))
 
     def insertValue(self, table, value, isLast):
-        return ','.join(db.quoteLiteral(i) for i in value)
+        return ','.join(self.quoteLiteral(i) for i in value)
 
     def insertEnd(self):
         return ''
@@ -466,7 +670,7 @@ class PostgreSQL(Database):
 
     def insertBegin(self, table):
         # build COPY options
-        copyopts = []
+        copyopts, opts = [], self.opts
         if opts.encoding:
             copyopts.append("ENCODING '{0}'".format(opts.encoding))
         if opts.freeze:
@@ -489,27 +693,28 @@ class PostgreSQL(Database):
         elif isinstance(s, numeric_types):
             return str(s)
         elif isinstance(s, bytes):
-            return db.blobValue(s)
+            return self.blobValue(s)
         elif isinstance(s, tuple):
             return '(' + ','.join(self.dQuoteEsc(e, '') for e in s) + ')'
         else:
-            return q + ''.join(esc[c] if c in esc else c for c in str(s)) + q
+            return q + str(s).translate(esc) + q
 
-    # double quotes
-    DQESC = {'"': r'\"', '\\': r'\\'}
+    # double quotes, as str.translate tables
+    DQESC = escapes({'"': r'\"', '\\': r'\\'})
 
     def dQuoteEsc(self, s, null='NULL'):
         return self.quoteEsc(s, '"', PostgreSQL.DQESC, null)
 
     # simple quotes
-    SQESC = {"'": r"''"}
+    SQESC = escapes({"'": r"''"})
 
     def sQuoteEsc(self, s, null='NULL'):
         return self.quoteEsc(s, "'", PostgreSQL.SQESC, null)
 
     # how to escape some characters for PostgreSQL's COPY:
-    CPESC = {'\n': r'\n', '\t': r'\t', '\b': r'\b', '\r': r'\r', '\f': r'\f',
-             '\v': r'\v', '\a': r'\007', '\0': r'\000', '\\': r'\\'}
+    CPESC = escapes({'\n': r'\n', '\t': r'\t', '\b': r'\b', '\r': r'\r',
+                     '\f': r'\f', '\v': r'\v', '\a': r'\007', '\0': r'\000',
+                     '\\': r'\\'})
 
     def copyEsc(self, s):
         return self.quoteEsc(s, '', PostgreSQL.CPESC, self.null())
@@ -521,13 +726,28 @@ class PostgreSQL(Database):
         # generate tab-separated possibly escaped values
         return '\t'.join(self.copyEsc(i) for i in value)
 
+    def insertChunk(self, table, columns, isLast):
+        # escape column by column, then interleave values and separators
+        # in one list by slice assignments, so that the chunk is joined
+        # once, without a string per line
+        esc = [list(map(self.copyEsc, c)) for c in columns]
+        n, w = len(esc[0]), 2 * len(esc)
+        flat = [os.linesep] * (n * w)
+        tabs = ['\t'] * n
+        for k, c in enumerate(esc):
+            flat[2 * k::w] = c
+            if k < len(esc) - 1:
+                flat[2 * k + 1::w] = tabs
+        flat.pop()
+        return ''.join(flat)
+
     def insertEnd(self):
         return '\\.'
 
     def setSequence(self, tab, att, number):
         name = "{0}_{1}_seq".format(tab.name, att.name)
         if tab.quoted or att.quoted:
-            name = db.quoteIdent(name)
+            name = self.quoteIdent(name)
         return "ALTER SEQUENCE {0} RESTART WITH {1};".format(name, number)
 
     def dropTable(self, table):
@@ -599,3 +819,7 @@ class MySQL(Database):
     def intType(self, type):
         t = type.lower()
         return Database.intType(self, t) or t == 'tinyint' or t == 'mediumint'
+
+
+# available database targets
+TARGETS = {'postgresql': PostgreSQL, 'mysql': MySQL, 'csv': CSV}
@@ -0,0 +1,174 @@
+from __future__ import print_function, unicode_literals
+
+import argparse
+import re
+
+from datafiller.rng import RNGS
+
+__author__ = "danishabdullah"
+__all__ = ('VERSION', 'version', 'option_parser', 'default_options')
+
+VERSION = '2.0.1-dev'
+Id = '$Id: datafiller.py.py 832 2015-11-01 21:55:41Z fabien $'
+
+# extract revision informations from svn revision identifier
+
+revision, revdate, revyear = \
+    re.search(r' (\d+) ((\d{4})-\d\d-\d\d) ', Id).group(1, 2, 3)
+
+version = "{0} (r{1} on {2})".format(VERSION, revision, revdate)
+
+
+# option management
+# --size=1000
+# --target=postgresql|mysql
+# --help is automatic
+
+# version="version {0}".format(version),
+def option_parser():
+    """Return the command line option parser."""
+    parser = argparse.ArgumentParser(
+        description='Fill database tables with random data.')
+    parser.add_argument('-s', '--size', type=int, default=None,
+                        help='scale to size')
+    parser.add_argument('-t', '--target', default='postgresql',
+                        help='generate for this engine')
+    parser.add_argument('-e', '--encoding', type=str, default=None,
+                        help='set input & output encoding')
+    parser.add_argument('-f', '--filter', action='store_true', default=False,
+                        help='also include input in output')
+    parser.add_argument('--no-filter', action='store_true', default=False,
+                        help='do turn off filtering, whatever!')
+    parser.add_argument('--freeze', action='store_true', default=True,
+                        help='use PostgreSQL COPY FREEZE')
+    parser.add_argument('--no-freeze', dest='freeze', action='store_false',
+                        help='do not use PostgreSQL COPY FREEZE')
+    parser.add_argument('-T', '--transaction', action='store_true',
+                        help='wrap output in a transaction')
+    parser.add_argument('-S', '--seed', default=None,
+                        help='random generator seed')
+    parser.add_argument('-O', '--offset', type=int, default=None,
+                        help='set global offset for integer primary keys')
+    parser.add_argument('--truncate', action='store_true', default=False,
+                        help='truncate table contents before loading')
+    parser.add_argument('--drop', action='store_true', default=False,
+                        help='drop tables before reloading')
+    parser.add_argument('--batch', type=int, default=1000,
+                        help='number of tuples generated per batch')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of table generation processes')
+    parser.add_argument('--keyed', action='store_true', default=False,
+                        help='key random generation on tuple numbers')
+    parser.add_argument('--split', type=int, default=None,
+                        help='split tables in pieces of this many tuples')
+    parser.add_argument('--auto-tune', action='store_true', default=False,
+                        help='choose jobs, batch and split from sampled '
+                             'generation costs')
+    parser.add_argument('--estimate', action='store_true', default=False,
+                        help='show expected output size and generation time')
+    parser.add_argument('--sample-rows', type=int, default=2000,
+                        help='number of tuples sampled per table')
+    parser.add_argument('--max-memory', type=str, default=None,
+                        help='memory budget of growing components, eg 4G')
+    parser.add_argument('--spill-dir', type=str, default=None,
+                        help='spill unique values beyond the memory budget '
+                             'to this directory')
+    parser.add_argument('--rng', type=str, default='mt', choices=sorted(RNGS),
+                        help='random generator backend')
+    parser.add_argument('--cache', type=str, default=None,
+                        help='reuse table contents stored in this directory')
+    parser.add_argument('--cache-max-bytes', type=int, default=10 ** 10,
+                        help='size limit of the cache directory')
+    parser.add_argument('--parse-cache', type=str, default=None,
+                        help='store or load the parsed schema in this file')
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='write output to this file instead of stdout')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='write each table to a file in this directory')
+    parser.add_argument('--buffer-size', type=int, default=4 << 20,
+                        help='size of the output buffer in bytes')
+    parser.add_argument('--connect', type=str, default=None,
+                        help='write output to this unix socket path or '
+                             '[host:]port')
+    parser.add_argument('--pipeline', action='store_true', default=False,
+                        help='generate, encode and write in concurrent stages')
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help='number of chunks queued between pipeline stages')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='record generation progress in this file')
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0,
+                        help='seconds between checkpoints')
+    parser.add_argument('--resume', action='store_true', default=False,
+                        help='resume generation from the checkpoint file')
+    parser.add_argument('--rows', action='append', default=[],
+                        help='only generate this slice of a table, '
+                             'as table:start-stop')
+    parser.add_argument('--shard', type=str, default=None,
+                        help='generate only shard i out of N, as i/N')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='write the shard manifest to this file')
+    parser.add_argument('--check-manifests', action='store_true',
+                        default=False,
+                        help='check that manifest files cover a dataset')
+    parser.add_argument('--serve', type=str, default=None,
+                        help='serve generation requests on this unix socket '
+                             'path or [host:]port')
+    parser.add_argument('--serve-cache', type=int, default=64,
+                        help='number of prepared schemas kept by --serve')
+    parser.add_argument('--compile', action='store_true', default=False,
+                        help='compile table generators into flat functions')
+    parser.add_argument('-D', '--debug', action='count',
+                        help='set debug mode')
+    parser.add_argument('-m', '--man', action='store_const', const=2,
+                        help='show man page')
+    parser.add_argument('-n', '--null', type=float, default=None,
+                        help='probability of generating a NULL value')
+    parser.add_argument('--pod', type=str, default='pod2usage -verbose 3',
+                        help='override pod2usage command')
+    parser.add_argument('-q', '--quiet', action='store_true', default=False,
+                        help='less verbose output')
+    parser.add_argument('--benchmark', action='store_true', default=False,
+                        help='run benchmarks on validations')
+    parser.add_argument('--self-test', action='store_true', default=False,
+                        help='run automatic self test')
+    parser.add_argument('--self-test-hack', action='store_true', default=False,
+                        help='override system newline for self-test')
+    parser.add_argument('--self-test-python', type=str, default=None,
+                        help="self-test must run with this python")
+    parser.add_argument('-X', '--test', action='append',
+                        help='show generator output for directives')
+    parser.add_argument('--tries', type=int, default=10,
+                        help='how hard to try to satisfy unique constraints')
+    parser.add_argument('--type', action='append', default=[],
+                        help='add custom type')
+    parser.add_argument('--validate', type=str, default=None,
+                        help='shortcut for script validation')
+    parser.add_argument('-V', action='store_true', default=False,
+                        help='show short version on stdout and exit')
+    parser.add_argument('-v', '--version', action='version',
+                        version="version {0}".format(version),
+                        help='show version information')
+    parser.add_argument('file', nargs='*',
+                        help='process files, or stdin if empty')
+    return parser
+
+
+# default options, see default_options()
+_defaults = None
+
+
+def default_options(**kwargs):
+    """Return options as parsed from an empty command line, updated by kwargs.
+
+    The parser is only run once, later calls copy its result.
+    """
+    global _defaults
+    if _defaults == None:
+        _defaults = vars(option_parser().parse_args([]))
+    opts = argparse.Namespace(**_defaults)
+    # do not share mutable defaults between calls
+    opts.type = list(opts.type)
+    for k, v in kwargs.items():
+        assert hasattr(opts, k), "unexpected option '{0}'".format(k)
+        setattr(opts, k, v)
+    return opts
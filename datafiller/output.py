@@ -0,0 +1,132 @@
+from __future__ import print_function, unicode_literals
+
+import io
+import os
+
+__author__ = "danishabdullah"
+__all__ = ('OutputSink',)
+
+
+class OutputSink(object):
+    """Print-like function accumulating encoded output, which is written to
+    a binary file in large blocks.
+
+    Small pieces such as header lines are copied in a preallocated arena,
+    whereas large ones such as chunks of tuples are kept as is. Pending
+    output is a list of memoryview slices of the arena and of large pieces,
+    which is handed to os.writev in one call, without copying, when it
+    reaches the buffer size, and on flush(), which generation calls at
+    table boundaries. File methods used by --checkpoint first flush the
+    sink, so that the file position includes all output.
+
+    - output: binary output file
+    - int fd: file descriptor for os.writev, None to call output.write
+    - str encoding: output encoding
+    - bytes end: encoded default line ending
+    - int size: buffer size in bytes
+    - bytearray arena: preallocated buffer for small pieces
+    - int used: number of bytes used in the arena
+    - int mark: start of the arena bytes not yet in iov
+    - [] iov: pending slices and blocks, in output order
+    - int pending: number of pending bytes
+    """
+    # pieces up to this size are copied in the arena
+    SMALL = 8192
+
+    def __init__(self, output, encoding, size):
+        self.output = output
+        self.fd = None
+        if hasattr(os, 'writev'):
+            try:
+                self.fd = output.fileno()
+            except (AttributeError, io.UnsupportedOperation):
+                pass
+        self.encoding = encoding
+        self.end = os.linesep.encode(encoding)
+        self.size = size
+        self.arena = bytearray(max(size, OutputSink.SMALL))
+        self.used, self.mark = 0, 0
+        self.iov, self.pending = [], 0
+
+    def __call__(self, s, end=os.linesep):
+        self.write(s.encode(self.encoding))
+        self.write(self.end if end == os.linesep else end.encode(self.encoding))
+
+    def write(self, block):
+        """Output an encoded block."""
+        n = len(block)
+        if n > OutputSink.SMALL:
+            self.cut()
+            self.iov.append(block)
+        else:
+            used = self.used
+            if used + n > len(self.arena):
+                self.drain()
+                used = 0
+            # same length slice assignment, without reallocation
+            self.arena[used:used + n] = block
+            self.used = used + n
+        self.pending += n
+        if self.pending >= self.size:
+            self.drain()
+
+    def cut(self):
+        """Move arena bytes not yet pending to the list of slices."""
+        if self.used > self.mark:
+            self.iov.append(memoryview(self.arena)[self.mark:self.used])
+            self.mark = self.used
+
+    def drain(self):
+        """Write the pending bytes to the file."""
+        self.cut()
+        if self.fd == None:
+            for b in self.iov:
+                self.output.write(b)
+        elif self.iov:
+            # bytes buffered by the file object go first
+            self.output.flush()
+            writeAll(self.fd, self.iov)
+        self.iov, self.pending = [], 0
+        self.used, self.mark = 0, 0
+
+    def flush(self):
+        self.drain()
+        self.output.flush()
+
+    def fileno(self):
+        return self.output.fileno()
+
+    def tell(self):
+        self.flush()
+        return self.output.tell()
+
+    def seek(self, offset):
+        self.flush()
+        return self.output.seek(offset)
+
+    def truncate(self):
+        self.flush()
+        return self.output.truncate()
+
+
+# maximum number of buffers per os.writev call
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 16
+if IOV_MAX <= 0:
+    IOV_MAX = 16
+
+
+def writeAll(fd, buffers):
+    """Write all buffers to file descriptor fd with os.writev, which may
+    write only part of them."""
+    buffers, i = [memoryview(b) for b in buffers], 0
+    while i < len(buffers):
+        n = os.writev(fd, buffers[i:i + IOV_MAX])
+        # skip written buffers, and the written part of a partial one
+        while i < len(buffers) and n >= len(buffers[i]):
+            n -= len(buffers[i])
+            i += 1
+        if n:
+            buffers[i] = buffers[i][n:]
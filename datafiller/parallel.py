@@ -0,0 +1,195 @@
+from __future__ import print_function, unicode_literals
+
+__author__ = "danishabdullah"
+__all__ = ('tableGroups', 'tableTasks', 'tableDeps', 'fillParallel',
+           'fillScheduled')
+
+# function generating a table block from its index, set by fillParallel
+# before the worker processes are forked, so that they inherit it.
+_fill = None
+
+
+def sharedKeys(table, keyed=False):
+    """Return keys of the generation state that table shares with others.
+
+    - shared generators from 'share' directives
+    - persistent generators from 'value' directives
+    - the global random stream, which is drawn by 'skip' unless keyed
+    """
+    keys = set()
+
+    def addKey(g):
+        if g.perTuple():
+            keys.add(id(getattr(g, 'shared', None) or g))
+
+    table.mapGen(addKey)
+    if table.skip and not keyed:
+        keys.add('skip')
+    return keys
+
+
+def tableGroups(tables, keyed=False):
+    """Return lists of table indexes to be generated by the same process.
+
+    Tables which share some generation state are put in the same group,
+    so that they are generated in order as in a sequential run.
+    Groups are sorted by their first table.
+    """
+    groups = []  # [ [ set of keys, [ table indexes ] ] ]
+    for i, t in enumerate(tables):
+        keys, indexes = sharedKeys(t, keyed), [i]
+        for g in [g for g in groups if g[0] & keys]:
+            groups.remove(g)
+            keys |= g[0]
+            indexes = g[1] + indexes
+        groups.append([keys, indexes])
+    return sorted((g[1] for g in groups), key=lambda l: l[0])
+
+
+def tableTasks(tables, keyed=False, split=None, splittable=None):
+    """Return lists of table pieces to be generated by the same process.
+
+    A piece (index, start, stop) is the range of tuples [start, stop) of a
+    table, stop is None up to the end of the table. Tables alone in their
+    group are split in pieces of split tuples if they are splittable.
+    """
+    tasks = []
+    for g in tableGroups(tables, keyed):
+        t = tables[g[0]]
+        if split and len(g) == 1 and t.size > split and splittable(t):
+            tasks += [[(g[0], start, min(start + split, t.size))]
+                      for start in range(0, t.size, split)]
+        else:
+            tasks.append([(i, 0, None) for i in g])
+    return tasks
+
+
+def tableDeps(tables, skipped=()):
+    """Return for each table the set of indexes of tables it references.
+
+    Self references and skipped tables are ignored. If foreign keys make
+    a cycle, only references to previous tables are kept, so that tables
+    still have a load order, which is then the occurrence order for them.
+    """
+    index = dict((t, i) for i, t in enumerate(tables))
+    deps = [set(index[a.FK] for a in t.att_list
+                if a.FK != None and a.FK is not t and a.FK not in skipped)
+            for t in tables]
+    # check for cycles by removing tables without pending references
+    pending, done = set(range(len(tables))), set()
+    while True:
+        ready = [i for i in pending if deps[i] <= done]
+        if not ready:
+            break
+        pending -= set(ready)
+        done |= set(ready)
+    if pending:
+        deps = [set(j for j in d if j < i) for i, d in enumerate(deps)]
+    return deps
+
+
+def _fillTask(pieces):
+    return [_fill(*piece) for piece in pieces]
+
+
+def fillParallel(tables, fill, write, jobs, keyed=False, split=None,
+                 splittable=None, order=None):
+    """Generate tables in worker processes, and write them in order.
+
+    - Table[] tables: tables to generate
+    - fill: function returning the encoded tuples [start, stop) of a table
+    - write: function to output encoded contents
+    - int jobs: number of worker processes
+    - bool keyed: whether generation is keyed on tuple numbers
+    - int split: number of tuples per piece when splitting a table
+    - splittable: function telling whether a table can be split
+    - order: indexes of tasks from tableTasks in submission order, so that
+      costly tasks start first, default is table order
+    """
+    global _fill
+    import multiprocessing
+    assert 'fork' in multiprocessing.get_all_start_methods(), \
+        "parallel generation requires processes to be forked"
+    # generators are inherited by workers, which only receive indexes
+    _fill = lambda i, start, stop: fill(tables[i], start, stop)
+    tasks = tableTasks(tables, keyed, split, splittable)
+    owner = dict((p, n) for n, task in enumerate(tasks) for p in task)
+    pool = multiprocessing.get_context('fork').Pool(jobs)
+    try:
+        results = [None] * len(tasks)
+        for n in order or range(len(tasks)):
+            results[n] = pool.apply_async(_fillTask, (tasks[n],))
+        # write pieces in table order as soon as they are available
+        blocks = {}
+        for p in sorted(owner, key=lambda p: p[0:2]):
+            n = owner[p]
+            if not n in blocks:
+                blocks[n] = dict(zip(tasks[n], results[n].get()))
+            write(blocks[n].pop(p))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        _fill = None
+
+
+def fillScheduled(tables, fill, emit, jobs, deps, keyed=False):
+    """Generate tables, possibly in worker processes, and emit each one as
+    soon as the tables it references are emitted.
+
+    - Table[] tables: tables to generate
+    - fill: function generating a table, with the same arguments as for
+      fillParallel, and returning a picklable result
+    - emit: function called with the index of a table and the result of
+      its generation, in an order compatible with deps
+    - int jobs: number of worker processes, none if 1
+    - set[] deps: indexes of tables which must be emitted before each table
+    - bool keyed: whether generation is keyed on tuple numbers
+    """
+    global _fill
+    results, emitted = {}, set()
+
+    def emitReady():
+        progress = True
+        while progress:
+            progress = False
+            for i in sorted(results):
+                if deps[i] <= emitted:
+                    emit(i, results.pop(i))
+                    emitted.add(i)
+                    progress = True
+
+    tasks = tableTasks(tables, keyed)
+    if jobs == 1:
+        for task in tasks:
+            for i, start, stop in task:
+                results[i] = fill(tables[i], start, stop)
+            emitReady()
+        return
+    import multiprocessing
+    import queue
+    assert 'fork' in multiprocessing.get_all_start_methods(), \
+        "parallel generation requires processes to be forked"
+    _fill = lambda i, start, stop: fill(tables[i], start, stop)
+    done = queue.Queue()
+    pool = multiprocessing.get_context('fork').Pool(jobs)
+    try:
+        pending = [pool.apply_async(_fillTask, (task,),
+                                    callback=lambda r, n=n: done.put(n),
+                                    error_callback=lambda e: done.put(None))
+                   for n, task in enumerate(tasks)]
+        for k in range(len(tasks)):
+            n = done.get()
+            if n == None:
+                # raise the worker exception
+                for p in pending:
+                    if p.ready() and not p.successful():
+                        p.get()
+            for (i, start, stop), r in zip(tasks[n], pending[n].get()):
+                results[i] = r
+            emitReady()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        _fill = None
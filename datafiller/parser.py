@@ -0,0 +1,239 @@
+from __future__ import print_function, unicode_literals
+
+import re
+import sys
+
+from datafiller.consts import RE_IDENT, RE_ARRAY, backslash, df_junk, df_tab, df_att, df_dir, df_mac, comments, \
+    new_object, alter_column, create_enum, alter_table, create_type, column, primary_key, unique, not_null, reference, \
+    add_unique, unicity, add_fk, create_table, re_quoted
+from datafiller.generators import GENERATORS
+from datafiller.models import Attribute, Table
+from datafiller.utils import getParams
+
+__author__ = "danishabdullah"
+__all__ = ('Parser', 'sql_string_list')
+
+
+def sql_string_list(line):
+    """Return an unquoted list of sql strings."""
+    sl = []
+    quoted = re_quoted.match(line)
+    while quoted:
+        sl.append(quoted.group(1))
+        line = quoted.group(3)
+        quoted = re_quoted.match(line)
+    return sl
+
+
+class Parser(object):
+    """Parse a schema with directives into the tables of a session.
+
+    Alas this is not a real parser, but a line by line regexp matcher.
+
+    - Session session: where tables, enums and macros are stored
+    - Table current_table, Attribute current_attribute: being defined
+    - str current_enum: enum type being defined
+    - str dfstuff: pending directives for the current object
+    - int att_number: attribute number in the current table
+    - str re_enums, re_types: alternations of enum and custom type names
+    - column_enum, column_type: regexps for columns of these types
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.current_table = None
+        self.current_attribute = None
+        self.current_enum = None
+        self.dfstuff = None
+        self.att_number = 0
+        self.re_enums, self.column_enum = '', None
+        self.re_types, self.column_type = '', None
+
+    def addType(self, t):
+        if self.re_types:
+            self.re_types += '|' + t
+        else:
+            self.re_types = t
+        self.column_type = \
+            re.compile(r'^\s*,?\s*(ADD\s+COLUMN\s+)?({0})\s+({1}{2})'. \
+                       format(RE_IDENT, self.re_types, RE_ARRAY), re.I)
+
+    def parse(self, lines):
+        for line in lines:
+            self.parseLine(line)
+
+    def parseLine(self, line):
+        session = self.session
+        tables, all_tables = session.tables, session.all_tables
+        debug = session.debug if session.opts.debug else None
+        # if debug: debug(3, u8("line={0}").format(line))
+        # skip \commands
+        if backslash.match(line):
+            return
+        # skip commented out directives
+        if df_junk.match(line):
+            return
+        # get datafiller.py stuff
+        # directives with explicit table & attribute
+        d = df_tab.match(line)
+        if d:
+            if debug: debug(2, "explicit TA directive")
+            self.current_table = all_tables[d.group(2).lower()]
+            self.current_attribute = None
+        d = df_att.match(line)
+        if d:
+            if debug: debug(2, "set attribute")
+            assert self.current_table != None
+            self.current_attribute = self.current_table.getAttribute(d.group(2))
+        # extract directive
+        d = df_dir.match(line)
+        if d:
+            if debug: debug(2, "is a directive")
+            self.dfstuff = d.group(1)
+        # get datafiller.py macro definition
+        d = df_mac.match(line)
+        if d:
+            if debug: debug(2, "is a macro")
+            mname = d.group(1)
+            if mname in session.macros:
+                sys.stderr.write("warning: macro {0} is redefined\n".
+                                 format(mname))
+            assert mname not in GENERATORS, \
+                "do not use generator name '{0}' as a macro name!".format(mname)
+            session.macros[mname] = getParams(d.group(2), session.macros)
+            # reset current params so that it is not stored in an object
+            self.dfstuff = None
+        # cleanup comments
+        c = comments.match(line)
+        if c:
+            if debug: debug(2, "cleanup comment")
+            line = c.group(1)
+        # reset current object
+        # argh, beware of ALTER TABLE ... ALTER COLUMN!
+        if new_object.match(line) and not alter_column.match(line):
+            self.current_table = None
+            self.current_attribute = None
+            self.current_enum = None
+            self.att_number = 0
+        #
+        # CREATE TYPE ... AS ENUM
+        #
+        is_ce = create_enum.match(line)
+        if is_ce:
+            self.current_enum = is_ce.group(1)  # lower()?
+            if debug: debug(2, "create enum " + self.current_enum)
+            if self.re_enums:
+                self.re_enums += '|'
+            # ??? should escape special characters such as "."
+            self.re_enums += self.current_enum
+            session.enums[self.current_enum] = sql_string_list(line)
+            self.column_enum = \
+                re.compile(r'\s*,?\s*(ADD\s+COLUMN\s+)?({0})\s+({1})'. \
+                           format(RE_IDENT, self.re_enums), re.I)
+            return
+        # follow up...
+        if self.current_enum:
+            session.enums[self.current_enum].extend(sql_string_list(line))
+            return
+        #
+        # CREATE TYPE ... AS
+        #
+        is_ty = create_type.match(line)
+        if is_ty:
+            self.addType(is_ty.group(1))
+            return
+        #
+        # ALTER/CREATE TABLE
+        #
+        is_at = alter_table.match(line)
+        if is_at:
+            name = is_at.group(2)
+            if debug: debug(2, "alter table " + name)
+            self.current_table = all_tables[name.lower()]
+            self.att_number = len(self.current_table.atts)
+        is_ct = create_table.match(line)
+        if is_ct:
+            name = is_ct.group(1)
+            if debug: debug(2, "create table " + name)
+            self.current_table = Table(name, session)
+            tables.append(self.current_table)
+            all_tables[name.lower()] = self.current_table
+        elif self.current_table != None:
+            self.parseTableLine(line)
+        # attribute df stuff to current object: schema, table or attribute
+        # this come last if the dfstuff is on the same line as its object
+        if self.dfstuff != None:
+            if self.current_attribute != None:
+                self.current_attribute.setParams(self.dfstuff)
+            elif self.current_table != None:
+                self.current_table.setParams(self.dfstuff)
+            else:
+                session.schema.setParams(self.dfstuff)
+            self.dfstuff = None
+
+    def parseTableLine(self, line):
+        """Parse a line within a table definition."""
+        session = self.session
+        table, all_tables = self.current_table, session.all_tables
+        debug = session.debug if session.opts.debug else None
+        #
+        # COLUMN
+        #
+        is_enum = False
+        # try standard types
+        c = column.match(line)
+        # try enums
+        if not c and self.column_enum:
+            c = self.column_enum.match(line)
+            is_enum = bool(c)
+        # try other types
+        if not c and self.column_type:
+            c = self.column_type.match(line)
+        if c:
+            if debug: debug(2, "column " + c.group(2))
+            self.att_number += 1
+            att = Attribute(c.group(2), self.att_number, c.group(3), session)
+            self.current_attribute = att
+            att.is_enum = is_enum
+            if primary_key.match(line):
+                if debug: debug(2, "primary key")
+                att.isPK = True
+            if unique.match(line):
+                if debug: debug(2, "unique")
+                att.unique = True
+            if not_null.match(line):
+                if debug: debug(2, "not null")
+                att.not_null = True
+            table.addAttribute(att)
+            r = reference.match(line)
+            if r:
+                if debug: debug(2, "reference")
+                target = r.group(1)
+                att.FK = all_tables[target.lower()]
+                att.FKatt = r.group(5) if r.group(4) else None
+        # ADD UNIQUE
+        q = add_unique.match(line)
+        if q:
+            if debug: debug(2, "add unique")
+            table.addUnique(re.split(r'[\s,]+', q.group(3)), q.group(2))
+        else:
+            # UNIQUE()
+            q = unicity.match(line)
+            if q:
+                if debug: debug(2, "unicity")
+                table.addUnique(re.split(r'[\s,]+', q.group(2)), q.group(1))
+        r = add_fk.match(line)
+        if r:
+            if debug: debug(2, "add foreign key")
+            src, target = r.group(2, 3)
+            att = self.current_attribute = table.getAttribute(src)
+            att.FK = all_tables[target.lower()]
+            att.FKatt = r.group(7) if r.group(6) else None
+        c = alter_column.match(line)
+        if c:
+            if debug: debug(2, "alter column " + c.group(1))
+            att = self.current_attribute = table.getAttribute(c.group(1))
+            # ... SET NOT NULL
+            if not_null.match(line):
+                if debug: debug(2, "set not null")
+                att.not_null = True
@@ -0,0 +1,109 @@
+from __future__ import print_function, unicode_literals
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+__author__ = "danishabdullah"
+__all__ = ('Stage', 'runPipeline')
+
+# marks the end of the items in a queue
+_END = object()
+
+
+class Stage(object):
+    """Statistics of a pipeline stage.
+
+    - str name: stage name
+    - int items: number of items processed
+    - float busy: seconds spent processing items
+    - float starved: seconds spent waiting for an input item
+    - float blocked: seconds spent waiting for room in the output queue
+    - int queued, samples, peak: output queue lengths, summed over samples
+      taken on each put, and maximum
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.items, self.busy, self.starved, self.blocked = 0, 0.0, 0.0, 0.0
+        self.queued, self.samples, self.peak = 0, 0, 0
+
+    def sample(self, queue):
+        n = queue.qsize()
+        self.queued += n
+        self.samples += 1
+        self.peak = max(self.peak, n)
+
+    def __str__(self):
+        occupancy = self.queued / self.samples if self.samples else 0.0
+        return "{0:<9} {1:>9d} {2:>9.2f} {3:>9.2f} {4:>9.2f} {5:>6.1f} {6:>5d}". \
+            format(self.name, self.items, self.busy, self.starved,
+                   self.blocked, occupancy, self.peak)
+
+    @staticmethod
+    def header():
+        return "{0:<9} {1:>9} {2:>9} {3:>9} {4:>9} {5:>6} {6:>5}". \
+            format('stage', 'items', 'busy(s)', 'starved', 'blocked',
+                   'queue', 'peak')
+
+
+async def _stage(loop, executor, stage, func, source, sink):
+    """Apply func to items from queue source, or from iterator source if it
+    is not a queue, and put results in queue sink, if any."""
+    next_item = (lambda: next(source, _END)) \
+        if not isinstance(source, asyncio.Queue) else None
+    while True:
+        start = time.time()
+        if next_item:
+            # producing is the work of the first stage
+            item = await loop.run_in_executor(executor, next_item)
+            stage.busy += time.time() - start
+        else:
+            item = await source.get()
+            stage.starved += time.time() - start
+        if item is _END:
+            break
+        if func:
+            start = time.time()
+            item = await loop.run_in_executor(executor, func, item)
+            stage.busy += time.time() - start
+        stage.items += 1
+        if sink:
+            start = time.time()
+            await sink.put(item)
+            stage.blocked += time.time() - start
+            stage.sample(sink)
+    if sink:
+        await sink.put(_END)
+
+
+async def _run(items, serialize, write, depth, stages):
+    loop = asyncio.get_event_loop()
+    q1, q2 = asyncio.Queue(depth), asyncio.Queue(depth)
+    # one thread per stage, so that a stalled sink does not stop generation
+    executors = [ThreadPoolExecutor(1) for s in stages]
+    try:
+        tasks = [_stage(loop, executors[0], stages[0], None, iter(items), q1),
+                 _stage(loop, executors[1], stages[1], serialize, q1, q2),
+                 _stage(loop, executors[2], stages[2], write, q2, None)]
+        await asyncio.gather(*tasks)
+    finally:
+        for e in executors:
+            e.shutdown(wait=True)
+
+
+def runPipeline(items, serialize, write, depth):
+    """Generate, serialize and write items in concurrent stages.
+
+    Stages are connected by queues of at most depth items, so that a slow
+    stage blocks the previous ones instead of letting memory grow.
+    Return the statistics of the generate, serialize and write stages.
+
+    - items: iterable of items, which are generated when iterated
+    - serialize: function converting an item to bytes
+    - write: function writing bytes to the sink
+    - int depth: maximum number of items in each queue
+    """
+    stages = [Stage('generate'), Stage('serialize'), Stage('write')]
+    asyncio.run(_run(items, serialize, write, depth, stages))
+    return stages
@@ -36,6 +36,108 @@ C<--validate=library> and look at the output for didactic examples.
 
 =over 4
 
+=item C<--auto-tune>
+
+Generate the first tuples of each table, see C<--sample-rows>, and measure the
+cost of each table and column.
+Then choose the number of processes, the batch size and, under C<--keyed>
+generation, how tables are split, so that the costliest tables are balanced
+against the available cores.
+Costly tasks are started first.
+The chosen plan and the measured costs are shown on stderr.
+The output is the same as without this option.
+
+Default is to use the C<--jobs>, C<--batch> and C<--split> settings.
+
+=item C<--batch=NUM>
+
+Number of tuples generated together.
+Tables without compound unique constraints which may collide, i.e. which do
+not hold a serial or count attribute, nor shared or persistent values
+are generated column by column for each batch, which avoids most per-value
+overheads.
+The output does not depend on this setting.
+
+Default is 1000.
+
+=item C<--buffer-size=NUM>
+
+Size in bytes of the output buffer.
+Encoded output is accumulated in this buffer, which is written when full and
+at the end of each table, instead of writing and flushing each line.
+Small pieces are copied in the buffer, large ones are kept as is, and all are
+written with one writev system call when available.
+The output does not depend on this setting.
+
+Default is 4194304.
+
+=item C<--cache=DIR>
+
+Store the output of each table in directory DIR, and reuse it on later runs
+instead of generating the table again.
+Entries are keyed by a hash of the parsed table, the schema macros and
+directives, the options which change the output, the script version and the
+random state left by previous tables, so that a run with one changed table
+only regenerates this table, and the following ones if their seeds depend on
+it.
+Files read by word or file directives are identified by their path, size and
+modification time.
+Caching requires a seed and sequential generation.
+
+Default is not to cache.
+
+=item C<--cache-max-bytes=NUM>
+
+Size limit of the cache directory.
+Least recently used entries are removed beyond this limit.
+
+Default is 10000000000.
+
+=item C<--check-manifests>
+
+Check that the shard manifests given as file arguments come from the same
+dataset and together cover all tuples of all tables exactly once, see
+C<--shard>.
+Errors are shown on stderr, and the exit status is 1 if any.
+
+=item C<--checkpoint=FILE>
+
+Record the progress of the generation in FILE every C<--checkpoint-interval>
+seconds: the tuples already output for each table, the counters and random
+states of generators and the values seen for unique constraints.
+The output file is synced before each checkpoint, and the checkpoint is
+removed once the generation is complete.
+This requires options C<--output> and C<--seed>, and sequential generation
+without C<--cache>.
+As the unique values are recorded whole, a checkpoint takes time in proportion
+to their number, and the interval is stretched so that checkpoints take at
+most a tenth of the generation time.
+
+Default is not to record checkpoints.
+
+=item C<--checkpoint-interval=SECONDS>
+
+Minimum time between two checkpoints.
+
+Default is 60.
+
+=item C<--compile>
+
+Compile the generators of each table into a flat python function, with
+constants folded and nested B<cat>, B<alt>, B<repeat> and B<pattern>
+generators inlined.
+This speeds up tables with such generators.
+The output does not depend on this setting.
+
+Default is not to compile.
+
+=item C<--connect=ADDRESS>
+
+Write the output to a unix socket path if ADDRESS contains a '/', or else to a
+TCP [host:]port, for instance a loader listening on a socket.
+
+Default is to write to stdout.
+
 =item C<--debug> or C<-D>
 
 Set debug mode.
@@ -56,6 +158,19 @@ Set this encoding for input and output files.
 
 Default is no explicit encoding.
 
+=item C<--estimate>
+
+Do not generate data, but show the expected number of tuples, the encoded size
+for the target of each table and in total, and the estimated generation time
+with the C<--jobs> setting, or with the plan chosen by C<--auto-tune>.
+Figures are extrapolated from the generation of the first tuples of each
+table, see C<--sample-rows>, and of the last ones under C<--keyed> generation,
+so that later wider tuples, eg with more digits, or costly unique constraints
+may take more than estimated.
+Per-table seconds do not include any worker processes.
+
+Default is to generate data.
+
 =item C<--filter> or C<-f>, reverse with C<--no-filter>
 
 Work as a filter, i.e. send the schema input script to stdout and then
@@ -75,10 +190,60 @@ Default is to use it, as it allows better performance.
 
 Show basic help.
 
+=item C<--jobs=NUM> or C<-j NUM>
+
+Number of processes used to generate tables.
+Each table is generated by one worker process, and the outputs are written
+in the original table order.
+Tables which share generation state, through B<share> or B<value> directives
+or because they rely on B<skip>, are generated in order by the same process,
+so that the output is the same as a sequential run for a given seed.
+
+Default is 1, i.e. no worker processes.
+
+=item C<--keyed>
+
+Key random generation on tuple numbers, so that any tuple can be generated
+without generating the previous ones.
+Random generators are reseeded for each tuple, and counters are positioned
+on the tuple number.
+The output differs from the default generation, but it does not depend on
+how tables are split between processes.
+
+Default is not to.
+
 =item C<--man> or C<-m>
 
 Show full man page based on POD. Yes, the perl thing:-)
 
+=item C<--manifest=FILE>
+
+Write the manifest of a C<--shard> to FILE as JSON: the dataset key, the shard
+number, the size of all tables and the ranges of tuples in this shard.
+
+Default is the output file name with a .manifest suffix under C<--output>,
+otherwise no manifest.
+
+=item C<--max-memory=SIZE>
+
+Budget for the memory held by components which grow with the data, such as 4G
+or 512M.
+Word lists loaded from files which do not fit are left on disk and read on
+access through an index of line offsets.
+Other word lists, and the file names and largest file of file generators are
+accounted for too, this file twice as it is read and converted.
+The fingerprints of the values of unique constraints which may collide are
+accounted for before generation, about 46 bytes per value of two integers
+with the values kept to tell fingerprints apart, so that a billion tuples with
+two such constraints need about 93 GB, or about 2.5 GB of Bloom filter under
+C<--spill-dir>.
+If the budget cannot be honored, the run fails before generating any table,
+with the memory needed by each component, unless C<--spill-dir> lets
+fingerprints go to disk.
+The output does not depend on this setting.
+
+Default is no budget.
+
 =item C<--null RATE> or C<-n RATE>
 
 Probability to generate a null value for nullable attributes.
@@ -95,24 +260,176 @@ for larger tests.
 Default is 1, which can be overriden by the B<offset> directive at
 the schema level, or per-attribute provided B<offset>.
 
+=item C<--output=FILE> or C<-o FILE>
+
+Write the generated data to FILE instead of stdout.
+
+Default is to write to stdout.
+
+=item C<--output-dir=DIR>
+
+Write each generated table to its own file in directory DIR, named after the
+table with a .sql or .csv suffix, while other statements such as sequence
+restarts still go to the standard output or C<--output>.
+Under C<--jobs>, tables are generated concurrently, and a table file appears
+as soon as the table is generated and all the tables it references through
+foreign keys have appeared.
+Its name is then appended to file DIR/order, which ends with a line holding
+END, so that loaders can follow this file and load parent tables while child
+tables are still being generated.
+If foreign keys make a cycle, tables only wait for the previous tables they
+reference.
+This does not work with C<--transaction>, C<--split>, C<--cache>,
+C<--checkpoint>, C<--shard> nor C<--rows>.
+
+Default is to write all tables to the standard output or C<--output>.
+
+=item C<--parse-cache=FILE>
+
+Store the parsed schema in FILE, and load it instead of parsing the input
+again on later runs if the input, the target, the custom types and the script
+version are the same.
+Sizes and generators are still computed for each run, so that C<--size> and
+C<--seed> may change.
+This is useful for large schemas.
+
+Default is to always parse the input.
+
+=item C<--pipeline>
+
+Generate tuples, format and encode them, and write them in three concurrent
+stages connected by bounded queues, so that generation goes on while the
+output is stalled, for instance when the database is busy, until the queues
+are full.
+Statistics of each stage are shown on stderr at the end: items processed,
+seconds spent working, waiting for input (starved) and waiting for room in the
+next queue (blocked), and the mean and peak length of its output queue.
+The stage which is never starved is the bottleneck.
+The output does not depend on this setting.
+This requires sequential generation.
+
+Default is to generate and write in turn.
+
 =item C<--pod COMMAND>
 
 Override pod conversion command used by option C<--man>.
 
 Default is 'pod2usage -verbose 3'.
 
+=item C<--queue-size=NUM>
+
+Maximum number of chunks of tuples in each queue between C<--pipeline> stages.
+
+Default is 16.
+
 =item C<--quiet> or C<-q>
 
 Generate less verbose SQL output.
 
 Default is to generate one echo when starting to fill a table.
 
+=item C<--resume>
+
+Resume an interrupted generation from the C<--checkpoint> file.
+The output file is truncated to the contents recorded by the checkpoint, and
+generation continues from there with the same options and input, so that the
+final output is the same as an uninterrupted run.
+
+Default is to start from scratch.
+
+=item C<--rng=(mt|splitmix)>
+
+Random generator backend used by data generators.
+C<mt> is Python's Mersenne Twister.
+C<splitmix> is a counter-based generator which computes each draw from a key
+derived from the seed and a draw counter, so that reseeding is cheap.
+This helps generators which reseed for each value, such as B<chars>,
+B<blob>, B<mac>, B<luhn> and B<ean>, shared generators and keyed generation
+with option C<--keyed>.
+Both backends generate different data for the same seed.
+
+Default is C<mt>, for compatibility with previous versions.
+
+=item C<--rows=TABLE:START-STOP>
+
+Only generate tuples numbered from START, counting from 0, up to STOP excluded
+of table TABLE, for instance to regenerate a piece which failed to load.
+STOP may be omitted for the end of the table.
+The option may be repeated, and each slice is output with its own COPY or
+INSERT.
+Under C<--keyed> generation, tables which could be split by C<--split> are
+positioned directly on START, as are tables whose compound unique constraints
+hold a serial or count attribute, which cannot collide.
+Otherwise the previous tuples are generated without output to rebuild the
+generation state and the unique values.
+The input, seed and options must be those of the original run, and the schema
+must not be reloaded, thus C<--filter>, C<--drop> and C<--truncate> are not
+allowed.
+Sequences are not restarted and tables are not analyzed.
+
+Default is to generate all tables.
+
+=item C<--sample-rows=NUM>
+
+Number of tuples generated per table to measure generation costs under options
+C<--auto-tune> and C<--estimate>.
+
+Default is 2000.
+
 =item C<--seed SEED> or C<-S SEED>
 
 Seed overall random generation with provided string.
 
 Default uses OS supplied randomness or current time.
 
+=item C<--serve=ADDRESS>
+
+Serve generation requests over HTTP on a unix socket path, if the address
+contains a '/', or else on a TCP [host:]port, instead of processing files.
+The schema is posted and data for its tables are returned, as the script would
+output them.
+Parsed schemas with their generators are kept between requests, so that
+generating the same data again is fast.
+
+  sh> {name} --serve=/tmp/df.sock &
+  sh> curl --unix-socket /tmp/df.sock --data-binary @schema.sql \\
+           'http://df/?size=10&seed=Calvin&tables=foo,bar' | psql
+
+A posted schema may be reused with GET on its hash, which is returned in the
+X-Schema header.
+Query options are size, seed, target, offset, null, batch, tries, rng, keyed,
+compile, freeze and quiet, other options are taken from the command line.
+Only requested tables are output, although previous tables are also generated
+unless C<--keyed> is set, because they may change the random state.
+Data are sent with chunked transfer encoding as they are generated.
+A generation error is answered with status 500 if no data were sent yet, or
+else ends the output with an error line and closes the connection without the
+last chunk, which clients report as a truncated transfer.
+Prepared schemas are only kept for seeded requests, so that unseeded ones
+return new data.
+
+=item C<--serve-cache=NUM>
+
+Number of prepared schemas kept by C<--serve>.
+
+Default is 64.
+
+=item C<--shard=i/N>
+
+Only generate shard i out of N, numbered from 1, so that a dataset can be
+generated on N hosts without any coordination.
+Tables which can be split under C<--keyed> generation are cut in N ranges of
+tuples, others go whole to one shard, and each piece is output with its own
+COPY or INSERT so that shards are loaded independently.
+All shards must use the same input, seed and options, which imply C<--keyed>:
+the union of their tuples is then the output of a C<--keyed> run.
+The schema must be loaded separately, thus the C<--filter>, C<--drop> and
+C<--truncate> options are not allowed.
+Only the last shard restarts sequences and analyzes tables, thus it should be
+loaded last.
+
+Default is to generate all tables.
+
 =item C<--size SIZE>
 
 Set overall scaling. The size is combined with the B<mult> directive value
@@ -121,6 +438,33 @@ on a table to compute the actual number of tuples to generate in each table.
 Default is 100, which can be overriden with the B<size> directive at the
 schema level.
 
+=item C<--spill-dir=DIR>
+
+Under C<--max-memory>, when the fingerprints of unique values of a table do
+not fit in the budget, keep them in memory up to what is left, then move them
+to temporary files in DIR: probe keys split in 256 memory mapped partitions,
+and the exact values in one more file, which is only read when keys match.
+A Bloom filter of about 10 bits per value stays in memory, so that checking a
+new value usually reads no file.
+Files are removed once the table is generated.
+This option cannot be used with C<--checkpoint>.
+The output does not depend on this setting, including retries under
+C<--tries>.
+
+Default is to fail if fingerprints do not fit in the budget.
+
+=item C<--split=NUM>
+
+Split tables larger than I<NUM> tuples in pieces generated by different
+processes under option C<--jobs>.
+This implies option C<--keyed>.
+Tables with compound unique constraints which may collide, with nested
+counters or which share
+state with other tables are not split.
+The output is the same whatever the number of processes and the size of pieces.
+
+Default is not to split tables.
+
 =item C<--target (postgresql|mysql|csv)> or C<-t ...>
 
 Target database engine.
@@ -193,6 +537,26 @@ Show script version.
 
 Files containing SQL schema definitions. Standard input is processed if empty.
 
+=head1 LIBRARY
+
+The generator can also be driven from a Python program, without going through
+the script, its files or its options.
+Importing C<datafiller.api> has no side effect.
+
+  from datafiller.api import generate
+
+  for table, rows in generate(schema, size=1000, seed='Calvin'):
+      print(table.name, len(rows))
+
+Function C<generate(schema_text, size=None, seed=None, target='postgresql',
+encoded=False, **options)> parses the schema and creates the generators
+immediately, so that schema errors are raised on call, then returns a lazy
+iterator of pairs: the table and a batch of row tuples.
+With C<encoded=True>, pieces of the output script for the target are yielded
+as bytes instead, which is what the script writes for the table.
+Other keyword arguments are option names as in the script,
+e.g. C<batch=100>, C<keyed=True> or C<rng='splitmix'>.
+
 =head1 TUTORIAL
 
 This tutorial introduces how to use DataFiller to fill a PostgreSQL database
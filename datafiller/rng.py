@@ -0,0 +1,93 @@
+from __future__ import print_function, unicode_literals
+
+import os
+import random
+
+__author__ = "danishabdullah"
+__all__ = ('SplitMix', 'RNGS', 'newRandom')
+
+M64 = 0xffffffffffffffff
+GOLDEN = 0x9e3779b97f4a7c15
+
+
+def mix64(z):
+    """SplitMix64 finalizer, a bijection on 64-bit integers."""
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & M64
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & M64
+    return z ^ (z >> 31)
+
+
+class SplitMix(random.Random):
+    """Counter-based random generator.
+
+    The n-th draw is a SplitMix64 function of a key derived from the seed
+    and of the draw counter n, so that seeding is cheap, whereas seeding a
+    Mersenne Twister fills its 624 words of state.
+    All other methods are inherited from random.Random.
+
+    - int key: 64-bit key derived from the seed
+    - int counter: number of 64-bit words drawn since seeding
+    """
+    VERSION = 1
+
+    def __init__(self, x=None):
+        self.key, self.counter = 0, 0
+        random.Random.__init__(self, x)
+
+    def seed(self, a=None, version=2):
+        if a is None:
+            a = os.urandom(8)
+        if isinstance(a, int):
+            self.key = mix64(a & M64)
+        else:
+            import hashlib
+            import struct
+            if not isinstance(a, bytes):
+                a = str(a).encode('utf-8')
+            self.key = struct.unpack(
+                '<Q', hashlib.blake2b(a, digest_size=8).digest())[0]
+        self.counter = 0
+        self.gauss_next = None
+
+    def getstate(self):
+        return self.VERSION, self.key, self.counter, self.gauss_next
+
+    def setstate(self, state):
+        version, self.key, self.counter, self.gauss_next = state
+        assert version == self.VERSION, \
+            "unexpected SplitMix state version {0}".format(version)
+
+    def next64(self):
+        """Return the next 64-bit word."""
+        self.counter += 1
+        return mix64((self.key + self.counter * GOLDEN) & M64)
+
+    def random(self):
+        # inlined next64() and mix64(), as this is the most frequent call
+        self.counter += 1
+        z = (self.key + self.counter * GOLDEN) & M64
+        z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & M64
+        z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & M64
+        return ((z ^ (z >> 31)) >> 11) * (1.0 / 9007199254740992.0)
+
+    def getrandbits(self, k):
+        assert k >= 0, "number of bits must be non-negative"
+        if k <= 64:
+            return self.next64() >> (64 - k)
+        r, n = 0, 0
+        while n < k:
+            r |= self.next64() << n
+            n += 64
+        return r & ((1 << k) - 1)
+
+
+# available random generator backends
+RNGS = {'mt': random.Random, 'splitmix': SplitMix}
+
+
+def newRandom(rng='mt'):
+    """Return a new random generator from the named backend."""
+    assert rng in RNGS, \
+        "unexpected random generator '{0}', expecting {1}". \
+            format(rng, sorted(RNGS))
+    return RNGS[rng]()
@@ -0,0 +1,307 @@
+from __future__ import print_function, unicode_literals
+
+import argparse
+import hashlib
+import os
+import signal
+import socket
+import stat
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlparse, parse_qs
+
+from datafiller.session import Session
+
+__author__ = "danishabdullah"
+__all__ = ('REQUEST_OPTIONS', 'PlanCache', 'requestOptions', 'serve')
+
+
+def flag(s):
+    """Convert a query string value to a boolean."""
+    return s.lower() in ('', '1', 'true', 'yes', 'on')
+
+
+# bytes of generated lines sent as one chunk of a response
+CHUNK_BYTES = 1 << 16
+
+# options which may be set per request, with their query string conversion
+REQUEST_OPTIONS = {'size': int, 'seed': str, 'target': str, 'offset': int,
+                   'null': float, 'batch': int, 'tries': int, 'rng': str,
+                   'keyed': flag, 'compile': flag, 'freeze': flag,
+                   'quiet': flag}
+
+
+def requestOptions(base, query):
+    """Return options for a request, base options updated by query.
+
+    - Namespace base: options of the server
+    - {} query: parsed query string, name to list of values
+    """
+    opts = argparse.Namespace(**vars(base))
+    opts.type = list(base.type)
+    for name, values in query.items():
+        if name == 'tables':
+            continue
+        assert name in REQUEST_OPTIONS, \
+            "unexpected request option '{0}'".format(name)
+        try:
+            setattr(opts, name, REQUEST_OPTIONS[name](values[-1]))
+        except ValueError:
+            raise AssertionError("bad value for request option '{0}': {1}".
+                                 format(name, values[-1]))
+    return opts
+
+
+class PlanCache(object):
+    """Keep prepared sessions so that generation can start immediately.
+
+    A session is stored with its state just after its generators are created,
+    which is restored before each reuse. Entries are dropped in least
+    recently used order beyond max_plans. A session cannot be used by two
+    requests at once, the second one builds a new session. Sessions without
+    a seed are not kept, as their reuse would return the same data again.
+
+    - int max_plans: maximum number of sessions kept
+    - OrderedDict plans: key to [Session, state, Lock]
+    - Lock lock: protects plans
+    - int hits, misses: cache statistics
+    """
+
+    def __init__(self, max_plans):
+        self.max_plans = max_plans
+        self.plans = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits, self.misses = 0, 0
+
+    @staticmethod
+    def key(schema_hash, opts):
+        """Return the cache key of a schema with options."""
+        items = sorted((k, v) for k, v in vars(opts).items()
+                       if k in REQUEST_OPTIONS)
+        return hashlib.sha256((schema_hash + repr(items)).
+                              encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def build(schema, opts):
+        """Return a new prepared session for a schema."""
+        session = Session(opts)
+        session.parse(schema.splitlines(True))
+        session.prepare()
+        return session
+
+    def acquire(self, schema_hash, schema, opts):
+        """Return a session ready to generate, and its cache entry if any.
+
+        The entry must be given back with release once generation is done.
+        """
+        key = PlanCache.key(schema_hash, opts)
+        with self.lock:
+            entry = self.plans.get(key)
+            if entry:
+                self.plans.move_to_end(key)
+        if entry and entry[2].acquire(False):
+            self.hits += 1
+            session, state = entry[0], entry[1]
+            session.setState(state)
+            return session, entry
+        self.misses += 1
+        session = PlanCache.build(schema, opts)
+        # busy, do not cache another one, nor unseeded draws
+        if entry or session.opts.seed == None:
+            return session, None
+        entry = [session, session.getState(), threading.Lock()]
+        entry[2].acquire()
+        with self.lock:
+            self.plans[key] = entry
+            while len(self.plans) > self.max_plans:
+                self.plans.popitem(last=False)
+        return session, entry
+
+    def release(self, entry):
+        if entry:
+            entry[2].release()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Generate data over HTTP.
+
+    - POST /?size=N&seed=S&tables=T1,T2: schema in the body, which is kept
+    - GET /<hash>?...: schema posted before, its hash is in X-Schema
+
+    Other query options are listed in REQUEST_OPTIONS. Data are streamed
+    with chunked transfer encoding as they are generated. Errors before the
+    first chunk are answered with status 500, later ones end the output with
+    an error line and close the connection without the last chunk, so that
+    clients see a truncated transfer.
+
+    - [] pending: encoded lines not sent yet
+    - int pending_bytes: size of pending lines
+    - bool started: whether the response headers are sent
+    - str schema_hash: hash of the schema, sent in X-Schema
+    """
+    # chunked transfer encoding requires HTTP/1.1
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.opts.debug:
+            sys.stderr.write("serve: " + format % args + "\n")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        schema_hash = url.path.strip('/')
+        with self.server.lock:
+            schema = self.server.schemas.get(schema_hash)
+            if schema != None:
+                self.server.schemas.move_to_end(schema_hash)
+        if schema == None:
+            self.send_error(404, "unknown schema {0}".format(schema_hash))
+            return
+        self.generate(schema_hash, schema, parse_qs(url.query, True))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            schema = self.rfile.read(length).decode(self.server.encoding)
+        except UnicodeDecodeError as e:
+            self.send_error(400, str(e))
+            return
+        schema_hash = hashlib.sha256(schema.encode('utf-8')).hexdigest()
+        with self.server.lock:
+            schemas = self.server.schemas
+            schemas[schema_hash] = schema
+            schemas.move_to_end(schema_hash)
+            while len(schemas) > self.server.plans.max_plans:
+                schemas.popitem(last=False)
+        self.generate(schema_hash, schema, parse_qs(url.query, True))
+
+    def sendChunk(self, data):
+        """Send data as one chunk, after the response headers if needed."""
+        if not self.started:
+            self.started = True
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'text/plain; charset=' + self.server.encoding)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.send_header('X-Schema', self.schema_hash)
+            self.end_headers()
+        if data:
+            self.wfile.write('{0:x}\r\n'.format(len(data)).encode('ascii') +
+                             data + b'\r\n')
+
+    def flushChunk(self):
+        """Send pending lines as one chunk."""
+        data = b''.join(self.pending)
+        self.pending, self.pending_bytes = [], 0
+        self.sendChunk(data)
+
+    def generate(self, schema_hash, schema, query):
+        server = self.server
+        tables = query.get('tables')
+        tables = set(tables[-1].lower().split(',')) if tables else None
+        try:
+            opts = requestOptions(server.opts, query)
+            session, entry = server.plans.acquire(schema_hash, schema, opts)
+        except Exception as e:  # schema or option errors
+            self.send_error(400, str(e))
+            return
+        self.pending, self.pending_bytes = [], 0
+        self.started, self.schema_hash = False, schema_hash
+        try:
+            selected = [t for t in session.tables
+                        if tables == None or t.name.lower() in tables]
+            if tables and len(selected) != len(tables):
+                self.send_error(400, "unexpected tables: {0}".format(
+                    ','.join(sorted(tables - set(t.name.lower()
+                                                 for t in selected)))))
+                return
+
+            def out(s):
+                line = (s + os.linesep).encode(server.encoding)
+                self.pending.append(line)
+                self.pending_bytes += len(line)
+                if self.pending_bytes >= CHUNK_BYTES:
+                    self.flushChunk()
+
+            last = selected[-1] if selected else None
+            for t in session.tables:
+                if t in selected:
+                    for s in session.tableChunks(t):
+                        out(s)
+                elif not opts.keyed:
+                    # shared generators and 'skip' draws depend on tables
+                    # generated before, which are not needed under keyed
+                    for s in session.tableChunks(t):
+                        pass
+                if t == last:
+                    break
+            session.db.comment('', out)
+            session.db.comment('restart sequences', out)
+            for t in filter(lambda t: t not in session.nogen, selected):
+                for a in filter(lambda a: a.isSerial() and a.gen, t.att_list):
+                    out(session.db.setSequence(t, a, a.gen.offset + a.gen.size))
+            self.flushChunk()
+            # last chunk
+            self.wfile.write(b'0\r\n\r\n')
+        except Exception as e:  # generation errors, or client went away
+            if not self.started:
+                self.send_error(500, str(e))
+                return
+            # the missing last chunk tells the client that output is truncated
+            self.close_connection = True
+            try:
+                self.pending, self.pending_bytes = [], 0
+                self.sendChunk(("error: {0}" + os.linesep).format(e).
+                               encode(server.encoding))
+            except socket.error:
+                pass
+        finally:
+            server.plans.release(entry)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        # expected by BaseHTTPRequestHandler
+        self.server_name, self.server_port = self.server_address, 0
+
+
+def serve(opts):
+    """Serve generation requests on the address of option --serve.
+
+    The address is a unix socket path if it contains a '/', or else a
+    [host:]port for TCP. Script options are the defaults of requests.
+    """
+    address = opts.serve
+    if '/' in address:
+        if os.path.exists(address) and \
+                stat.S_ISSOCK(os.stat(address).st_mode):
+            os.unlink(address)
+        server = ThreadingUnixHTTPServer(address, Handler)
+    else:
+        host, port = address.rsplit(':', 1) if ':' in address else \
+            ('localhost', address)
+        server = ThreadingHTTPServer((host, int(port)), Handler)
+    server.opts = opts
+    server.encoding = opts.encoding if opts.encoding else 'utf-8'
+    server.opts.encoding = server.encoding
+    server.plans = PlanCache(opts.serve_cache)
+    server.schemas = OrderedDict()
+    server.lock = threading.Lock()
+    sys.stderr.write("datafiller: serving on {0}\n".format(address))
+    # cleanup on kill as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if '/' in address and os.path.exists(address):
+            os.unlink(address)
+    return 0
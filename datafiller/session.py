@@ -0,0 +1,753 @@
+from __future__ import print_function, unicode_literals
+
+import os
+import random
+import sys
+
+from datafiller.generators import GENERATORS, FileGenerator, WordGenerator
+from datafiller.generators.funcs import findGeneratorType, macroGenerator
+from datafiller.models import Model, TARGETS
+from datafiller.options import VERSION
+from datafiller.parser import Parser
+from datafiller.utils import getParams, parseRows, parseSize
+
+__author__ = "danishabdullah"
+__all__ = ('Session', 'CACHE_OPTIONS', 'CHECKPOINT_OPTIONS')
+
+# options which change generated table contents, for --cache keys
+CACHE_OPTIONS = ('target', 'seed', 'size', 'null', 'offset', 'rng', 'keyed',
+                 'freeze', 'quiet', 'encoding', 'tries', 'self_test_hack')
+
+# options which change the output or the generation state, for --checkpoint
+CHECKPOINT_OPTIONS = CACHE_OPTIONS + ('filter', 'drop', 'truncate',
+                                      'transaction', 'compile', 'test')
+
+
+class Session(object):
+    """Hold the whole state of a data generation.
+
+    Several sessions may live in the same process, as they share nothing.
+
+    - opts: options, as parsed by the script, possibly updated by directives
+    - Database db: target database
+    - {} macros: macro parameters, by name
+    - Model schema: stores global parameters
+    - Table[] tables: tables in occurrence order, for regeneration
+    - {} all_tables: tables by lower case name
+    - {} enums: enum values, by type name
+    - {} shared, values: generators for 'share' and 'value', by macro name
+    - set nogen: tables which are not filled
+    - int tuple_count, generator_count: global counters
+    - Random random: random generator for non seeded draws
+    - str[] tmp_files: files used instead of 'file' directives in tests
+    - {} signatures: table descriptions for --cache keys, by table
+    - str input_hash: hash of the parsed input and parsing options, for
+      --parse-cache, --checkpoint and --shard keys
+    - Parser parser: schema parser, which fills the tables
+    - task_order: submission order of parallel tasks from --auto-tune
+    - MemoryBudget memory: accounts for growing components under
+      --max-memory, None without a budget
+    """
+    # some example predefined macros
+    MACROS = {'cfr': "gen=int:scale rate=0.17",
+              'french': "chars='esaitnrulodcpmvqfbghjxyzwk' cgen=cfr",
+              'cen': "gen=int:scale rate=0.15",
+              'english': "chars='etaonrishdlfcmugypwbvkjxqz' cgen=cen"}
+
+    def __init__(self, opts):
+        self.opts = opts
+        assert opts.target in TARGETS, \
+            "unexpected target database {0}".format(opts.target)
+        self.db = TARGETS[opts.target](opts)
+        self.macros = {}
+        for name in Session.MACROS:
+            self.macros[name] = getParams(Session.MACROS[name])
+        self.schema = Model('df', self)
+        self.tables, self.all_tables = [], {}
+        self.enums = {}
+        self.shared, self.values = {}, {}
+        self.nogen = set()
+        self.tuple_count, self.generator_count = 0, 0
+        self.random = random.Random(opts.seed)
+        self.tmp_files = []
+        self.signatures = {}
+        self.input_hash = None
+        self.parser = Parser(self)
+        self.task_order = None
+        self.memory = None
+        if opts.max_memory:
+            from datafiller.memory import MemoryBudget
+
+            self.memory = MemoryBudget(parseSize(opts.max_memory))
+        for t in opts.type:
+            self.parser.addType(t)
+
+    def debug(self, level, message):
+        """Print a debug message, maybe."""
+        if self.opts.debug and self.opts.debug >= level:
+            sys.stderr.write("*" * level + " " + message + "\n")
+
+    def parse(self, lines):
+        """Parse schema lines, then set option defaults from directives.
+
+        With option parse_cache, the parsed schema is loaded from this file
+        if it was stored from the same input, or stored for later runs.
+        """
+        opts = self.opts
+        if opts.parse_cache or opts.checkpoint or opts.shard:
+            import hashlib
+
+            h = hashlib.sha256(repr((opts.target, opts.type)).
+                               encode('utf-8'))
+            for line in lines:
+                h.update(line.encode('utf-8'))
+            self.input_hash = h.hexdigest()
+        if self.memory:
+            self.memory.reserve('input schema',
+                                sum(sys.getsizeof(l) + 8 for l in lines))
+        if opts.parse_cache:
+            from datafiller.cache import ParseCache
+
+            cache = ParseCache(opts.parse_cache)
+            if cache.load(self, self.input_hash):
+                self.debug(1, "parsed schema loaded from " + opts.parse_cache)
+            else:
+                self.parser.parse(lines)
+                cache.save(self, self.input_hash)
+        else:
+            self.parser.parse(lines)
+        params = self.schema.params
+        if opts.size == None:
+            opts.size = params.get('size', 100)
+        if not opts.offset:
+            opts.offset = params.get('offset')
+        if not opts.null:
+            opts.null = params.get('null', 0.01)
+        if not opts.seed:
+            opts.seed = params.get('seed')
+        # set seed, default uses os random or time
+        self.random.seed(opts.seed)
+
+    def setSizes(self):
+        """Set table sizes, then attribute sizes."""
+        opts = self.opts
+        # first table sizes
+        for t in self.tables:
+            t.skip = t.params.pop('skip') if 'skip' in t.params else 0.0
+            assert t.skip >= 0.0 and t.skip <= 1.0
+            if t.size == None:
+                t.size = t.params.pop('size') if 'size' in t.params else \
+                    int(t.params.pop('mult') * opts.size) \
+                        if 'mult' in t.params else \
+                        opts.size
+        # *then* set att sizes and possible offset
+        for t in self.tables:
+            for a in t.att_list:
+                if a.FK != None:
+                    a.size = a.FK.size
+                    if a.FK.skip:
+                        raise Exception("reference on table {0} with skipped "
+                                        "tuples".format(a.FK.name))
+                    key = a.FK.atts[a.FKatt] if a.FKatt else a.FK.getPK()
+                    assert key.isUnique(), \
+                        "foreign key {0}.{1} target {2} must be unique". \
+                            format(a.table.name, a.name, key.name)
+                    # override default prefix
+                    # ??? only for text types!?
+                    if self.db.textType(a.type):
+                        assert not 'prefix' in a.params, \
+                            "no prefix on FK {0}.{1}".format(a.table.name,
+                                                            a.name)
+                        a.params['prefix'] = key.params.get('prefix',
+                                                            key.name)
+                    # transfer all other directives
+                    for d, v in key.params.items():
+                        if not d in a.params:
+                            a.params[d] = v
+                elif 'size' in a.params:
+                    # the directive is not removed now, it should be done later?
+                    a.size = a.params['size']
+                elif a.size == None:
+                    a.size = int(t.size * a.params.pop('mult', 1.0))
+
+    def createGenerators(self):
+        """Create data generators per attribute, and set unfilled tables."""
+        if self.opts.cache:
+            from datafiller.cache import fileStamps
+
+        for t in self.tables:
+            if self.opts.cache:
+                # generator seeds depend on previous generators and draws
+                self.signatures[t] = t.getSignature() + repr(
+                    (self.generator_count, self.random.getstate(),
+                     fileStamps(a.params for a in t.att_list)))
+            if 'nogen' in t.params:
+                continue
+            for a in t.att_list:
+                # do not generate
+                if 'nogen' in a.params:
+                    del a.params['nogen']
+                    a.gen = None
+                    assert not a.params, \
+                        "unused '{0}' parameters: {1}".format(a.name, a.params)
+                    continue
+                # generators triggered by their directives
+                gname = a.getGenerator()
+                if gname:
+                    a.gen = GENERATORS[gname](a)
+                    a.gen.params.pop(gname, None)
+                # type-based default generators
+                elif a.is_enum:
+                    a.gen = WordGenerator(a, None, words=self.enums[a.type])
+                else:
+                    gname = findGeneratorType(a.type, self.db)
+                    if gname:
+                        a.gen = GENERATORS[gname](a)
+                    elif a.type in self.macros:
+                        # try a macro homonymous to the type name
+                        a.gen = macroGenerator(a.type, a)
+                    else:
+                        a.gen = None
+                # checks!
+                assert a.gen, \
+                    "generator for {0}.{1} type {2}". \
+                        format(t.name, a.name, a.type)
+                assert not a.gen.params, \
+                    "unused {0}.{1} directives: {2}". \
+                        format(t.name, a.name, a.gen.params)
+        # validated directives are not needed anymore,
+        # generators keep their settings
+        for t in self.tables:
+            for a in t.att_list:
+                if a.gen:
+                    a.gen.mapGen(lambda g: g.dropParams())
+                a.params = None
+        # tables which are not filled, 'nogen' is consumed here
+        for t in self.tables:
+            if 'nogen' in t.params or t.size == 0:
+                t.params.pop('nogen', None)
+                assert not t.params, \
+                    "unused {0} parameters: {1}".format(t.name, t.params)
+                self.nogen.add(t)
+        if self.memory:
+            self.reserveGenerators()
+        # flatten generator trees of filled tables
+        if self.opts.compile:
+            for t in self.tables:
+                if t not in self.nogen:
+                    t.compile()
+
+    def reserveGenerators(self):
+        """Reserve the memory held by word lists and file generators, see
+        --max-memory.
+
+        Lists loaded from files are reserved as they are loaded, other lists
+        are counted once even if shared, eg enums. File generators hold their
+        file names, and the largest file twice while it is read and converted.
+        """
+        words, names, largest = {}, 0, 0
+        for g in self.generators():
+            if isinstance(g, WordGenerator) and isinstance(g.words, list) \
+                    and str(g) not in self.memory.components:
+                words[id(g.words)] = g.words
+            elif isinstance(g, FileGenerator):
+                names += sum(sys.getsizeof(f) + 8 for f in g.files)
+                largest = max([largest] + [os.path.getsize(f)
+                                           for f in g.files])
+        if words:
+            self.memory.reserve('word lists',
+                                sum(sys.getsizeof(w) + 8
+                                    for l in words.values() for w in l))
+        if names:
+            self.memory.reserve('file generators', names + 2 * largest)
+
+    def prepare(self):
+        """Set sizes and create generators once the schema is parsed.
+
+        Under --max-memory, the word lists and file contents of generators,
+        and the unique values of tables are accounted for before any
+        generation.
+        """
+        self.setSizes()
+        self.createGenerators()
+        if self.memory:
+            for t in self.tables:
+                if t not in self.nogen:
+                    t.reserveUnique()
+        if self.opts.debug:
+            sys.stderr.write(str(self.tables) + "\n")
+
+    def generators(self, tables=None):
+        """Return generators of tables, default all, then shared and value
+        generators, each once, in a stable order."""
+        gens, seen = [], set()
+
+        def add(g):
+            if id(g) not in seen:
+                seen.add(id(g))
+                gens.append(g)
+
+        for t in self.tables if tables == None else tables:
+            t.mapGen(add)
+        for name in sorted(self.shared):
+            self.shared[name].mapGen(add)
+        for name in sorted(self.values):
+            self.values[name].mapGen(add)
+        return gens
+
+    def getState(self):
+        """Return the state changed by generation, see setState."""
+        return {'tuple_count': self.tuple_count,
+                'random': self.random.getstate(),
+                'gens': [g.getState() for g in self.generators()],
+                'tables': [t.getState() for t in self.tables]}
+
+    def setState(self, state):
+        """Restore generation to a state returned by getState.
+
+        Restoring the state taken just after prepare() allows to generate
+        the same data again without parsing nor creating generators.
+        """
+        self.tuple_count = state['tuple_count']
+        self.random.setstate(state['random'])
+        for g, s in zip(self.generators(), state['gens']):
+            g.setState(s)
+        for t, s in zip(self.tables, state['tables']):
+            t.setState(s)
+
+    def getCarriedState(self):
+        """Return the state which carries on from a table to the next ones.
+
+        Generators of a table only serve this table, but shared and value
+        generators, the session random generator and the tuple counter are
+        used across tables.
+        """
+        return {'tuple_count': self.tuple_count,
+                'random': self.random.getstate(),
+                'gens': [g.getState() for g in self.generators([])]}
+
+    def setCarriedState(self, state):
+        """Restore a state returned by getCarriedState."""
+        self.tuple_count = state['tuple_count']
+        self.random.setstate(state['random'])
+        for g, s in zip(self.generators([]), state['gens']):
+            g.setState(s)
+
+    def cacheKey(self, t):
+        """Return the --cache key of table t contents, to be called just
+        before generating it."""
+        import hashlib
+        from datafiller.cache import fileStamps
+
+        opts = self.opts
+        h = hashlib.sha256()
+        h.update(repr((VERSION, os.linesep,
+                       sorted((o, getattr(opts, o)) for o in CACHE_OPTIONS),
+                       sorted(self.schema.params.items()),
+                       sorted((k, sorted(v.items()))
+                              for k, v in self.macros.items()),
+                       sorted(self.enums.items()), self.signatures[t],
+                       fileStamps([self.schema.params] +
+                                  list(self.macros.values())),
+                       self.getCarriedState())).encode('utf-8'))
+        return h.hexdigest()
+
+    def fillCached(self, write):
+        """Generate all tables, reusing contents from the --cache directory.
+
+        - write: function to output encoded contents
+        """
+        from datafiller.cache import DataCache
+
+        opts = self.opts
+        cache = DataCache(opts.cache, opts.cache_max_bytes)
+        for t in self.tables:
+            key = self.cacheKey(t)
+            entry = cache.get(key)
+            if entry:
+                self.debug(1, "cache hit on table {0}".format(t.name))
+                state, data = entry
+                cache.copy(data, write)
+                self.setCarriedState(state)
+                continue
+            self.debug(1, "cache miss on table {0}".format(t.name))
+            data = cache.create()
+            try:
+                for s in self.tableChunks(t):
+                    block = (s + os.linesep).encode(opts.encoding)
+                    write(block)
+                    data.write(block)
+                data.close()
+            except:
+                cache.discard(data)
+                raise
+            cache.put(key, data, self.getCarriedState())
+
+    def checkpointKey(self):
+        """Return the --checkpoint key of this generation."""
+        import hashlib
+
+        opts = self.opts
+        h = hashlib.sha256()
+        h.update(repr((VERSION, os.linesep, self.input_hash,
+                       sorted((o, getattr(opts, o))
+                              for o in CHECKPOINT_OPTIONS))).encode('utf-8'))
+        return h.hexdigest()
+
+    def fillCheckpointed(self, out, output):
+        """Generate all tables, recording progress in the --checkpoint file,
+        and possibly resuming from it.
+
+        - out: print-like function writing to output
+        - output: binary output file, which is truncated on resume
+        """
+        from datafiller.checkpoint import Checkpoint
+
+        opts = self.opts
+        # per generator seeds are not part of the state
+        assert opts.seed != None, "option checkpoint requires a seed"
+        checkpoint = Checkpoint(opts.checkpoint, output, self.checkpointKey(),
+                                opts.checkpoint_interval)
+        first, start = 0, 0
+        if opts.resume:
+            first, start, state = checkpoint.load()
+            self.setState(state)
+            self.debug(1, "resuming at table {0} tuple {1}".
+                       format(first, start))
+        for i in range(first, len(self.tables)):
+
+            def progress(row, i=i):
+                if checkpoint.due():
+                    checkpoint.save(i, row, self.getState)
+
+            for s in self.tableChunks(self.tables[i],
+                                      start if i == first else 0,
+                                      resumed=True, progress=progress):
+                out(s)
+        checkpoint.remove()
+
+    def shardKey(self):
+        """Return the key of the dataset split by --shard."""
+        import hashlib
+
+        opts = self.opts
+        h = hashlib.sha256()
+        h.update(repr((VERSION, os.linesep, self.input_hash,
+                       sorted((o, getattr(opts, o))
+                              for o in CACHE_OPTIONS))).encode('utf-8'))
+        return h.hexdigest()
+
+    def fillSharded(self, out):
+        """Generate the pieces of tables of this --shard, and write its
+        manifest if required.
+
+        - out: print-like function
+        """
+        from datafiller.shard import parseShard, shardPieces, writeManifest
+
+        opts = self.opts
+        shard, count = parseShard(opts.shard)
+        splittable = lambda t: t not in self.nogen and t.isSeekable()
+        pieces = shardPieces(self.tables, shard, count, opts.keyed, splittable)
+        self.debug(1, "shard pieces: {0}".format(pieces))
+        for i, start, stop in pieces:
+            t = self.tables[i]
+            chunks = self.tableChunks(t) if start == 0 and stop == t.size \
+                else self.pieceChunks(t, start, stop)
+            for s in chunks:
+                out(s)
+        if opts.manifest:
+            writeManifest(opts.manifest, self.shardKey(), shard, count,
+                          self.tables, pieces)
+
+    def fillRows(self, out):
+        """Generate the slices of tables selected by --rows.
+
+        Under keyed generation, a seekable table alone in its group jumps to
+        the first tuple of a slice. Otherwise the generation state, including
+        unique values, is rebuilt by generating the previous tables of its
+        group and the tuples before the slice, without output.
+
+        - out: print-like function
+        """
+        from datafiller.parallel import tableGroups
+
+        opts = self.opts
+        groups = tableGroups(self.tables, opts.keyed)
+        state = self.getState()
+        for name, start, stop in map(parseRows, opts.rows):
+            assert name.lower() in self.all_tables, \
+                "option rows: no table {0}".format(name)
+            t = self.all_tables[name.lower()]
+            i = self.tables.index(t)
+            stop = t.size if stop == None else min(stop, t.size)
+            assert start <= stop, \
+                "option rows: {0} has only {1} tuples".format(t.name, t.size)
+            assert t not in self.nogen, \
+                "option rows: table {0} is not generated".format(t.name)
+            group = [g for g in groups if i in g][0]
+            seekable = opts.keyed and group == [i] and t.isSeekable()
+            self.setState(state)
+            if start and not seekable:
+                self.debug(1, "rebuilding state of {0} up to tuple {1}".
+                           format(t.name, start))
+                for j in group[:group.index(i)]:
+                    for chunk in self.tables[j].iterChunks(opts.batch):
+                        pass
+                for chunk in t.iterChunks(opts.batch, 0, start):
+                    pass
+            chunks = self.tableChunks(t) if start == 0 and stop == t.size \
+                else self.pieceChunks(t, start, stop, not seekable)
+            for s in chunks:
+                out(s)
+
+    def pieceChunks(self, t, start, stop, resumed=False):
+        """Yield tuples [start, stop) of table t as lines of text, with their
+        own header and trailer so that they can be loaded on their own.
+        If resumed, generators are already in their state after tuple
+        start - 1, see iterChunks."""
+        db, opts = self.db, self.opts
+        comments = []
+        db.comment('', comments.append)
+        db.comment("fill table {0} tuples {1} to {2}".
+                   format(t.name, start, stop), comments.append)
+        for c in comments:
+            yield c
+        if not opts.quiet:
+            yield db.echo("# filling table {0} tuples {1} to {2}".
+                          format(t.name, start, stop))
+        # hold back a chunk so as to tell the last one
+        begun, pending = False, None
+        for cols, last in t.iterChunks(opts.batch, start, stop, resumed):
+            if cols and cols[0]:
+                if pending:
+                    yield db.insertChunk(t, pending, False)
+                elif not begun:
+                    begun = True
+                    yield db.insertBegin(t)
+                pending = cols
+        if pending:
+            yield db.insertChunk(t, pending, True)
+            yield db.insertEnd()
+
+    def tableChunks(self, t, start=0, stop=None, resumed=False,
+                    progress=None, raw=False):
+        """Yield table t contents as lines of text, possibly several per item.
+
+        Only tuples numbered in [start, stop) are generated, the table header
+        and trailer go with the first and last tuples. If resumed, generators
+        are already in their state after tuple start - 1, see iterChunks.
+        Function progress is called with the number of the next tuple once
+        each chunk has been consumed. If raw, chunks of tuples are yielded
+        as (columns, last) pairs for db.insertChunk instead of text.
+        """
+        db, opts = self.db, self.opts
+        stop = t.size if stop == None else stop
+        comments = []
+        comment = lambda s: db.comment(s, comments.append)
+        if start == 0:
+            comment('')
+        if t in self.nogen:
+            if start == 0:
+                comment("skip table {0}".format(t.name))
+                for c in comments:
+                    yield c
+        else:
+            if start == 0:
+                size = "{0:d}*{1:g}".format(t.size, 1.0 - t.skip) \
+                    if t.skip else str(t.size)
+                comment("fill table {0} ({1})".format(t.name, size))
+                for c in comments:
+                    yield c
+                if not opts.quiet:
+                    yield db.echo("# filling table {0} ({1})".
+                                  format(t.name, size))
+                yield db.insertBegin(t)
+            row = start
+            for cols, last in t.iterChunks(opts.batch, start, stop, resumed):
+                if cols and cols[0]:
+                    yield (cols, last) if raw else \
+                        db.insertChunk(t, cols, last)
+                if progress:
+                    row = min(row + opts.batch, stop)
+                    progress(row)
+            if stop == t.size:
+                yield db.insertEnd()
+
+    def fillTable(self, t, out, start=0, stop=None):
+        """Generate table t contents through print-like function out."""
+        for s in self.tableChunks(t, start, stop):
+            out(s)
+
+    def tableBlock(self, t, start=0, stop=None):
+        """Return table t contents for tuples [start, stop) as encoded bytes."""
+        lines = []
+        self.fillTable(t, lambda s, end=os.linesep: lines.append(s + end),
+                       start, stop)
+        return ''.join(lines).encode(self.opts.encoding)
+
+    def tableFile(self, t):
+        """Return the name of the file holding table t under --output-dir."""
+        return t.name + ('.csv' if self.opts.target == 'csv' else '.sql')
+
+    def writeTableFile(self, t, start=0, stop=None):
+        """Write table t contents to a temporary file of the --output-dir,
+        and return its path, or None if the table is not generated."""
+        if t in self.nogen:
+            return None
+        path = os.path.join(self.opts.output_dir, '.tmp_' + self.tableFile(t))
+        with open(path, 'wb') as f:
+            f.write(self.tableBlock(t, start, stop))
+        return path
+
+    def fillDirectory(self):
+        """Generate tables into one file each in the --output-dir.
+
+        A table file appears as soon as it is generated and all the tables
+        it references have appeared, and its name is then appended to the
+        'order' file, which loaders may follow. This file ends with 'END'.
+        """
+        from datafiller.parallel import fillScheduled, tableDeps
+
+        opts, directory = self.opts, self.opts.output_dir
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        deps = tableDeps(self.tables, self.nogen)
+        self.debug(1, "table dependencies: {0}".format(deps))
+        with open(os.path.join(directory, 'order'), 'w') as order:
+
+            def emit(i, path):
+                if path == None:
+                    return
+                name = self.tableFile(self.tables[i])
+                os.rename(path, os.path.join(directory, name))
+                order.write(name + '\n')
+                order.flush()
+
+            fillScheduled(self.tables, self.writeTableFile, emit, opts.jobs,
+                          deps, opts.keyed)
+            order.write('END\n')
+
+    def fillPipelined(self, write):
+        """Generate all tables through --pipeline stages, which generate
+        tuples, format and encode them, and write them, and show the
+        statistics of the stages on stderr.
+
+        - write: function to output encoded contents
+        """
+        from datafiller.pipeline import Stage, runPipeline
+
+        db, opts = self.db, self.opts
+        linesep, encoding = os.linesep, opts.encoding
+
+        def items():
+            for t in self.tables:
+                for c in self.tableChunks(t, raw=True):
+                    yield (t,) + c if isinstance(c, tuple) else c
+
+        def serialize(item):
+            s = db.insertChunk(*item) if isinstance(item, tuple) else item
+            return (s + linesep).encode(encoding)
+
+        stages = runPipeline(items(), serialize, write, opts.queue_size)
+        sys.stderr.write(Stage.header() + '\n')
+        for stage in stages:
+            sys.stderr.write(str(stage) + '\n')
+
+    def splittable(self, t):
+        """Whether table t can be split in pieces."""
+        return t not in self.nogen and t.isSeekable()
+
+    def autoTune(self, costs=None):
+        """Set jobs, batch and split from the costs of generating a sample
+        of each table, see --auto-tune, and show the plan on stderr.
+
+        Tables are only split under keyed generation, as splitting would
+        otherwise change the output.
+
+        - TableCost[] costs: already measured costs, see sampleCosts
+        """
+        import multiprocessing
+        from datafiller.tune import TableCost, sampleCosts, tunePlan
+
+        opts = self.opts
+        if costs == None:
+            costs = sampleCosts(self, opts.sample_rows)
+        splittable = self.splittable \
+            if opts.keyed and not opts.output_dir else None
+        plan = tunePlan(self.tables, costs, multiprocessing.cpu_count(),
+                        opts.batch, opts.keyed, splittable)
+        opts.jobs, opts.batch, opts.split = plan.jobs, plan.batch, plan.split
+        self.task_order = plan.order()
+        sys.stderr.write(TableCost.header() + '\n')
+        for c in costs:
+            sys.stderr.write(str(c) + '\n')
+        for line in plan.lines(self.tables):
+            sys.stderr.write(line + '\n')
+
+    def showEstimate(self, out):
+        """Show the expected rows and encoded bytes of each table for the
+        target, and the generation time, extrapolated from a sample of each
+        table, see --estimate. No data are written.
+
+        - out: print-like function
+        """
+        from datafiller.parallel import tableTasks
+        from datafiller.tune import estimate, estimateLines, sampleCosts, \
+            taskWeights
+
+        opts = self.opts
+        costs = sampleCosts(self, opts.sample_rows)
+        if opts.auto_tune:
+            self.autoTune(costs)
+        tasks = tableTasks(self.tables, opts.keyed, opts.split,
+                           self.splittable)
+        seconds = estimate(taskWeights(self.tables, costs, tasks), opts.jobs)
+        out("estimate for {0} from {1} tuples per table:".
+            format(opts.target, opts.sample_rows))
+        for line in estimateLines(self.tables, costs, self.nogen, seconds,
+                                  opts.jobs):
+            out(line)
+
+    def fillTables(self, out, write, output=None):
+        """Generate all tables, possibly in parallel.
+
+        - out: print-like function for sequential generation, possibly
+          with a flush() method
+        - write: function to output encoded contents from workers
+        - output: binary file written by out and write, for --checkpoint
+        """
+        opts = self.opts
+        if opts.auto_tune:
+            self.autoTune()
+        if opts.cache and opts.seed == None:
+            sys.stderr.write("warning: no cache without a seed\n")
+        elif opts.cache:
+            return self.fillCached(write)
+        if opts.checkpoint:
+            return self.fillCheckpointed(out, output)
+        if opts.rows:
+            return self.fillRows(out)
+        if opts.output_dir:
+            return self.fillDirectory()
+        if opts.pipeline:
+            return self.fillPipelined(write)
+        if opts.shard:
+            return self.fillSharded(out)
+        if opts.jobs > 1:
+            from datafiller.parallel import fillParallel, tableTasks
+
+            splittable = self.splittable
+            if opts.debug:
+                self.debug(1, "table tasks: {0}".format(
+                    tableTasks(self.tables, opts.keyed, opts.split,
+                               splittable)))
+            fillParallel(self.tables, self.tableBlock, write, opts.jobs,
+                         opts.keyed, opts.split, splittable, self.task_order)
+        else:
+            # a buffered out is flushed at table boundaries
+            flush = getattr(out, 'flush', None)
+            for t in self.tables:
+                self.fillTable(t, out)
+                if flush:
+                    flush()
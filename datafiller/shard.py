@@ -0,0 +1,110 @@
+from __future__ import print_function, unicode_literals
+
+import json
+import re
+
+from datafiller.parallel import tableGroups
+
+__author__ = "danishabdullah"
+__all__ = ('parseShard', 'shardPieces', 'writeManifest', 'checkManifests')
+
+# bump when the manifest contents change
+FORMAT = 1
+
+
+def parseShard(spec):
+    """Return the zero-based index and the number of shards of 'i/N',
+    where shards are numbered from 1 to N."""
+    m = re.match(r'^\s*(\d+)\s*/\s*(\d+)\s*$', spec)
+    assert m, "option shard expects i/N, got '{0}'".format(spec)
+    i, n = int(m.group(1)), int(m.group(2))
+    assert 1 <= i <= n, "option shard expects 1 <= i <= N, got '{0}'". \
+        format(spec)
+    return i - 1, n
+
+
+def shardPieces(tables, shard, count, keyed=False, splittable=None):
+    """Return the pieces of tables generated by shard number shard out of
+    count, as (index, start, stop) tuples in table order.
+
+    Splittable tables alone in their group are cut in count ranges of
+    tuples, one per shard. Other groups go whole to one shard, largest
+    first to the least loaded shard, the first one on ties. The result
+    only depends on the tables, so that shards agree without talking.
+    """
+    pieces, load = [], [0] * count
+    groups = tableGroups(tables, keyed)
+    size = lambda g: sum(tables[i].size for i in g)
+    for g in sorted(groups, key=lambda g: (-size(g), g[0])):
+        t = tables[g[0]]
+        if len(g) == 1 and t.size >= count and splittable(t):
+            start = t.size * shard // count
+            stop = t.size * (shard + 1) // count
+            pieces.append((g[0], start, stop))
+        else:
+            owner = load.index(min(load))
+            load[owner] += size(g)
+            if owner == shard:
+                pieces += [(i, 0, tables[i].size) for i in g]
+    return sorted(pieces)
+
+
+def writeManifest(path, key, shard, count, tables, pieces):
+    """Write the manifest of a shard as JSON to path.
+
+    - str key: identifies the dataset, all shards must share it
+    - int shard, count: zero-based shard index and number of shards
+    - Table[] tables: all tables, for their sizes
+    - pieces: generated pieces, see shardPieces
+    """
+    manifest = {'format': FORMAT, 'key': key, 'shard': shard + 1,
+                'shards': count,
+                'sizes': dict((t.name, t.size) for t in tables),
+                'pieces': [{'table': tables[i].name, 'start': start,
+                            'stop': stop} for i, start, stop in pieces]}
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def checkManifests(paths):
+    """Return a list of errors which prevent the manifests in paths from
+    covering exactly the whole dataset, empty if they do."""
+    manifests = []
+    for path in paths:
+        with open(path) as f:
+            manifests.append(json.load(f))
+    if not manifests:
+        return ["no manifest to check"]
+    first, errors = manifests[0], []
+    for p, m in zip(paths, manifests):
+        if m.get('format') != FORMAT:
+            errors.append("{0}: unexpected manifest format".format(p))
+        elif m['key'] != first['key'] or m['shards'] != first['shards']:
+            errors.append("{0}: not from the same dataset as {1}".
+                          format(p, paths[0]))
+    if errors:
+        return errors
+    shards = sorted(m['shard'] for m in manifests)
+    missing = set(range(1, first['shards'] + 1)) - set(shards)
+    if missing:
+        errors.append("missing shards: {0}".
+                      format(', '.join(str(i) for i in sorted(missing))))
+    for i in sorted(set(s for s in shards if shards.count(s) > 1)):
+        errors.append("duplicate shard: {0}".format(i))
+    ranges = dict((name, []) for name in first['sizes'])
+    for m in manifests:
+        for p in m['pieces']:
+            ranges[p['table']].append((p['start'], p['stop']))
+    for name in sorted(ranges):
+        row = 0
+        for start, stop in sorted(ranges[name]):
+            if start != row:
+                errors.append("table {0}: tuples {1} to {2} {3}".format(
+                    name, min(row, start), max(row, start),
+                    "are missing" if start > row else "overlap"))
+            row = max(row, stop)
+        if row != first['sizes'][name]:
+            errors.append("table {0}: tuples {1} to {2} are missing".
+                          format(name, row, first['sizes'][name]))
+    return errors
@@ -3,9 +3,10 @@ from __future__ import print_function, unicode_literals
 import sys
 
 from datafiller.generators import WordGenerator
-from datafiller.scripts.cli import self_run, opts
 
 __author__ = "danishabdullah"
+__all__ = ('UNITS', 'run_unit_tests', 'generate_some_tmp_files',
+           'cleanup_some_tmp_files')
 
 # test name, start with '!' if expected to fail
 # test option, '!' if histogram, '-' if short
@@ -185,17 +186,23 @@ UNITS = [
 ]
 
 
-def run_unit_tests(seed=None):
+def run_unit_tests(run, seed=None, hack=False, rng='mt'):
+    """Run unit tests, exit with the number of failures.
+
+    - run: function starting a test, see self_run in the script
+    - bool hack: whether to run under --self-test-hack
+    - str rng: random generator backend of the tests
+    """
     fail = 0
-    op = []
-    if opts.self_test_hack:
+    op = ['--rng=' + rng]
+    if hack:
         op.append("--self-test-hack")
     for v, lt in UNITS:
         ok = v[0] != '!'
         print('')
         print("** {0} **".format(v))
         sys.stdout.flush()
-        status = self_run(validate=lt, seed=seed, op=op).wait()
+        status = run(validate=lt, seed=seed, op=op).wait()
         if ok != (status == 0):
             print("** FAILED **")
             fail += 1
@@ -207,25 +214,24 @@ def run_unit_tests(seed=None):
 #
 # generate some files for file generator tests
 #
-some_tmp_files_to_unlink = []
-
-
 def generate_some_tmp_files():
+    """Return a list of small temporary files."""
     # under self-test, generates a bunch of small temporary files
     # also do that for validation
-    global some_tmp_files_to_unlink
     import tempfile as tf
+    files = []
     for w in WordGenerator.HOBBITS:
         f = tf.NamedTemporaryFile(delete=False)
         f.write(w.encode('utf-8') * int(3))
         f.write('\n'.encode('utf-8'))
-        some_tmp_files_to_unlink.append(f.name)
+        files.append(f.name)
         f.close()
+    return files
 
 
-def cleanup_some_tmp_files():
+def cleanup_some_tmp_files(files):
+    """Remove files and empty their list."""
     import os
-    global some_tmp_files_to_unlink
-    for f in some_tmp_files_to_unlink:
+    for f in files:
         os.unlink(f)
-    some_tmp_files_to_unlink = []
+    del files[:]
@@ -0,0 +1,240 @@
+from __future__ import print_function, unicode_literals
+
+import os
+import time
+
+from datafiller.parallel import tableTasks
+from datafiller.utils import humanSize
+
+__author__ = "danishabdullah"
+__all__ = ('TableCost', 'Plan', 'sampleCosts', 'assignTasks', 'taskWeights',
+           'tunePlan', 'estimateLines')
+
+# estimated seconds to start a worker process and collect its output
+WORKER_SECONDS = 0.05
+# target size in bytes of the text of a chunk of tuples
+CHUNK_BYTES = 1 << 20
+# bounds of the chosen batch size
+BATCH_MIN, BATCH_MAX = 100, 10000
+
+
+class TableCost(object):
+    """Generation cost of a table, measured on its first tuples.
+
+    - Table table: sampled table
+    - int rows: number of sampled tuples
+    - float seconds: time to generate, format and encode the sample
+    - int size: encoded size of the sample in bytes
+    - [] columns: (attribute name, seconds) to generate each column alone
+    """
+
+    def __init__(self, table, rows, seconds, size, columns):
+        self.table, self.rows = table, rows
+        self.seconds, self.size = seconds, size
+        self.columns = columns
+
+    def perTuple(self):
+        return self.seconds / self.rows
+
+    def bytes(self):
+        """Return the estimated encoded size of the whole table."""
+        return int(self.size * self.table.size / float(self.rows))
+
+    def total(self):
+        """Return the estimated seconds to generate the whole table."""
+        return self.perTuple() * self.table.size
+
+    def slowest(self):
+        """Return the name and seconds per tuple of the costliest column."""
+        name, seconds = max(self.columns, key=lambda c: c[1]) \
+            if self.columns else ('-', 0.0)
+        return name, seconds / self.rows
+
+    def __str__(self):
+        name, seconds = self.slowest()
+        return "{0:<20} {1:>10d} {2:>9.2f} {3:>9.2f}  {4} ({5:.2f})". \
+            format(self.table.name, self.table.size, 1e6 * self.perTuple(),
+                   self.total(), name, 1e6 * seconds)
+
+    @staticmethod
+    def header():
+        return "{0:<20} {1:>10} {2:>9} {3:>9}  {4}". \
+            format('table', 'tuples', 'us/tuple', 'seconds',
+                   'slowest column (us/tuple)')
+
+
+class Plan(object):
+    """Generation settings chosen from table costs.
+
+    - int jobs, batch, split: chosen values of the options
+    - [] tasks: table pieces per task, see tableTasks
+    - float[] weights: estimated seconds of each task
+    - [] workers: task indexes per worker, see assignTasks
+    - float[] loads: estimated seconds of each worker
+    - float seconds, sequential: estimated generation time with the plan,
+      and without worker processes
+    """
+
+    def __init__(self, jobs, batch, split, tasks, weights, sequential):
+        self.jobs, self.batch, self.split = jobs, batch, split
+        self.tasks, self.weights = tasks, weights
+        self.sequential = sequential
+        self.workers, self.loads = assignTasks(weights, jobs)
+        self.seconds = estimate(weights, jobs)
+
+    def order(self):
+        """Return task indexes by decreasing weight, for submission."""
+        return sorted(range(len(self.tasks)),
+                      key=lambda n: (-self.weights[n], n))
+
+    def lines(self, tables):
+        """Return a description of the plan, one line per worker."""
+        piece = lambda i, start, stop: tables[i].name + \
+            ('' if start == 0 and stop == None else
+             '[{0}:{1}]'.format(start, tables[i].size if stop == None
+                                else stop))
+        lines = ["plan: jobs={0} batch={1} split={2} seconds={3:.2f} "
+                 "(sequential {4:.2f})".
+                 format(self.jobs, self.batch, self.split, self.seconds,
+                        self.sequential)]
+        if self.jobs > 1:
+            for j, (tasks, load) in enumerate(zip(self.workers, self.loads)):
+                lines.append("worker {0}: {1:.2f}s {2}".format(
+                    j + 1, load, ' '.join(piece(*p) for n in tasks
+                                          for p in self.tasks[n])))
+        return lines
+
+
+def sampleCosts(session, rows):
+    """Return the TableCost of generated tables, measured by generating
+    at most rows tuples of each, the first ones, or under keyed generation
+    the first and last ones of tables which can be split.
+
+    The generation state is restored afterwards, so that the output does
+    not depend on sampling.
+    """
+    db, opts = session.db, session.opts
+    state = session.getState()
+    costs = []
+    try:
+        for t in session.tables:
+            n = min(rows, t.size)
+            if t in session.nogen or n <= 0:
+                continue
+            # under keyed generation, the last tuples are sampled as well,
+            # as they may be wider, eg with larger serial numbers
+            ranges = [(0, n)]
+            if opts.keyed and n < t.size and t.isSeekable():
+                ranges = [(0, n // 2), (t.size - (n - n // 2), t.size)]
+            start, size = time.time(), 0
+            for first, stop in ranges:
+                for cols, last in t.iterChunks(opts.batch, first, stop):
+                    if cols and cols[0]:
+                        s = db.insertChunk(t, cols, last) + os.linesep
+                        size += len(s.encode(opts.encoding))
+            seconds = time.time() - start
+            columns = []
+            for a in t.gen_atts:
+                start = time.time()
+                a.gen.getBatch(n)
+                columns.append((a.name, time.time() - start))
+            costs.append(TableCost(t, n, seconds, size, columns))
+    finally:
+        session.setState(state)
+    return costs
+
+
+def assignTasks(weights, jobs):
+    """Return task indexes per worker and the load of each worker.
+
+    Tasks are taken by decreasing weight by the least loaded worker, which
+    is what a pool of jobs processes does when they are submitted in this
+    order.
+    """
+    workers, loads = [[] for j in range(jobs)], [0.0] * jobs
+    for n in sorted(range(len(weights)), key=lambda n: (-weights[n], n)):
+        j = loads.index(min(loads))
+        workers[j].append(n)
+        loads[j] += weights[n]
+    return workers, loads
+
+
+def estimate(weights, jobs):
+    """Return the estimated seconds to run weighted tasks on jobs workers."""
+    if jobs == 1:
+        return sum(weights)
+    return max(assignTasks(weights, jobs)[1]) + WORKER_SECONDS * jobs
+
+
+def taskWeights(tables, costs, tasks):
+    """Return the estimated seconds of each task from tableTasks."""
+    perTuple = dict((c.table, c.perTuple()) for c in costs)
+    cost = lambda i, start, stop: perTuple.get(tables[i], 0.0) * \
+        ((tables[i].size if stop == None else stop) - start)
+    return [sum(cost(*p) for p in task) for task in tasks]
+
+
+def estimateLines(tables, costs, nogen, seconds, jobs):
+    """Return a report of the expected output of tables, one line each
+    and a total, then the estimated generation time.
+
+    - TableCost[] costs: costs of generated tables
+    - set nogen: tables which are not generated
+    - float seconds: estimated generation time with jobs processes
+    """
+    cost = dict((c.table, c) for c in costs)
+    line = "{0:<20} {1:>12} {2:>16} {3:>10} {4:>9}".format
+    lines = [line('table', 'tuples', 'bytes', 'size', 'seconds')]
+    rows, size, sequential = 0, 0, 0.0
+    for t in tables:
+        c = cost.get(t)
+        # tuples dropped by skip are generated but not written
+        n = 0 if t in nogen else int(round(t.size * (1.0 - t.skip)))
+        b, s = (c.bytes(), c.total()) if c else (0, 0.0)
+        rows, size, sequential = rows + n, size + b, sequential + s
+        lines.append(line(t.name, n, b, humanSize(b),
+                          "{0:.2f}".format(s)))
+    lines.append(line('total', rows, size, humanSize(size),
+                      "{0:.2f}".format(sequential)))
+    lines.append("estimated time: {0:.2f} seconds with jobs={1}".
+                 format(seconds, jobs))
+    return lines
+
+
+def tunePlan(tables, costs, cores, batch, keyed=False, splittable=None):
+    """Return the Plan which balances measured costs on at most cores
+    worker processes.
+
+    - Table[] tables: all tables
+    - TableCost[] costs: costs of generated tables
+    - int cores: maximum number of worker processes
+    - int batch: batch size used if no table was sampled
+    - bool keyed: whether generation is keyed on tuple numbers
+    - splittable: function telling whether a table can be split, None if
+      tables must not be split
+    """
+    perTuple = dict((c.table, c.perTuple()) for c in costs)
+    sequential = sum(c.total() for c in costs)
+    # chunks of about CHUNK_BYTES for the widest tuples
+    widest = max([c.size / float(c.rows) for c in costs] or [0.0])
+    if widest:
+        batch = max(BATCH_MIN, min(BATCH_MAX, int(CHUNK_BYTES / widest)))
+    # split costly tables so that each worker may get several pieces
+    split = None
+    if splittable and cores > 1:
+        target = sequential / (2 * cores)
+        sizes = [int(target / perTuple[t]) + 1 for t in perTuple
+                 if splittable(t) and perTuple[t] * t.size > target]
+        if sizes:
+            split = max(batch, min(sizes))
+    tasks = tableTasks(tables, keyed, split, splittable)
+    weights = taskWeights(tables, costs, tasks)
+    # fewest workers within 5% of the best estimate
+    jobs, best = 1, sequential
+    for j in range(2, min(cores, len(tasks)) + 1):
+        seconds = estimate(weights, j)
+        if seconds < 0.95 * best:
+            jobs, best = j, seconds
+    if jobs == 1:
+        split = None
+    return Plan(jobs, batch, split, tasks, weights, sequential)
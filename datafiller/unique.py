@@ -0,0 +1,380 @@
+from __future__ import print_function, unicode_literals
+
+import math
+import os
+import struct
+from array import array
+
+__author__ = "danishabdullah"
+__all__ = ('UniqueSet', 'MappedSet', 'Records', 'Spill', 'fingerprint')
+
+# record headers: type tag and constraint number, then the record length
+_REPR = struct.Struct('<cI')
+_LEN = struct.Struct('<I')
+_KEY = struct.Struct('<Q')
+# packing of all integer records, by number of values
+_INTS = {}
+_MASK64 = (1 << 64) - 1
+# hashlib.blake2b, imported on the first fingerprint
+_blake2b = None
+
+
+def _ints(n):
+    s = _INTS.get(n)
+    if s == None:
+        s = _INTS[n] = struct.Struct('<cI{0}q'.format(n))
+    return s
+
+
+def fingerprint(nu, values):
+    """Return the fingerprint of the values of unique constraint number nu,
+    as a 64-bit probe key and the exact record of the values.
+
+    The record encodes the constraint number and the values with their
+    type: 64-bit integers are packed, other values are told apart by their
+    repr, as when they were recorded as the string of their list, so that
+    1 and '1' differ. Equal records mean equal values, and the key is a
+    digest of the record, so that fingerprints do not depend on the process
+    and survive a --checkpoint.
+    """
+    global _blake2b
+    if _blake2b == None:
+        import hashlib
+        _blake2b = hashlib.blake2b
+    record = None
+    if all(type(v) is int for v in values):
+        try:
+            record = _ints(len(values)).pack(b'i', nu, *values)
+        except struct.error:  # beyond 64 bits
+            pass
+    if record == None:
+        record = _REPR.pack(b'r', nu) + repr(values).encode('utf-8')
+    key = _KEY.unpack(_blake2b(record, digest_size=8).digest())[0]
+    # zero marks empty slots
+    return key or 1, record
+
+
+class Records(object):
+    """Append-only log of fingerprint records, in memory or in a file.
+
+    A record is stored after its length, and referenced by its offset plus
+    one, so that zero is never a reference. Records are only read back when
+    probe keys match, so that a file is seldom read.
+
+    - bytearray data: records in memory, None if in a file
+    - file file: records file, None if in memory
+    - int size: bytes of the log
+    """
+    __slots__ = ('data', 'file', 'size')
+
+    def __init__(self, path=None):
+        self.data = bytearray() if path == None else None
+        self.file = open(path, 'w+b') if path != None else None
+        self.size = 0
+
+    def append(self, record):
+        """Append a record and return its reference."""
+        ref = self.size + 1
+        head = _LEN.pack(len(record))
+        if self.file:
+            self.file.write(head)
+            self.file.write(record)
+        else:
+            self.data += head
+            self.data += record
+        self.size += _LEN.size + len(record)
+        return ref
+
+    def get(self, ref):
+        """Return the record of a reference."""
+        off = ref - 1 + _LEN.size
+        if self.file:
+            self.file.flush()
+            fd = self.file.fileno()
+            n = _LEN.unpack(os.pread(fd, _LEN.size, ref - 1))[0]
+            return os.pread(fd, n, off)
+        n = _LEN.unpack_from(self.data, ref - 1)[0]
+        return bytes(self.data[off:off + n])
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        self.data, self.file, self.size = bytearray(), None, 0
+
+    def copy(self):
+        assert not self.file, "records in a file cannot be copied"
+        r = Records()
+        r.data, r.size = bytearray(self.data), self.size
+        return r
+
+
+class UniqueSet(object):
+    """Set of fingerprints of unique constraint values.
+
+    Probe keys are held in open addressing arrays with linear probing, with
+    a reference to the exact record of the values, which takes 16 bytes per
+    slot plus the record instead of a string and a dictionary entry per
+    value. A match on the probe key is verified on the records, so that
+    fingerprints which differ on their values never collide.
+
+    The arrays are presized for the expected number of fingerprints, so
+    that they do not grow. A slot is found from the high
+    bits of a key, as its product with the number of slots, which needs not
+    be a power of two.
+
+    A fingerprint is probed first, then put at the slot found, so that the
+    values of a tuple are only recorded once all of them are known to be
+    new, without probing twice.
+
+    If the arrays and records would grow beyond limit bytes, fingerprints
+    are moved to files in directory, see Spill.
+
+    - array keys: 64-bit probe keys, zero for empty slots
+    - array refs: references of records
+    - Records records: exact records of the values
+    - int count: number of fingerprints
+    - int limit: bytes of arrays and records before spilling, None to
+      never spill
+    - str directory: where to spill
+    - int expected: expected number of fingerprints
+    - Spill spill: spilled fingerprints, None while in memory
+    """
+    __slots__ = ('keys', 'refs', 'records', 'count', 'limit', 'directory',
+                 'expected', 'spill')
+    # maximum load of the arrays before they are doubled
+    LOAD = 0.75
+    SLOT_BYTES = 16
+    # estimated bytes of a record of two 64-bit integers, with its length
+    RECORD_BYTES = _LEN.size + _ints(2).size
+
+    def __init__(self, expected=0, records=None):
+        self.keys, self.refs = self._arrays(UniqueSet.slotsFor(expected))
+        self.records = Records() if records == None else records
+        self.count = 0
+        self.limit, self.directory, self.expected = None, None, expected
+        self.spill = None
+
+    @staticmethod
+    def slotsFor(n):
+        """Return the number of slots of arrays presized for n fingerprints."""
+        return max(int(math.ceil(n / UniqueSet.LOAD)), 16)
+
+    @staticmethod
+    def bytesFor(n):
+        """Return the estimated bytes of a set of n fingerprints, with
+        records of two 64-bit integers."""
+        return UniqueSet.SLOT_BYTES * UniqueSet.slotsFor(n) + \
+            UniqueSet.RECORD_BYTES * n
+
+    def _arrays(self, size):
+        return array('Q', [0]) * size, array('Q', [0]) * size
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, fp):
+        return self.probe(fp) < 0
+
+    def _find(self, key, record):
+        """Return -1 if the fingerprint is in the arrays, or else the empty
+        slot which ends its probe sequence."""
+        keys = self.keys
+        size = len(keys)
+        i = key * size >> 64
+        k = keys[i]
+        while k:
+            if k == key and self.records.get(self.refs[i]) == record:
+                return -1
+            i += 1
+            if i == size:
+                i = 0
+            k = keys[i]
+        return i
+
+    def probe(self, fp):
+        """Return -1 if fingerprint fp is in the set, or else a slot for
+        put(). The arrays only grow here, and only after a put(), so that
+        slots from successive probes stay valid until the next put()."""
+        if self.spill:
+            return self.spill.probe(fp)
+        if self.count > len(self.keys) * UniqueSet.LOAD or \
+                self.limit != None and self.records.size + \
+                UniqueSet.SLOT_BYTES * len(self.keys) > self.limit:
+            self._grow()
+            if self.spill:
+                return self.spill.probe(fp)
+        return self._find(*fp)
+
+    def put(self, fp, slot):
+        """Add fingerprint fp, which is not in the set, at a probed slot."""
+        self.count += 1
+        if self.spill:
+            return self.spill.put(fp)
+        keys = self.keys
+        if keys[slot]:
+            # taken by another fingerprint probed at the same time
+            slot = self._find(*fp)
+        keys[slot], self.refs[slot] = fp[0], self.records.append(fp[1])
+
+    def add(self, fp):
+        slot = self.probe(fp)
+        if slot >= 0:
+            self.put(fp, slot)
+
+    def _grow(self, size=None):
+        """Rehash into size slots, default double, or spill beyond limit."""
+        size = size or 2 * len(self.keys)
+        if self.limit != None and self.records.size + \
+                size * UniqueSet.SLOT_BYTES > self.limit:
+            self.spill = Spill(self.directory,
+                               max(self.expected, 2 * self.count))
+            records = self.records
+            for key, ref in zip(self.keys, self.refs):
+                if key:
+                    self.spill.put((key, records.get(ref)))
+            records.close()
+            self.keys, self.refs = self._arrays(1)
+            return
+        old = zip(self.keys, self.refs)
+        keys, refs = self._arrays(size)
+        for key, ref in old:
+            if key:
+                i = key * size >> 64
+                while keys[i]:
+                    i = i + 1 if i + 1 < size else 0
+                keys[i], refs[i] = key, ref
+        self.keys, self.refs = keys, refs
+
+    def configure(self, expected, limit=None, directory=None):
+        """Expect some fingerprints, and spill beyond limit bytes to
+        directory."""
+        self.limit, self.directory, self.expected = limit, directory, expected
+
+    def presize(self):
+        """Size the arrays for the expected fingerprints, or for what fits
+        within the limit, so that they do not grow."""
+        n = self.expected if self.limit == None else \
+            min(self.expected, int(self.limit / (UniqueSet.SLOT_BYTES /
+                                                 UniqueSet.LOAD +
+                                                 UniqueSet.RECORD_BYTES)))
+        if not self.spill and UniqueSet.slotsFor(n) > len(self.keys):
+            self._grow(UniqueSet.slotsFor(n))
+
+    def close(self):
+        """Forget all fingerprints, and remove spilled files if any."""
+        if self.spill:
+            self.spill.close()
+            self.spill = None
+        self.keys, self.refs = self._arrays(16)
+        self.records.close()
+        self.count = 0
+
+    def copy(self):
+        assert not self.spill, \
+            "unique values spilled to disk cannot be copied"
+        s = UniqueSet(0, self.records.copy())
+        s.keys, s.refs, s.count = array('Q', self.keys), \
+            array('Q', self.refs), self.count
+        s.limit, s.directory, s.expected = \
+            self.limit, self.directory, self.expected
+        return s
+
+
+class MappedSet(UniqueSet):
+    """UniqueSet which arrays are memory mapped from a file, which is
+    replaced when they grow, with records in a file shared with other sets.
+    Files are sparse, so that untouched slots do not use the disk.
+
+    - str prefix: file name prefix, followed by the array size
+    - str path: current file
+    - mmap map: current mapping
+    """
+    __slots__ = ('prefix', 'path', 'map')
+
+    def __init__(self, prefix, expected, records):
+        self.prefix = prefix
+        UniqueSet.__init__(self, expected, records)
+
+    def _arrays(self, size):
+        import mmap
+        self.path = '{0}.{1}'.format(self.prefix, size)
+        with open(self.path, 'w+b') as f:
+            f.truncate(UniqueSet.SLOT_BYTES * size)
+            self.map = mmap.mmap(f.fileno(), 0)
+        view = memoryview(self.map)
+        return view[:8 * size].cast('Q'), view[8 * size:].cast('Q')
+
+    def _grow(self, size=None):
+        keys, refs, map, path = self.keys, self.refs, self.map, self.path
+        UniqueSet._grow(self, size)
+        keys.release()
+        refs.release()
+        map.close()
+        os.unlink(path)
+
+    def close(self):
+        self.keys.release()
+        self.refs.release()
+        self.map.close()
+
+
+class Spill(object):
+    """Fingerprints in hash-partitioned memory mapped files, with their
+    records in one file and a Bloom filter in memory, so that probing a new
+    fingerprint, the common case, reads no file.
+
+    - str path: temporary directory holding partition and records files
+    - Records records: exact records of all partitions
+    - MappedSet[] parts: partitions, chosen by the low bits of keys
+    - bytearray bloom: Bloom filter bits
+    - int nbits: number of bits of the Bloom filter
+    """
+    # partitions, chosen by the low bits of keys, as slots use high bits
+    PARTS = 256
+    # Bloom filter bits per expected value and number of hash functions,
+    # which give about 1% false positives
+    BITS, HASHES = 10, 5
+
+    def __init__(self, directory, expected):
+        import shutil
+        import tempfile
+        import weakref
+        self.path = tempfile.mkdtemp(prefix='datafiller_unique_',
+                                     dir=directory)
+        weakref.finalize(self, shutil.rmtree, self.path, True)
+        self.records = Records(os.path.join(self.path, 'records'))
+        self.parts = [MappedSet(os.path.join(self.path, str(i)),
+                                expected // Spill.PARTS, self.records)
+                      for i in range(Spill.PARTS)]
+        self.nbits = Spill.bloomBytes(expected) * 8
+        self.bloom = bytearray(self.nbits // 8)
+
+    @staticmethod
+    def bloomBytes(expected):
+        return max(expected * Spill.BITS // 8, 64)
+
+    def bits(self, key):
+        """Return the Bloom filter bits of a probe key."""
+        # double hashing, with the key rotated by half as a step
+        step = (key >> 32 | key << 32) & _MASK64 | 1
+        return [(key + i * step) % self.nbits for i in range(Spill.HASHES)]
+
+    def probe(self, fp):
+        bloom = self.bloom
+        for b in self.bits(fp[0]):
+            if not bloom[b >> 3] & (1 << (b & 7)):
+                return 0
+        return self.parts[fp[0] % Spill.PARTS]._find(*fp)
+
+    def put(self, fp):
+        bloom = self.bloom
+        for b in self.bits(fp[0]):
+            bloom[b >> 3] |= 1 << (b & 7)
+        self.parts[fp[0] % Spill.PARTS].add(fp)
+
+    def close(self):
+        import shutil
+        for part in self.parts:
+            part.close()
+        self.records.close()
+        shutil.rmtree(self.path, True)
@@ -1,10 +1,9 @@
 from __future__ import print_function, unicode_literals
 
 import re
+from functools import reduce
 
 from datafiller.consts import RECHARS, UCHARS, df_txt, df_flt, df_int, df_str, df_bol
-from datafiller.globals import df_macro
-from datafiller.scripts.cli import opts
 
 __author__ = "danishabdullah"
 
@@ -15,7 +14,7 @@ if sys.version_info < (3,):
 
     range = xrange  # ah!
     numeric_types = (int, long, float, complex)
-    u = lambda s: unicode(s, opts.encoding)  # for outside strings
+    u = lambda s: unicode(s, 'utf-8')  # for outside strings
     u8 = lambda s: unicode(s, 'utf-8')  # for strings in this file
     bytes = bytearray  # ah!
     str = unicode  # ah! should it be u? u8? depends?
@@ -65,14 +64,11 @@ def unescape(s, regexp=False):
     return r
 
 
-def debug(level, message):
-    """Print a debug message, maybe."""
-    if opts.debug >= level:
-        sys.stderr.write("*" * level + " " + message + "\n")
+def getParams(dfline, macros=None):
+    """return a dictionnary from a string like "x=123 y='str' ...".
 
-
-def getParams(dfline):
-    """return a dictionnary from a string like "x=123 y='str' ...". """
+    - {} macros: macros for 'use' directives, by name
+    """
     if dfline == '':
         return {}
     params = {}
@@ -102,9 +98,9 @@ def getParams(dfline):
         if d:
             # handle use of a macro directly
             if d.group(1) == 'use':
-                assert d.group(2) in df_macro, \
+                assert macros != None and d.group(2) in macros, \
                     "macro {0} is defined".format(d.group(2))
-                params.update(df_macro[d.group(2)])
+                params.update(macros[d.group(2)])
             else:
                 params[d.group(1)] = d.group(2)
             dfline = d.group(3)
@@ -116,3 +112,37 @@ def getParams(dfline):
             continue
         raise Exception("cannot parse: '{0}'".format(dfline))
     return params
+
+
+def parseRows(spec):
+    """Return the table name and the range of tuples of 'table:start-stop',
+    where stop is excluded and may be omitted for the end of the table."""
+    m = re.match(r'^\s*([^:]+?)\s*:\s*(\d+)\s*-\s*(\d*)\s*$', spec)
+    assert m, "option rows expects table:start-stop, got '{0}'".format(spec)
+    start = int(m.group(2))
+    stop = int(m.group(3)) if m.group(3) else None
+    assert stop == None or start <= stop, \
+        "option rows expects start <= stop, got '{0}'".format(spec)
+    return m.group(1), start, stop
+
+
+# binary multipliers of size suffixes
+SIZE_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def parseSize(spec, option='max-memory'):
+    """Return the number of bytes of a size such as '512M' or '4G'."""
+    m = re.match(r'^\s*(\d+(\.\d*)?)\s*([kmgt]?)(ib|b)?\s*$', spec, re.I)
+    assert m, "option {0} expects a size such as 4G, got '{1}'". \
+        format(option, spec)
+    return int(float(m.group(1)) * SIZE_UNITS[m.group(3).lower()])
+
+
+def humanSize(n):
+    """Return a byte count with a binary unit."""
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if n < 1024 or unit == 'TiB':
+            break
+        n /= 1024.0
+    return "{0:.1f} {1}".format(n, unit) if unit != 'B' else \
+        "{0:d} B".format(int(n))
@@ -27,12 +27,12 @@ setup(
     description='$Package_name',
     package_data={
         '': ['requirements.txt', 'README.md', 'COPYING'],
-        'datafiller/examples': ['datafiller/examples/comics.sql', 'datafiller/examples/internal.schema.checks.sql',
-                                'datafiller/examples/internal.schema.sql', 'datafiller/examples/library.sql',
-                                'datafiller/examples/pgbench.sql', ]
+        'datafiller.examples': ['comics.sql', 'internal.schema.check.sql',
+                                'internal.schema.sql', 'library.sql',
+                                'pgbench.sql', ]
     },
     entry_points={
-        'console_scripts': ['datafiller=datafiller.scripts.cli']
+        'console_scripts': ['datafiller=datafiller.scripts.cli:main']
     },
     long_description=readme,
     classifiers=[